@@ -2,6 +2,7 @@ from flask import Flask, render_template, request, jsonify, send_from_directory,
 from conf.auth import login_required, verify_login, load_auth_config, save_auth_config
 import os
 import json
+import copy
 import asyncio
 import threading
 from datetime import datetime, timedelta
@@ -9,35 +10,34 @@ from main import douyin_cookie_gen, douyin_setup, DouYinVideo
 import time
 import uuid
 import shutil
-import zipfile
 import tempfile
 from utils.log import douyin_logger
-from utils.history_db import init_db, log_upload_history, get_history, get_upload_count_last_hour
+from utils.history_db import init_db, log_upload_history, get_history_page, get_history_summary, get_stats_series, get_upload_count_last_hour, get_rate_limit_wait_seconds
 from utils.proxy_manager import proxy_manager
+from utils.proxy_health import proxy_health_checker
+from utils.browser_pool import browser_pool, run_in_thread
+from utils.cookie_validator import cookie_validator
+from utils.upload_scheduler import upload_scheduler
+from utils.task_store import task_store
+from utils.screencast import PageScreencast
+from utils.browser_view_hub import browser_view_hub
+from utils.video_jobs import video_job_pool, FILE_DONE, FILE_FAILED
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.ffmpeg_command import build_ffmpeg_command, get_processing_mode, PROCESSING_MODE_NAMES
+from utils.video_fingerprint import video_fingerprint_index
+from utils.remote_inventory import remote_inventory
+from conf import BROWSER_SCREENCAST_ENABLED, PROXY_HEALTH_CHECK_ENABLED, VIDEO_LIST_NETWORK_CAPTURE
 import base64
 import io
 from flask_socketio import SocketIO, emit
-from collections import defaultdict
 import weakref
 import sys
 import subprocess
 import atexit
 import signal
 
-# 尝试导入压缩包解压库
-try:
-    import rarfile
-    RARFILE_AVAILABLE = True
-except ImportError:
-    RARFILE_AVAILABLE = False
-    print("警告: rarfile 库未安装，无法解压 .rar 文件")
-
-try:
-    import py7zr
-    PY7ZR_AVAILABLE = True
-except ImportError:
-    PY7ZR_AVAILABLE = False
-    print("警告: py7zr 库未安装，无法解压 .7z 文件")
+# 压缩包解压（rarfile/py7zr 为可选依赖）
+from utils.archive_extractor import ArchiveExtractor, RARFILE_AVAILABLE, PY7ZR_AVAILABLE
 
 # Downloader API 配置 - 使用HTTP调用而不是直接导入
 import requests
@@ -148,6 +148,7 @@ def stop_downloader_service():
 def cleanup_on_exit():
     """程序退出时清理"""
     stop_downloader_service()
+    browser_pool.shutdown()
 
 atexit.register(cleanup_on_exit)
 
@@ -284,6 +285,7 @@ socketio = SocketIO(
     max_http_buffer_size=16 * 1024 * 1024,  # 增加缓冲区大小到16MB
     async_mode='threading'  # 使用线程模式提升稳定性
 )
+browser_view_hub.init_app(socketio)
 
 # 确保必要的目录存在
 os.makedirs("videos", exist_ok=True)
@@ -315,132 +317,100 @@ is_uploading = False
 # 压缩包解压任务状态
 archive_extraction_tasks = {}  # 存储解压任务状态
 
+# 视频处理输出文件名分配锁（并行处理时避免重名）
+video_output_lock = threading.Lock()
+
 # 多账号任务队列系统
 multi_account_tasks = []  # 存储所有账号的任务配置
 is_multi_uploading = False  # 多账号上传状态
 upload_mode = "sequential"  # 上传模式：sequential(轮询) 或 concurrent(并发)
 current_task_index = 0  # 当前轮询任务索引
 
-# 多账号任务数据持久化
-MULTI_TASKS_FILE = "database/multi_tasks.json"
-
-def load_multi_tasks_from_file():
-    """从文件加载多账号任务数据"""
+# 多账号任务数据持久化（SQLite任务存储，内存列表只作为运行中的任务视图）
+def load_multi_tasks():
+    """从任务存储加载多账号任务数据"""
     global multi_account_tasks
     try:
-        if os.path.exists(MULTI_TASKS_FILE):
-            with open(MULTI_TASKS_FILE, 'r', encoding='utf-8') as f:
-                multi_account_tasks = json.load(f)
-                douyin_logger.info(f"已加载 {len(multi_account_tasks)} 个多账号任务")
+        multi_account_tasks = task_store.get_tasks()
+        douyin_logger.info(f"已加载 {len(multi_account_tasks)} 个多账号任务")
     except Exception as e:
         douyin_logger.error(f"加载多账号任务数据失败: {str(e)}")
         multi_account_tasks = []
 
-def save_multi_tasks_to_file():
-    """保存多账号任务数据到文件"""
+def save_multi_tasks():
+    """在一个事务中批量保存所有任务的状态"""
     try:
-        douyin_logger.info(f"DEBUG: 准备保存 {len(multi_account_tasks)} 个任务到文件")
-        for task in multi_account_tasks:
-            douyin_logger.info(f"DEBUG: 保存任务 - Cookie: {task['cookie']}, Status: {task['status']}, Completed: {task.get('completed_videos', 0)}/{task.get('total_videos', 0)}")
-        os.makedirs(os.path.dirname(MULTI_TASKS_FILE), exist_ok=True)
-        with open(MULTI_TASKS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(multi_account_tasks, f, ensure_ascii=False, indent=2)
-        douyin_logger.info(f"DEBUG: 任务数据已成功保存到 {MULTI_TASKS_FILE}")
+        task_store.save_task_states(multi_account_tasks)
     except Exception as e:
         douyin_logger.error(f"保存多账号任务数据失败: {str(e)}")
 
-def update_task_status(task, status, current_video=None, save_to_file=True, clear_video=False):
-    """更新任务状态并可选择保存到文件"""
-    old_status = task.get("status", "unknown")
+def update_task_status(task, status, current_video=None, persist=True, clear_video=False):
+    """更新任务状态并可选择写入任务存储"""
     task["status"] = status
     
     # 处理current_video字段
     if clear_video or (current_video is not None):
         task["current_video"] = current_video if current_video is not None else ""
         
-    douyin_logger.info(f"DEBUG: 更新任务状态 - Cookie: {task['cookie']}, 从 {old_status} -> {status}, 完成: {task.get('completed_videos', 0)}/{task.get('total_videos', 0)}")
-    if save_to_file:
-        save_multi_tasks_to_file()
-        douyin_logger.info(f"DEBUG: 任务状态已保存到文件")
+    if persist:
+        try:
+            task_store.update_task_status(task["id"], status, task.get("current_video"))
+        except Exception as e:
+            douyin_logger.error(f"保存任务状态失败: {str(e)}")
+
+def find_duplicate_videos(videos):
+    """根据已缓存的MD5找出上传列表中的重复视频，返回 {视频相对路径: 原因}"""
+    from utils.md5_manager import md5_manager
+    try:
+        full_paths = {os.path.join("videos", v): v for v in videos if isinstance(v, str)}
+        duplicates = md5_manager.find_duplicates(list(full_paths))
+        return {full_paths[path]: reason for path, reason in duplicates.items()}
+    except Exception as e:
+        douyin_logger.error(f"检查重复视频失败: {str(e)}")
+        return {}
 
 # 浏览器截图共享相关 - 添加线程安全保护
 browser_data_lock = threading.RLock()  # 可重入锁
-browser_screenshot_data = {}
 active_browser_sessions = {}
-browser_click_queue = defaultdict(list)  # 使用defaultdict避免KeyError
+browser_input_queues = {}  # session_id -> asyncio.Queue，在浏览器池事件循环中消费
 browser_pages = weakref.WeakValueDictionary()  # 使用弱引用避免内存泄漏
 
 # 内存管理配置
-MAX_SCREENSHOT_CACHE = 50  # 最大截图缓存数量
 MAX_CLICK_QUEUE_SIZE = 100  # 最大点击队列大小
-CLEANUP_INTERVAL = 300  # 清理间隔：5分钟
+MAX_INPUT_TEXT_LENGTH = 1000  # 单次输入（含合并后）的最大长度
+
+def enqueue_browser_event(session_id, event):
+    """从Socket.IO线程把点击/输入事件投递到会话队列，处理协程会被立即唤醒
 
-# 定期清理过期数据
-def cleanup_memory():
-    """定期清理过期数据，防止内存泄漏"""
+    Returns:
+        bool: 会话是否存在
+    """
     with browser_data_lock:
-        current_time = time.time()
-        
-        # 清理过期的截图数据（超过10分钟）
-        expired_sessions = []
-        for session_id, data in browser_screenshot_data.items():
-            if isinstance(data, dict) and 'timestamp' in data:
-                if current_time - data['timestamp'] > 600:  # 10分钟
-                    expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
-            try:
-                del browser_screenshot_data[session_id]
-                if session_id in active_browser_sessions:
-                    del active_browser_sessions[session_id]
-                if session_id in browser_click_queue:
-                    del browser_click_queue[session_id]
-                douyin_logger.info(f"清理过期会话: {session_id}")
-            except KeyError:
-                pass
-        
-        # 限制截图缓存大小
-        if len(browser_screenshot_data) > MAX_SCREENSHOT_CACHE:
-            # 保留最新的截图
-            sorted_sessions = sorted(
-                browser_screenshot_data.items(),
-                key=lambda x: x[1].get('timestamp', 0) if isinstance(x[1], dict) else 0,
-                reverse=True
-            )
-            # 删除最旧的截图
-            for session_id, _ in sorted_sessions[MAX_SCREENSHOT_CACHE:]:
-                try:
-                    del browser_screenshot_data[session_id]
-                except KeyError:
-                    pass
-        
-        # 清理点击队列
-        for session_id, queue in list(browser_click_queue.items()):
-            if len(queue) > MAX_CLICK_QUEUE_SIZE:
-                browser_click_queue[session_id] = queue[-MAX_CLICK_QUEUE_SIZE:]
-
-# 启动定期清理线程
-def start_cleanup_thread():
-    def cleanup_worker():
-        while True:
-            try:
-                time.sleep(CLEANUP_INTERVAL)
-                cleanup_memory()
-            except Exception as e:
-                douyin_logger.error(f"内存清理过程中出错: {str(e)}")
-    
-    cleanup_thread = threading.Thread(target=cleanup_worker, daemon=True)
-    cleanup_thread.start()
-    douyin_logger.info("内存清理线程已启动")
+        queue = browser_input_queues.get(session_id) if active_browser_sessions.get(session_id) else None
+    if queue is None:
+        return False
+    browser_pool.loop.call_soon_threadsafe(_put_browser_event, queue, event)
+    return True
+
+def _put_browser_event(queue, event):
+    # 队列已满时丢弃最旧的事件
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
 
 # 初始化数据库
 init_db()
 
-# 启动内存清理
-start_cleanup_thread()
+# 进程启动时上一次运行中断的作业仍处于租用状态，恢复为待上传（只在启动时执行，
+# 运行期间租用中的作业可能属于已请求停止但仍在上传的协程）
+task_store.recover_leased_jobs()
 
 # 加载多账号任务数据
-load_multi_tasks_from_file()
+load_multi_tasks()
+
+# 启动代理健康检查
+if PROXY_HEALTH_CHECK_ENABLED:
+    proxy_health_checker.start()
 
 # WebSocket事件处理
 @socketio.on('connect')
@@ -453,6 +423,7 @@ def handle_connect():
 def handle_disconnect():
     print(f"❌ WebSocket客户端断开连接: {request.sid}")
     douyin_logger.info(f"WebSocket客户端断开连接: {request.sid}")
+    browser_view_hub.remove_client(request.sid)
 
 @socketio.on('test_message')
 def handle_test_message(data):
@@ -460,33 +431,30 @@ def handle_test_message(data):
     douyin_logger.info(f"收到测试消息: {data}")
     emit('test_response', {'message': '测试消息已收到', 'timestamp': time.time(), 'original_data': data})
 
+@socketio.on('subscribe_browser_view')
+def handle_subscribe_browser_view(data):
+    """客户端订阅浏览器会话的画面和状态"""
+    session_id = data.get('session_id')
+    if not session_id:
+        emit('error', {'message': '无效的会话ID'})
+        return
+    browser_view_hub.subscribe(session_id, request.sid)
+
+@socketio.on('unsubscribe_browser_view')
+def handle_unsubscribe_browser_view(data):
+    """客户端退订浏览器会话"""
+    session_id = data.get('session_id')
+    if session_id:
+        browser_view_hub.unsubscribe(session_id, request.sid)
+
 @socketio.on('request_browser_view')
 def handle_request_browser_view(data):
     """客户端请求查看浏览器内容"""
     session_id = data.get('session_id', 'default')
-    with browser_data_lock:
-        if session_id in browser_screenshot_data:
-            screenshot_data = browser_screenshot_data[session_id]
-            
-            # 确保screenshot_data是正确的格式
-            if isinstance(screenshot_data, dict) and 'data' in screenshot_data:
-                emit('browser_screenshot', {
-                    'session_id': session_id,
-                    'screenshot': screenshot_data['data'],
-                    'timestamp': screenshot_data.get('timestamp', time.time())
-                })
-                print(f"📤 刷新请求: 发送截图数据到客户端, session_id={session_id}")
-            else:
-                # 如果数据格式不正确，直接发送原始数据
-                emit('browser_screenshot', {
-                    'session_id': session_id,
-                    'screenshot': screenshot_data,
-                    'timestamp': time.time()
-                })
-                print(f"📤 刷新请求: 发送原始截图数据到客户端, session_id={session_id}")
-        else:
-            print(f"⚠️ 刷新请求失败: 没有找到session {session_id} 的截图数据")
-            emit('error', {'message': f'没有找到会话 {session_id} 的截图数据'})
+    # 重新订阅会重置该客户端的帧发送状态并补发最新画面
+    if not browser_view_hub.subscribe(session_id, request.sid):
+        print(f"⚠️ 刷新请求失败: 没有找到session {session_id} 的截图数据")
+        emit('error', {'message': f'没有找到会话 {session_id} 的截图数据'})
 
 @socketio.on('browser_click')
 def handle_browser_click(data):
@@ -499,29 +467,22 @@ def handle_browser_click(data):
         emit('error', {'message': '无效的点击数据'})
         return
     
-    with browser_data_lock:
-        if session_id in active_browser_sessions:
-            # 限制队列大小，防止内存泄漏
-            if len(browser_click_queue[session_id]) >= MAX_CLICK_QUEUE_SIZE:
-                browser_click_queue[session_id] = browser_click_queue[session_id][-MAX_CLICK_QUEUE_SIZE//2:]
-            
-            browser_click_queue[session_id].append({
-                'type': 'click',
-                'x': int(x),
-                'y': int(y),
-                'timestamp': time.time()
-            })
-            
-            douyin_logger.info(f"收到点击事件: ({x}, {y}) for session {session_id}")
-            
-            emit('click_received', {
-                'session_id': session_id,
-                'x': x,
-                'y': y,
-                'message': f'点击位置: ({x}, {y})'
-            })
-        else:
-            emit('error', {'message': f'会话 {session_id} 不活跃或不存在'})
+    if enqueue_browser_event(session_id, {
+        'type': 'click',
+        'x': int(x),
+        'y': int(y),
+        'timestamp': time.time()
+    }):
+        douyin_logger.info(f"收到点击事件: ({x}, {y}) for session {session_id}")
+        
+        emit('click_received', {
+            'session_id': session_id,
+            'x': x,
+            'y': y,
+            'message': f'点击位置: ({x}, {y})'
+        })
+    else:
+        emit('error', {'message': f'会话 {session_id} 不活跃或不存在'})
 
 @socketio.on('browser_input')
 def handle_browser_input(data):
@@ -536,34 +497,27 @@ def handle_browser_input(data):
         return
     
     # 限制输入长度，防止恶意输入
-    if len(text) > 1000:
-        text = text[:1000]
+    if len(text) > MAX_INPUT_TEXT_LENGTH:
+        text = text[:MAX_INPUT_TEXT_LENGTH]
     
-    with browser_data_lock:
-        if session_id in active_browser_sessions:
-            # 限制队列大小
-            if len(browser_click_queue[session_id]) >= MAX_CLICK_QUEUE_SIZE:
-                browser_click_queue[session_id] = browser_click_queue[session_id][-MAX_CLICK_QUEUE_SIZE//2:]
-            
-            browser_click_queue[session_id].append({
-                'type': 'input',
-                'action': action,
-                'text': text,
-                'key': key,
-                'timestamp': time.time()
-            })
-            
-            douyin_logger.info(f"收到输入事件: action={action}, text='{text[:50]}', key='{key}' for session {session_id}")
-            
-            emit('input_received', {
-                'session_id': session_id,
-                'action': action,
-                'text': text,
-                'key': key,
-                'message': f'输入内容: {text[:20]}...' if len(text) > 20 else f'输入内容: {text}' if text else f'按键: {key}'
-            })
-        else:
-            emit('error', {'message': f'会话 {session_id} 不活跃或不存在'})
+    if enqueue_browser_event(session_id, {
+        'type': 'input',
+        'action': action,
+        'text': text,
+        'key': key,
+        'timestamp': time.time()
+    }):
+        douyin_logger.info(f"收到输入事件: action={action}, text='{text[:50]}', key='{key}' for session {session_id}")
+        
+        emit('input_received', {
+            'session_id': session_id,
+            'action': action,
+            'text': text,
+            'key': key,
+            'message': f'输入内容: {text[:20]}...' if len(text) > 20 else f'输入内容: {text}' if text else f'按键: {key}'
+        })
+    else:
+        emit('error', {'message': f'会话 {session_id} 不活跃或不存在'})
 
 @socketio.on('close_browser')
 def handle_close_browser(data):
@@ -581,22 +535,18 @@ def handle_close_browser(data):
             # 标记会话为关闭状态
             active_browser_sessions[session_id] = False
             
-            emit('browser_status', {
-                'session_id': session_id,
+            browser_view_hub.emit_status(session_id, {
                 'status': 'closing',
                 'message': '正在关闭浏览器并保存Cookie...'
             })
             
             # 清理相关资源
             try:
-                if session_id in browser_click_queue:
-                    del browser_click_queue[session_id]
+                if session_id in browser_input_queues:
+                    del browser_input_queues[session_id]
                 
                 if session_id in browser_pages:
                     del browser_pages[session_id]
-                
-                if session_id in browser_screenshot_data:
-                    del browser_screenshot_data[session_id]
                     
             except KeyError:
                 pass  # 资源已经被清理
@@ -790,9 +740,9 @@ def generate_b_video():
             ]
         
         # 执行FFmpeg命令
-        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        returncode, stderr_tail = run_ffmpeg(cmd, duration=float(duration))
         
-        if result.returncode == 0:
+        if returncode == 0:
             video_info = get_video_info(output_path)
             return jsonify({
                 'success': True,
@@ -802,15 +752,194 @@ def generate_b_video():
             })
         else:
             return jsonify({
-                'error': f'生成视频失败: {result.stderr}'
+                'error': f'生成视频失败: {stderr_tail}'
             }), 500
             
     except Exception as e:
         return jsonify({'error': f'生成视频失败: {str(e)}'}), 500
 
+def resolve_split_screen_direction(settings, input_path):
+    """分屏方向为auto时，根据视频宽高自动选择分屏方向"""
+    split_screen = settings.get('splitScreen', {})
+    if split_screen.get('enabled', False) and split_screen.get('direction') == 'auto':
+        # 获取视频信息以确定分屏方向
+        video_info = get_video_info(input_path)
+        if video_info:
+            # 竖屏视频使用左右分屏，横屏视频使用上下分屏
+            if video_info['is_portrait']:
+                settings['splitScreen']['direction'] = 'horizontal'  # 左右分屏
+                douyin_logger.info(f"检测到竖屏视频 ({video_info['width']}x{video_info['height']})，自动选择左右分屏")
+            else:
+                settings['splitScreen']['direction'] = 'vertical'    # 上下分屏
+                douyin_logger.info(f"检测到横屏视频 ({video_info['width']}x{video_info['height']})，自动选择上下分屏")
+        else:
+            # 无法获取视频信息时默认使用左右分屏
+            settings['splitScreen']['direction'] = 'horizontal'
+            douyin_logger.warning("无法获取视频信息，默认使用左右分屏")
+
+def emit_video_process_progress(job_id, filename, progress):
+    """推送FFmpeg处理进度"""
+    socketio.emit('video_process_progress', {
+        'job_id': job_id,
+        'file': filename,
+        **progress.to_dict()
+    })
+
+def process_download_video(params, file_task=None):
+    """处理downloads中的单个视频（在视频处理任务池的工作线程中运行）
+
+    Args:
+        params: {'folder': 文件夹, 'filename': 文件名, 'settings': 编辑设置, 'original': 展示名称}
+
+    Returns:
+        dict: {'original': ..., 'processed': 输出文件相对videos的路径}
+    """
+    import shutil
+    import urllib.parse
+    
+    folder_name = params['folder']
+    video_filename = params['filename']
+    # 每个文件独立的设置副本（分屏auto会按视频改写方向）
+    settings = copy.deepcopy(params.get('settings') or {})
+    
+    # 从downloads文件夹获取视频
+    input_path = os.path.join(os.getcwd(), 'downloads', folder_name, video_filename)
+    input_path = os.path.normpath(input_path)  # 规范化输入路径
+    if not os.path.exists(input_path):
+        raise Exception('文件不存在')
+    
+    # 生成输出文件名和路径
+    name, ext = os.path.splitext(video_filename)
+    output_filename = f"{name}{ext}"
+    output_dir = os.path.join('videos', folder_name)
+    output_path = os.path.join(output_dir, output_filename)
+    
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 如果文件已存在，添加数字后缀（并行处理时由锁保证不会选中同一个文件名）
+    with video_output_lock:
+        counter = 1
+        base_name_for_conflict = name # 用于冲突处理的基础文件名
+        while os.path.exists(output_path):
+            output_filename = f"{base_name_for_conflict}_{counter}{ext}"
+            output_path = os.path.join(output_dir, output_filename)
+            counter += 1
+        # 占位，避免其他工作线程选中同一个输出文件
+        open(output_path, 'wb').close()
+    
+    # 规范化路径格式，解决中文路径问题
+    output_path = os.path.normpath(output_path)
+    
+    # 处理分屏自动选择逻辑
+    resolve_split_screen_direction(settings, input_path)
+    
+    # 构建FFmpeg命令
+    ffmpeg_cmd = build_ffmpeg_command(input_path, output_path, settings)
+    mode = get_processing_mode(ffmpeg_cmd)
+    
+    # 打印FFmpeg命令以便调试
+    douyin_logger.info(f"执行FFmpeg命令（{PROCESSING_MODE_NAMES[mode]}）: {' '.join(ffmpeg_cmd)}")
+    
+    # 执行FFmpeg命令，进度通过WebSocket推送
+    video_info = get_video_info(input_path)
+    try:
+        returncode, stderr = video_job_pool.run_ffmpeg(
+            ffmpeg_cmd, file_task,
+            duration=video_info['duration'] if video_info else None,
+            on_progress=lambda task, progress: emit_video_process_progress(task.job.id, task.name, progress)
+        )
+    except Exception:
+        # 取消或异常时删除不完整的输出文件
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    
+    douyin_logger.info(f"FFmpeg返回码: {returncode}")
+    if returncode != 0:
+        douyin_logger.error(f"FFmpeg错误: {stderr}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise Exception(stderr)
+    
+    # 处理成功，尝试复制对应的txt文件和图片
+    decoded_name = urllib.parse.unquote(name)
+    original_txt_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}.txt")
+    
+    # 如果解码后的文件不存在，尝试使用原始文件名
+    if not os.path.exists(original_txt_path):
+        original_txt_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}.txt")
+    
+    if os.path.exists(original_txt_path):
+        # 复制txt文件到输出目录
+        output_txt_path = os.path.join(output_dir, os.path.splitext(output_filename)[0] + ".txt")
+        try:
+            shutil.copy2(original_txt_path, output_txt_path)
+            print(f"已复制txt文件: {original_txt_path} -> {output_txt_path}")
+        except Exception as e:
+            print(f"复制txt文件失败: {e}")
+    
+    # 复制可能存在的封面图片文件
+    for img_ext in ['.jpg', '.jpeg', '.png', '.webp']:
+        original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}{img_ext}")
+        if not os.path.exists(original_img_path):
+            original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}{img_ext}")
+        
+        if os.path.exists(original_img_path):
+            output_img_path = os.path.join(output_dir, os.path.splitext(output_filename)[0] + img_ext)
+            try:
+                shutil.copy2(original_img_path, output_img_path)
+                print(f"已复制封面图片: {original_img_path} -> {output_img_path}")
+                break  # 只复制第一个找到的图片
+            except Exception as e:
+                print(f"复制封面图片失败: {e}")
+    
+    # 删除原视频文件
+    try:
+        if os.path.exists(input_path):
+            os.remove(input_path)
+            douyin_logger.info(f"已删除原视频文件: {input_path}")
+        
+        # 删除对应的txt文件
+        if os.path.exists(original_txt_path):
+            os.remove(original_txt_path)
+            douyin_logger.info(f"已删除原视频txt文件: {original_txt_path}")
+            
+        # 删除对应的封面图片文件
+        for img_ext in ['.jpg', '.jpeg', '.png', '.webp']:
+            original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}{img_ext}")
+            if not os.path.exists(original_img_path):
+                original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}{img_ext}")
+            
+            if os.path.exists(original_img_path):
+                os.remove(original_img_path)
+                douyin_logger.info(f"已删除原视频封面图片: {original_img_path}")
+                break
+        
+        # 检查文件夹是否为空，如果为空则删除（并行处理时其他文件可能同时删除该文件夹）
+        folder_path = os.path.join(os.getcwd(), 'downloads', folder_name)
+        with video_output_lock:
+            if os.path.exists(folder_path) and not os.listdir(folder_path):
+                os.rmdir(folder_path)
+                douyin_logger.info(f"文件夹已清空，删除空文件夹: {folder_path}")
+    except Exception as e:
+        douyin_logger.error(f"删除原文件失败: {str(e)}")
+    
+    # 记录处理成功的文件
+    relative_output = os.path.join(folder_name, output_filename).replace('\\', '/')
+    return {
+        'original': params.get('original', video_filename),
+        'processed': relative_output,
+        'mode': mode
+    }
+
 @app.route('/api/video/process', methods=['POST'])
 def process_video():
-    """处理视频编辑请求"""
+    """处理视频编辑请求
+
+    文件夹选择（JSON请求）提交到视频处理任务池后立即返回任务ID，
+    通过 /api/video/jobs/<job_id> 查询进度；文件上传（表单请求）同步处理
+    """
     try:
         # 获取设置
         if request.content_type == 'application/json':
@@ -820,6 +949,8 @@ def process_video():
             
             # 处理全选所有文件夹的情况
             all_folders = data.get('all_folders', False)
+            items = []
+            failed_files = []
             
             if all_folders:
                 # 处理来自多个文件夹的视频
@@ -827,10 +958,6 @@ def process_video():
                 if not videos:
                     return jsonify({'error': '缺少视频列表'}), 400
                 
-                # 批量处理多个视频
-                processed_files = []
-                failed_files = []
-                
                 for video_data in videos:
                     folder_name = video_data.get('folder')
                     video_filename = video_data.get('filename')
@@ -838,173 +965,14 @@ def process_video():
                     if not folder_name or not video_filename:
                         failed_files.append(f'缺少文件夹或文件名: {video_data}')
                         continue
-                        
-                    try:
-                        # 从downloads文件夹获取视频
-                        input_path = os.path.join(os.getcwd(), 'downloads', folder_name, video_filename)
-                        input_path = os.path.normpath(input_path)  # 规范化输入路径
-                        if not os.path.exists(input_path):
-                            failed_files.append(f'{folder_name}/{video_filename}: 文件不存在')
-                            continue
-                        
-                        # 处理单个视频...
-                        # 生成输出文件名和路径
-                        name, ext = os.path.splitext(video_filename)
-                        output_filename = f"{name}{ext}"
-                        output_dir = os.path.join('videos', folder_name)
-                        output_path = os.path.join(output_dir, output_filename)
-                        
-                        # 确保输出目录存在
-                        os.makedirs(output_dir, exist_ok=True)
-                        
-                        # 如果文件已存在，添加数字后缀
-                        counter = 1
-                        base_name_for_conflict = name # 用于冲突处理的基础文件名
-                        while os.path.exists(output_path):
-                            output_filename = f"{base_name_for_conflict}_{counter}{ext}"
-                            output_path = os.path.join(output_dir, output_filename)
-                            counter += 1
-                        
-                        # 规范化路径格式，解决中文路径问题
-                        output_path = os.path.normpath(output_path)
-                        
-                        # 处理分屏自动选择逻辑
-                        split_screen = settings.get('splitScreen', {})
-                        if split_screen.get('enabled', False) and split_screen.get('direction') == 'auto':
-                            # 获取视频信息以确定分屏方向
-                            video_info = get_video_info(input_path)
-                            if video_info:
-                                # 竖屏视频使用左右分屏，横屏视频使用上下分屏
-                                if video_info['is_portrait']:
-                                    settings['splitScreen']['direction'] = 'horizontal'  # 左右分屏
-                                    douyin_logger.info(f"检测到竖屏视频 ({video_info['width']}x{video_info['height']})，自动选择左右分屏")
-                                else:
-                                    settings['splitScreen']['direction'] = 'vertical'    # 上下分屏
-                                    douyin_logger.info(f"检测到横屏视频 ({video_info['width']}x{video_info['height']})，自动选择上下分屏")
-                            else:
-                                # 无法获取视频信息时默认使用左右分屏
-                                settings['splitScreen']['direction'] = 'horizontal'
-                                douyin_logger.warning("无法获取视频信息，默认使用左右分屏")
-                        
-                        # 构建FFmpeg命令
-                        ffmpeg_cmd = build_ffmpeg_command(input_path, output_path, settings)
-                        
-                        # 打印FFmpeg命令以便调试
-                        douyin_logger.info(f"执行FFmpeg命令: {' '.join(ffmpeg_cmd)}")
-                        
-                        # 执行FFmpeg命令
-                        import subprocess
-                        try:
-                            result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-                        except UnicodeDecodeError:
-                            # 如果UTF-8解码失败，尝试使用gbk编码
-                            result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, encoding='gbk', errors='ignore')
-                        
-                        # 处理执行结果...
-                        if result.stdout:
-                            douyin_logger.info(f"FFmpeg输出: {result.stdout}")
-                        if result.stderr:
-                            douyin_logger.error(f"FFmpeg错误: {result.stderr}")
-                        douyin_logger.info(f"FFmpeg返回码: {result.returncode}")
-                        
-                        if result.returncode == 0:
-                            # 处理成功，尝试复制对应的txt文件和图片
-                            import urllib.parse
-                            decoded_name = urllib.parse.unquote(name)
-                            original_txt_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}.txt")
-                            
-                            # 如果解码后的文件不存在，尝试使用原始文件名
-                            if not os.path.exists(original_txt_path):
-                                original_txt_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}.txt")
-                            
-                            if os.path.exists(original_txt_path):
-                                # 复制txt文件到输出目录
-                                output_txt_path = os.path.join(output_dir, os.path.splitext(output_filename)[0] + ".txt")
-                                try:
-                                    import shutil
-                                    shutil.copy2(original_txt_path, output_txt_path)
-                                    print(f"已复制txt文件: {original_txt_path} -> {output_txt_path}")
-                                except Exception as e:
-                                    print(f"复制txt文件失败: {e}")
-                            
-                            # 复制可能存在的封面图片文件
-                            for img_ext in ['.jpg', '.jpeg', '.png', '.webp']:
-                                original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}{img_ext}")
-                                if not os.path.exists(original_img_path):
-                                    original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}{img_ext}")
-                                
-                                if os.path.exists(original_img_path):
-                                    output_img_path = os.path.join(output_dir, os.path.splitext(output_filename)[0] + img_ext)
-                                    try:
-                                        import shutil
-                                        shutil.copy2(original_img_path, output_img_path)
-                                        print(f"已复制封面图片: {original_img_path} -> {output_img_path}")
-                                        break  # 只复制第一个找到的图片
-                                    except Exception as e:
-                                        print(f"复制封面图片失败: {e}")
-                            
-                            # 记录处理成功的文件
-                            relative_output = os.path.join(folder_name, output_filename).replace('\\', '/')
-                            processed_files.append({
-                                'original': f'{folder_name}/{video_filename}',
-                                'processed': relative_output
-                            })
-                            
-                            # 删除原视频文件
-                            try:
-                                original_video_path = os.path.join(os.getcwd(), 'downloads', folder_name, video_filename)
-                                if os.path.exists(original_video_path):
-                                    os.remove(original_video_path)
-                                    douyin_logger.info(f"已删除原视频文件: {original_video_path}")
-                                
-                                # 删除对应的txt文件
-                                if os.path.exists(original_txt_path):
-                                    os.remove(original_txt_path)
-                                    douyin_logger.info(f"已删除原视频txt文件: {original_txt_path}")
-                                    
-                                # 删除对应的封面图片文件
-                                for img_ext in ['.jpg', '.jpeg', '.png', '.webp']:
-                                    original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}{img_ext}")
-                                    if not os.path.exists(original_img_path):
-                                        original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}{img_ext}")
-                                    
-                                    if os.path.exists(original_img_path):
-                                        os.remove(original_img_path)
-                                        douyin_logger.info(f"已删除原视频封面图片: {original_img_path}")
-                                        break
-                                
-                                # 检查文件夹是否为空，如果为空则删除
-                                folder_path = os.path.join(os.getcwd(), 'downloads', folder_name)
-                                if os.path.exists(folder_path):
-                                    remaining_files = os.listdir(folder_path)
-                                    if not remaining_files:
-                                        os.rmdir(folder_path)
-                                        douyin_logger.info(f"文件夹已清空，删除空文件夹: {folder_path}")
-                            except Exception as e:
-                                douyin_logger.error(f"删除原文件失败: {str(e)}")
-                        else:
-                            failed_files.append(f'{folder_name}/{video_filename}: {result.stderr}')
                     
-                    except Exception as e:
-                        failed_files.append(f'{folder_name}/{video_filename}: {str(e)}')
-                
-                # 返回批量处理结果
-                if processed_files:
-                    message = f'成功处理 {len(processed_files)} 个视频'
-                    if failed_files:
-                        message += f'，{len(failed_files)} 个视频处理失败'
-                    
-                    return jsonify({
-                        'success': True,
-                        'processed_files': processed_files,
-                        'failed_files': failed_files,
-                        'output_file': processed_files[0]['processed'] if len(processed_files) == 1 else '',  # 兼容单文件
-                        'message': message
-                    })
-                else:
-                    return jsonify({
-                        'error': f'所有视频处理失败: {"; ".join(failed_files)}'
-                    }), 500
+                    original = f'{folder_name}/{video_filename}'
+                    items.append((original, {
+                        'folder': folder_name,
+                        'filename': video_filename,
+                        'settings': settings,
+                        'original': original
+                    }))
             
             # 原有逻辑：处理单个文件夹中的视频
             else:
@@ -1019,177 +987,29 @@ def process_video():
                 
                 if not folder_name or not video_filenames:
                     return jsonify({'error': '缺少文件夹或视频文件名'}), 400
-            
-            # 批量处理多个视频
-            processed_files = []
-            failed_files = []
-            
-            for video_filename in video_filenames:
-                try:
-                    # 从downloads文件夹获取视频
-                    input_path = os.path.join(os.getcwd(), 'downloads', folder_name, video_filename)
-                    input_path = os.path.normpath(input_path)  # 规范化输入路径
-                    if not os.path.exists(input_path):
-                        failed_files.append(f'{video_filename}: 文件不存在')
-                        continue
-                    
-                    # 生成输出文件名和路径
-                    name, ext = os.path.splitext(video_filename)
-                    output_filename = f"{name}{ext}"
-                    output_dir = os.path.join('videos', folder_name)
-                    output_path = os.path.join(output_dir, output_filename)
-                    
-                    # 确保输出目录存在
-                    os.makedirs(output_dir, exist_ok=True)
-                    
-                    # 如果文件已存在，添加数字后缀
-                    counter = 1
-                    base_name_for_conflict = name # 用于冲突处理的基础文件名
-                    while os.path.exists(output_path):
-                        output_filename = f"{base_name_for_conflict}_{counter}{ext}"
-                        output_path = os.path.join(output_dir, output_filename)
-                        counter += 1
-                    
-                    # 规范化路径格式，解决中文路径问题
-                    output_path = os.path.normpath(output_path)
-                    
-                    # 处理分屏自动选择逻辑
-                    split_screen = settings.get('splitScreen', {})
-                    if split_screen.get('enabled', False) and split_screen.get('direction') == 'auto':
-                        # 获取视频信息以确定分屏方向
-                        video_info = get_video_info(input_path)
-                        if video_info:
-                            # 竖屏视频使用左右分屏，横屏视频使用上下分屏
-                            if video_info['is_portrait']:
-                                settings['splitScreen']['direction'] = 'horizontal'  # 左右分屏
-                                douyin_logger.info(f"检测到竖屏视频 ({video_info['width']}x{video_info['height']})，自动选择左右分屏")
-                            else:
-                                settings['splitScreen']['direction'] = 'vertical'    # 上下分屏
-                                douyin_logger.info(f"检测到横屏视频 ({video_info['width']}x{video_info['height']})，自动选择上下分屏")
-                        else:
-                            # 无法获取视频信息时默认使用左右分屏
-                            settings['splitScreen']['direction'] = 'horizontal'
-                            douyin_logger.warning("无法获取视频信息，默认使用左右分屏")
-                    
-                    # 构建FFmpeg命令
-                    ffmpeg_cmd = build_ffmpeg_command(input_path, output_path, settings)
-                    
-                    # 打印FFmpeg命令以便调试
-                    douyin_logger.info(f"执行FFmpeg命令: {' '.join(ffmpeg_cmd)}")
-                    
-                    # 执行FFmpeg命令
-                    import subprocess
-                    try:
-                        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-                    except UnicodeDecodeError:
-                        # 如果UTF-8解码失败，尝试使用gbk编码
-                        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, encoding='gbk', errors='ignore')
-                    
-                    # 打印FFmpeg执行结果
-                    if result.stdout:
-                        douyin_logger.info(f"FFmpeg输出: {result.stdout}")
-                    if result.stderr:
-                        douyin_logger.error(f"FFmpeg错误: {result.stderr}")
-                    douyin_logger.info(f"FFmpeg返回码: {result.returncode}")
-                    
-                    if result.returncode == 0:
-                        # 处理成功，尝试复制对应的txt文件和图片
-                        import urllib.parse
-                        decoded_name = urllib.parse.unquote(name)
-                        original_txt_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}.txt")
-                        
-                        # 如果解码后的文件不存在，尝试使用原始文件名
-                        if not os.path.exists(original_txt_path):
-                            original_txt_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}.txt")
-                        
-                        if os.path.exists(original_txt_path):
-                            # 复制txt文件到输出目录
-                            output_txt_path = os.path.join(output_dir, os.path.splitext(output_filename)[0] + ".txt")
-                            try:
-                                import shutil
-                                shutil.copy2(original_txt_path, output_txt_path)
-                                print(f"已复制txt文件: {original_txt_path} -> {output_txt_path}")
-                            except Exception as e:
-                                print(f"复制txt文件失败: {e}")
-                        
-                        # 复制可能存在的封面图片文件
-                        for img_ext in ['.jpg', '.jpeg', '.png', '.webp']:
-                            original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}{img_ext}")
-                            if not os.path.exists(original_img_path):
-                                original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}{img_ext}")
-                            
-                            if os.path.exists(original_img_path):
-                                output_img_path = os.path.join(output_dir, os.path.splitext(output_filename)[0] + img_ext)
-                                try:
-                                    import shutil
-                                    shutil.copy2(original_img_path, output_img_path)
-                                    print(f"已复制封面图片: {original_img_path} -> {output_img_path}")
-                                    break  # 只复制第一个找到的图片
-                                except Exception as e:
-                                    print(f"复制封面图片失败: {e}")
-                        
-                        # 记录处理成功的文件
-                        relative_output = os.path.join(folder_name, output_filename).replace('\\', '/')
-                        processed_files.append({
-                            'original': video_filename,
-                            'processed': relative_output
-                        })
-                        
-                        # 删除原视频文件
-                        try:
-                            original_video_path = os.path.join(os.getcwd(), 'downloads', folder_name, video_filename)
-                            if os.path.exists(original_video_path):
-                                os.remove(original_video_path)
-                                douyin_logger.info(f"已删除原视频文件: {original_video_path}")
-                            
-                            # 删除对应的txt文件
-                            if os.path.exists(original_txt_path):
-                                os.remove(original_txt_path)
-                                douyin_logger.info(f"已删除原视频txt文件: {original_txt_path}")
-                                
-                            # 删除对应的封面图片文件
-                            for img_ext in ['.jpg', '.jpeg', '.png', '.webp']:
-                                original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{decoded_name}{img_ext}")
-                                if not os.path.exists(original_img_path):
-                                    original_img_path = os.path.join(os.getcwd(), 'downloads', folder_name, f"{name}{img_ext}")
-                                
-                                if os.path.exists(original_img_path):
-                                    os.remove(original_img_path)
-                                    douyin_logger.info(f"已删除原视频封面图片: {original_img_path}")
-                                    break
-                            
-                            # 检查文件夹是否为空，如果为空则删除
-                            folder_path = os.path.join(os.getcwd(), 'downloads', folder_name)
-                            if os.path.exists(folder_path):
-                                remaining_files = os.listdir(folder_path)
-                                if not remaining_files:
-                                    os.rmdir(folder_path)
-                                    douyin_logger.info(f"文件夹已清空，删除空文件夹: {folder_path}")
-                        except Exception as e:
-                            douyin_logger.error(f"删除原文件失败: {str(e)}")
-                    else:
-                        failed_files.append(f'{video_filename}: {result.stderr}')
                 
-                except Exception as e:
-                    failed_files.append(f'{video_filename}: {str(e)}')
+                for video_filename in video_filenames:
+                    items.append((video_filename, {
+                        'folder': folder_name,
+                        'filename': video_filename,
+                        'settings': settings,
+                        'original': video_filename
+                    }))
             
-            # 返回批量处理结果
-            if processed_files:
-                message = f'成功处理 {len(processed_files)} 个视频'
-                if failed_files:
-                    message += f'，{len(failed_files)} 个视频处理失败'
-                
-                return jsonify({
-                    'success': True,
-                    'processed_files': processed_files,
-                    'failed_files': failed_files,
-                    'output_file': processed_files[0]['processed'] if len(processed_files) == 1 else '',  # 兼容单文件
-                    'message': message
-                })
-            else:
+            if not items:
                 return jsonify({
                     'error': f'所有视频处理失败: {"; ".join(failed_files)}'
                 }), 500
+            
+            # 提交到视频处理任务池并行处理
+            job = video_job_pool.submit(items, process_download_video)
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'total': len(items),
+                'failed_files': failed_files,
+                'message': f'已提交 {len(items)} 个视频处理任务'
+            }), 202
         
         else:
             # 表单请求 - 来自文件上传
@@ -1225,45 +1045,29 @@ def process_video():
             output_path = os.path.normpath(output_path)
             
             # 处理分屏自动选择逻辑
-            split_screen = settings.get('splitScreen', {})
-            if split_screen.get('enabled', False) and split_screen.get('direction') == 'auto':
-                # 获取视频信息以确定分屏方向
-                video_info = get_video_info(input_path)
-                if video_info:
-                    # 竖屏视频使用左右分屏，横屏视频使用上下分屏
-                    if video_info['is_portrait']:
-                        settings['splitScreen']['direction'] = 'horizontal'  # 左右分屏
-                        douyin_logger.info(f"检测到竖屏视频 ({video_info['width']}x{video_info['height']})，自动选择左右分屏")
-                    else:
-                        settings['splitScreen']['direction'] = 'vertical'    # 上下分屏
-                        douyin_logger.info(f"检测到横屏视频 ({video_info['width']}x{video_info['height']})，自动选择上下分屏")
-                else:
-                    # 无法获取视频信息时默认使用左右分屏
-                    settings['splitScreen']['direction'] = 'horizontal'
-                    douyin_logger.warning("无法获取视频信息，默认使用左右分屏")
+            resolve_split_screen_direction(settings, input_path)
             
             # 构建FFmpeg命令
             ffmpeg_cmd = build_ffmpeg_command(input_path, output_path, settings)
+            mode = get_processing_mode(ffmpeg_cmd)
             
             # 打印FFmpeg命令以便调试
-            douyin_logger.info(f"执行FFmpeg命令: {' '.join(ffmpeg_cmd)}")
+            douyin_logger.info(f"执行FFmpeg命令（{PROCESSING_MODE_NAMES[mode]}）: {' '.join(ffmpeg_cmd)}")
             
-            # 执行FFmpeg命令
-            import subprocess
-            try:
-                result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-            except UnicodeDecodeError:
-                # 如果UTF-8解码失败，尝试使用gbk编码
-                result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, encoding='gbk', errors='ignore')
+            # 执行FFmpeg命令，进度通过WebSocket推送
+            video_info = get_video_info(input_path)
+            returncode, stderr_tail = run_ffmpeg(
+                ffmpeg_cmd,
+                duration=video_info['duration'] if video_info else None,
+                on_progress=lambda progress: emit_video_process_progress(None, video_filename, progress)
+            )
             
-            # 打印FFmpeg执行结果
-            if result.stdout:
-                douyin_logger.info(f"FFmpeg输出: {result.stdout}")
-            if result.stderr:
-                douyin_logger.error(f"FFmpeg错误: {result.stderr}")
-            douyin_logger.info(f"FFmpeg返回码: {result.returncode}")
+            # 打印FFmpeg执行结果（失败时只记录stderr末尾）
+            douyin_logger.info(f"FFmpeg返回码: {returncode}")
+            if returncode != 0:
+                douyin_logger.error(f"FFmpeg错误: {stderr_tail}")
             
-            if result.returncode == 0:
+            if returncode == 0:
                 # 临时文件处理完成后删除
                 try:
                     import shutil
@@ -1275,16 +1079,37 @@ def process_video():
                 return jsonify({
                     'success': True,
                     'output_file': output_filename,
-                    'message': '视频处理完成'
+                    'mode': mode,
+                    'message': f'视频处理完成（{PROCESSING_MODE_NAMES[mode]}）'
                 })
             else:
                 return jsonify({
-                    'error': f'视频处理失败: {result.stderr}'
+                    'error': f'视频处理失败: {stderr_tail}'
                 }), 500
             
     except Exception as e:
         return jsonify({'error': f'处理错误: {str(e)}'}), 500
 
+@app.route('/api/video/jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """查询视频处理任务进度"""
+    job = video_job_pool.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    
+    job_data = job.to_dict()
+    files = job_data['files']
+    job_data['processed_files'] = [f['result'] for f in files if f['status'] == FILE_DONE]
+    job_data['failed_files'] = [f"{f['name']}: {f['error']}" for f in files if f['status'] == FILE_FAILED]
+    return jsonify({'success': True, **job_data})
+
+@app.route('/api/video/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_video_job(job_id):
+    """取消视频处理任务"""
+    if not video_job_pool.cancel(job_id):
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    return jsonify({'success': True, 'message': '任务已取消'})
+
 def get_video_info(video_path):
     """获取视频的基本信息（宽度、高度、时长等）"""
     import json
@@ -1304,7 +1129,8 @@ def get_video_info(video_path):
             if video_stream:
                 width = int(video_stream.get('width', 0))
                 height = int(video_stream.get('height', 0))
-                duration = float(video_stream.get('duration', 0))
+                # 部分容器（如mkv）的视频流没有时长，使用容器时长
+                duration = float(video_stream.get('duration') or data.get('format', {}).get('duration') or 0)
                 return {
                     'width': width,
                     'height': height,
@@ -1317,243 +1143,6 @@ def get_video_info(video_path):
     
     return None
 
-def build_ffmpeg_command(input_path, output_path, settings):
-    """构建FFmpeg命令"""
-    # 规范化路径格式，确保FFmpeg能正确处理包含中文的路径
-    input_path = os.path.normpath(input_path)
-    output_path = os.path.normpath(output_path)
-    
-    # 基础命令，稍后会根据AB帧融合添加更多输入
-    cmd = ['ffmpeg']
-    
-    # 强制禁用硬件加速，作为解决顽固崩溃的最终手段，提高稳定性
-    cmd.extend(['-hwaccel', 'none'])
-    
-    # 添加主输入文件
-    cmd.extend(['-i', input_path])
-    
-    # 检查AB帧融合是否需要额外的B视频输入
-    ab_fusion = settings.get('abFusion', {})
-    has_b_video = False
-    b_video_path = None
-    
-    if ab_fusion.get('enabled', False):
-        b_video_source = ab_fusion.get('bVideoSource', 'upload')
-        builtin_material = ab_fusion.get('builtinMaterial', '')
-        b_video_path = ab_fusion.get('bVideoPath')
-        
-        # 处理内置素材的路径
-        if b_video_source == 'builtin' and builtin_material:
-            b_video_path = builtin_material
-        
-        # 规范化B视频路径
-        if b_video_path:
-            b_video_path = os.path.normpath(b_video_path)
-            if os.path.exists(b_video_path):
-                cmd.extend(['-i', b_video_path])
-                has_b_video = True
-                douyin_logger.info(f"✅ 添加B视频输入: {b_video_path}")
-            else:
-                douyin_logger.warning(f"❌ B视频文件不存在: {b_video_path}")
-    
-    # --- 健壮的滤镜链构建 ---
-    video_filters = []
-    audio_filters = []
-    current_stream = "[0:v]"
-    stream_idx = 0
-
-    def get_next_stream_label():
-        nonlocal stream_idx
-        label = f"[v{stream_idx}]"
-        stream_idx += 1
-        return label
-
-    # 1. 抽帧 (已禁用以保持原始帧率)
-    frame_skip = settings.get('frameSkip', {})
-    if False:  # 禁用抽帧功能
-        skip_start = frame_skip.get('start', 25)
-        next_stream = get_next_stream_label()
-        video_filters.append(f"{current_stream}select=not(mod(n\\,{skip_start})){next_stream}")
-        current_stream = next_stream
-
-    # 2. 旋转和翻转
-    transform = settings.get('transform', {})
-    if not transform.get('keep_original', False):
-        rotation = transform.get('rotation', 0)
-        if rotation == 90:
-            next_stream = get_next_stream_label()
-            video_filters.append(f"{current_stream}transpose=1{next_stream}")
-            current_stream = next_stream
-        elif rotation == 180:
-            next_stream = get_next_stream_label()
-            video_filters.append(f"{current_stream}transpose=1,transpose=1{next_stream}")
-            current_stream = next_stream
-        elif rotation == 270:
-            next_stream = get_next_stream_label()
-            video_filters.append(f"{current_stream}transpose=2{next_stream}")
-            current_stream = next_stream
-        
-        if transform.get('flipH', False):
-            next_stream = get_next_stream_label()
-            video_filters.append(f"{current_stream}hflip{next_stream}")
-            current_stream = next_stream
-        
-        if transform.get('flipV', False):
-            next_stream = get_next_stream_label()
-            video_filters.append(f"{current_stream}vflip{next_stream}")
-            current_stream = next_stream
-
-    # 3. 画面调整
-    eq_filters = []
-    if settings.get('brightness', 0) != 0: eq_filters.append(f"brightness={settings.get('brightness', 0) / 100.0}")
-    if settings.get('contrast', 0) != 0: eq_filters.append(f"contrast={1 + settings.get('contrast', 0) / 100.0}")
-    if settings.get('saturation', 0) != 0: eq_filters.append(f"saturation={1 + settings.get('saturation', 0) / 100.0}")
-    if eq_filters:
-        next_stream = get_next_stream_label()
-        video_filters.append(f"{current_stream}eq={'_'.join(eq_filters)}{next_stream}")
-        current_stream = next_stream
-
-    # 4. 锐化
-    if settings.get('sharpen', 0) > 0:
-        sharpen_value = settings.get('sharpen', 0) / 100.0
-        next_stream = get_next_stream_label()
-        video_filters.append(f"{current_stream}unsharp=5:5:{sharpen_value}:5:5:0.0{next_stream}")
-        current_stream = next_stream
-
-    # 5. 降噪
-    if settings.get('denoise', 0) > 0:
-        denoise_value = settings.get('denoise', 0) / 100.0 * 10
-        next_stream = get_next_stream_label()
-        video_filters.append(f"{current_stream}hqdn3d={denoise_value}{next_stream}")
-        current_stream = next_stream
-        
-    # 6. 分辨率
-    resolution = settings.get('resolution', {})
-    if resolution.get('width') and resolution.get('height'):
-        width, height = resolution['width'], resolution['height']
-        if width != 'original' and height != 'original':
-            mode = resolution.get('mode', 'crop')
-            next_stream = get_next_stream_label()
-            if mode == 'stretch':
-                video_filters.append(f"{current_stream}scale={width}:{height}{next_stream}")
-            elif mode == 'crop':
-                video_filters.append(f"{current_stream}scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}{next_stream}")
-            elif mode == 'letterbox':
-                video_filters.append(f"{current_stream}scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black{next_stream}")
-            elif mode == 'pad':
-                 video_filters.append(f"{current_stream}scale={width}:{height}:force_original_aspect_ratio=decrease,gblur=sigma=20,scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}{next_stream}")
-            current_stream = next_stream
-            
-    # 7. 分屏效果
-    split_screen = settings.get('splitScreen', {})
-    if split_screen.get('enabled', False):
-        direction = split_screen.get('direction', 'vertical')
-        ratio = split_screen.get('ratio', 'equal')
-        blur = split_screen.get('blur', False)
-        blur_filter = f",boxblur=3.5:1" if blur else ""
-        next_stream = get_next_stream_label()
-        
-        split_graph = ""
-        if direction == 'vertical':
-            if ratio == 'equal':
-                split_graph = f"split=3[v_top_in][v_middle_in][v_bottom_in];[v_top_in]crop=iw:ih/2:0:0[c_top];[c_top]scale=iw:ih/3{blur_filter}[s_top];[v_middle_in]scale=iw:ih/3[s_middle];[v_bottom_in]crop=iw:ih/2:0:ih/2[c_bottom];[c_bottom]scale=iw:ih/3{blur_filter}[s_bottom];[s_top][s_middle][s_bottom]vstack=inputs=3{next_stream}"
-            elif ratio == 'center-large':
-                split_graph = f"split=3[v_top_in][v_middle_in][v_bottom_in];[v_top_in]crop=iw:ih/2:0:0[c_top];[c_top]scale=iw:ih/4{blur_filter}[s_top];[v_middle_in]scale=iw:ih/2[s_middle];[v_bottom_in]crop=iw:ih/2:0:ih/2[c_bottom];[c_bottom]scale=iw:ih/4{blur_filter}[s_bottom];[s_top][s_middle][s_bottom]vstack=inputs=3{next_stream}"
-            elif ratio == 'edges-large':
-                split_graph = f"split=3[v_top_in][v_middle_in][v_bottom_in];[v_top_in]crop=iw:ih/2:0:0[c_top];[c_top]scale=iw:3*ih/8{blur_filter}[s_top];[v_middle_in]scale=iw:ih/4[s_middle];[v_bottom_in]crop=iw:ih/2:0:ih/2[c_bottom];[c_bottom]scale=iw:3*ih/8{blur_filter}[s_bottom];[s_top][s_middle][s_bottom]vstack=inputs=3{next_stream}"
-        elif direction == 'horizontal':
-            if ratio == 'equal':
-                split_graph = f"split=3[v_left_in][v_middle_in][v_right_in];[v_left_in]crop=iw/2:ih:0:0[c_left];[c_left]scale=iw/3:ih{blur_filter}[s_left];[v_middle_in]scale=iw/3:ih[s_middle];[v_right_in]crop=iw/2:ih:iw/2:0[c_right];[c_right]scale=iw/3:ih{blur_filter}[s_right];[s_left][s_middle][s_right]hstack=inputs=3{next_stream}"
-            elif ratio == 'center-large':
-                split_graph = f"split=3[v_left_in][v_middle_in][v_right_in];[v_left_in]crop=iw/2:ih:0:0[c_left];[c_left]scale=iw/4:ih{blur_filter}[s_left];[v_middle_in]scale=iw/2:ih[s_middle];[v_right_in]crop=iw/2:ih:iw/2:0[c_right];[c_right]scale=iw/4:ih{blur_filter}[s_right];[s_left][s_middle][s_right]hstack=inputs=3{next_stream}"
-            elif ratio == 'edges-large':
-                split_graph = f"split=3[v_left_in][v_middle_in][v_right_in];[v_left_in]crop=iw/2:ih:0:0[c_left];[c_left]scale=3*iw/8:ih{blur_filter}[s_left];[v_middle_in]scale=iw/4:ih[s_middle];[v_right_in]crop=iw/2:ih:iw/2:0[c_right];[c_right]scale=3*iw/8:ih{blur_filter}[s_right];[s_left][s_middle][s_right]hstack=inputs=3{next_stream}"
-        
-        video_filters.append(f"{current_stream}{split_graph}")
-        current_stream = next_stream
-
-    # 8. 动态缩放
-    zoom = settings.get('zoom', {})
-    if zoom.get('enabled', False):
-        zoom_min = zoom.get('min', 0.01)
-        zoom_max = zoom.get('max', 0.10)
-        direction = zoom.get('direction', 'in')
-        next_stream = get_next_stream_label()
-        
-        zoom_expr = ""
-        if direction == 'in':
-            zoom_expr = f"zoompan=z='min(zoom+{zoom_max},1.5)':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)"
-        elif direction == 'out':
-            zoom_expr = f"zoompan=z='max(zoom-{zoom_max},1)':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)"
-        
-        video_filters.append(f"{current_stream}{zoom_expr}{next_stream}")
-        current_stream = next_stream
-
-    # AB帧融合和其他复杂滤镜可以按此模式继续添加...
-    # (为简化，此处暂不重构AB帧融合，因为它需要多路输入)
-
-    # --- 音频滤镜 ---
-    if ab_fusion.get('enabled', False) and ab_fusion.get('audioPhaseAdjust', False):
-        audio_filters.append('aeval=val(0)*0.9+val(1)*0.1:c=same')
-        douyin_logger.info("🎵 音频相位调整已启用")
-    
-    # --- 命令组装 ---
-
-    # 应用视频滤镜
-    if video_filters:
-        filter_complex_string = ";".join(video_filters)
-        cmd.extend(['-filter_complex', filter_complex_string])
-        cmd.extend(['-map', current_stream])
-        douyin_logger.info(f"应用视频滤镜链: {filter_complex_string}")
-    else:
-        cmd.extend(['-map', '0:v'])
-
-    # 应用音频滤镜或复制音频流
-    if audio_filters:
-        cmd.extend(['-af', ",".join(audio_filters)])
-        cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
-        cmd.extend(['-map', '0:a?'])
-        douyin_logger.info(f"应用音频滤镜: {','.join(audio_filters)}")
-    else:
-        # 如果有视频滤镜，即使不处理音频，也需要显式映射
-        cmd.extend(['-map', '0:a?'])
-        cmd.extend(['-c:a', 'copy'])
-
-    # 元数据伪装和关键帧修改（通常与AB融合相关）
-    if ab_fusion.get('enabled', False):
-        if ab_fusion.get('metadataDisguise', False):
-            timestamp = int(time.time())
-            cmd.extend([
-                '-metadata', f'title=Processed_Video_{timestamp}',
-                '-metadata', f'comment=Generated_at_{timestamp}'
-            ])
-            douyin_logger.info("🏷️  元数据伪装已启用")
-        
-        if ab_fusion.get('keyframeModify', False):
-            cmd.extend(['-g', '25', '-keyint_min', '12'])
-            douyin_logger.info("🔑 关键帧分布修改已启用")
-
-    # 帧率设置 (保持原始帧率)
-    framerate = settings.get('framerate', {})
-    if False:  # 禁用帧率修改
-        target_fps = framerate.get('target', 30)
-        cmd.extend(['-r', str(target_fps)])
-    
-    # 码率设置
-    bitrate = settings.get('bitrate', {})
-    if not bitrate.get('keep_original', False):
-        if bitrate.get('mode') == 'fixed':
-            fixed_bitrate = bitrate.get('fixed', 3000)
-            cmd.extend(['-b:v', f'{fixed_bitrate}k'])
-        else:
-            multiplier = (bitrate.get('min', 1.05) + bitrate.get('max', 1.95)) / 2
-            cmd.extend(['-q:v', str(int(28 / multiplier))])
-
-    # 输出设置
-    cmd.extend(['-y', output_path])
-    
-    return cmd
-
 @app.route('/test_status')
 def test_status():
     return send_from_directory('.', 'test_status.html')
@@ -1646,10 +1235,12 @@ def list_cookies():
             if f.endswith(".json"):
                 # 简单的名称处理，去掉.json后缀作为显示名称
                 display_name = f.replace('.json', '')
+                # 使用最近一次检测的缓存结果，未检测过的视为未过期
+                cached_valid = cookie_validator.get_cached(os.path.join("cookie", f))
                 cookies.append({
                     "filename": f,
                     "name": display_name,
-                    "expired": False  # 暂时设为False，可以后续添加过期检测逻辑
+                    "expired": cached_valid is False
                 })
     return jsonify({"cookies": cookies})
 
@@ -1666,11 +1257,9 @@ def generate_cookie():
     session_id = f"cookie_gen_{int(time.time())}"
     
     def gen_cookie_thread():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         try:
             # 使用带截图功能的cookie生成函数，传入代理ID
-            loop.run_until_complete(douyin_cookie_gen_with_screenshots(path, session_id, proxy_id))
+            browser_pool.run(douyin_cookie_gen_with_screenshots(path, session_id, proxy_id))
             
             # 如果指定了代理，生成cookie后自动分配代理关系
             if proxy_id:
@@ -1687,11 +1276,9 @@ def generate_cookie():
             return {"success": False, "message": f"生成cookie失败: {str(e)}"}
         finally:
             # 清理截图数据
-            if session_id in browser_screenshot_data:
-                del browser_screenshot_data[session_id]
+            browser_view_hub.clear_session(session_id)
             if session_id in active_browser_sessions:
                 del active_browser_sessions[session_id]
-            loop.close()
     
     thread = threading.Thread(target=gen_cookie_thread)
     thread.start()
@@ -1735,6 +1322,7 @@ def delete_cookie():
         
         # 删除文件
         os.remove(cookie_path)
+        cookie_validator.invalidate(cookie_path)
         douyin_logger.info(f"已删除cookie文件: {cookie_file}")
         
         # 同时删除对应的代理映射关系
@@ -1849,6 +1437,22 @@ def test_proxy(proxy_id):
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/api/proxies/health', methods=['GET'])
+def get_proxy_health():
+    """获取代理健康检查状态"""
+    return jsonify({"success": True, "checker": proxy_health_checker.get_status()})
+
+@app.route('/api/proxies/check', methods=['POST'])
+def check_all_proxies():
+    """立即检测所有代理"""
+    try:
+        if not proxy_health_checker.trigger():
+            # 未启用定时检测时单独执行一轮
+            threading.Thread(target=proxy_health_checker.run_once, daemon=True).start()
+        return jsonify({"success": True, "message": "已开始检测所有代理"})
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
 @app.route('/api/proxy_mappings', methods=['GET'])
 def get_proxy_mappings():
     """获取cookie-代理映射"""
@@ -1992,26 +1596,74 @@ def check_all_fingerprints():
 
 @app.route('/api/history', methods=['GET'])
 def api_history():
-    cookie = request.args.get('cookie')
-    rows = get_history(cookie)
-    success = sum(1 for r in rows if r[2] == 'success')
-    fail = sum(1 for r in rows if r[2] == 'fail')
+    """分页获取上传历史
     
-    # 只返回最近的10条记录，但保留总计数
-    limited_rows = rows[:10] if len(rows) > 10 else rows
+    参数: cookie/status/start/end(YYYY-MM-DD)筛选，cursor为上一页返回的next_cursor，limit为每页条数
+    第一页（不带cursor）同时返回按状态统计的数量
+    """
+    cookie = request.args.get('cookie') or None
+    status = request.args.get('status') or None
+    cursor = request.args.get('cursor') or None
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+        start_ts = end_ts = None
+        if request.args.get('start'):
+            start_ts = datetime.strptime(request.args['start'], '%Y-%m-%d').timestamp()
+        if request.args.get('end'):
+            # 结束日期包含当天
+            end_ts = (datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1)).timestamp()
+        records, next_cursor = get_history_page(cookie, status, start_ts, end_ts, cursor, limit)
+    except ValueError:
+        return jsonify({"success": False, "message": "无效的查询参数"}), 400
+    
+    response = {
+        "success": True,
+        "history": [{key: r[key] for key in ('filename', 'upload_time', 'status', 'reason', 'url', 'cookie_name')}
+                    for r in records],
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+    if not cursor:
+        summary = get_history_summary(cookie, status, start_ts, end_ts)
+        response.update({
+            "success_count": summary['counts'].get('success', 0),
+            "fail": summary['counts'].get('failed', 0),
+            "skipped": summary['counts'].get('skipped', 0),
+            "counts": summary['counts'],
+            "total": summary['total'],
+            "last_upload_time": summary['last_upload_time']
+        })
+    return jsonify(response)
+
+@app.route('/api/stats', methods=['GET'])
+def api_stats():
+    """上传统计时间序列（读取汇总表）
     
+    参数: granularity=hour|day，cookie为空时汇总所有账号，start/end为时段范围（YYYY-MM-DD 或 YYYY-MM-DD HH:00）
+    """
+    granularity = request.args.get('granularity', 'day')
+    try:
+        series = get_stats_series(granularity, request.args.get('cookie') or None,
+                                  request.args.get('start') or None, request.args.get('end') or None)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    totals = {key: sum(item[key] for item in series) for key in ('total', 'success', 'failed', 'skipped')}
+    attempted = totals['success'] + totals['failed']
+    totals['failure_rate'] = round(totals['failed'] / attempted, 4) if attempted else 0
     return jsonify({
-        "history": [dict(zip(['filename','upload_time','status','reason','url'], r)) for r in limited_rows],
-        "success": success,
-        "fail": fail,
-        "total": len(rows)  # 添加总记录数
+        "success": True,
+        "granularity": granularity,
+        "series": series,
+        "totals": totals
     })
 
 @app.route('/api/upload', methods=['POST'])
 def upload_videos():
     global is_uploading
     
-    if is_uploading:
+    # 停止后正在上传的视频会继续完成，协程全部退出前不能重新开始
+    if is_uploading or upload_scheduler.is_running("single"):
         return jsonify({"success": False, "message": "已有上传任务在进行中"}), 400
     
     data = request.json
@@ -2076,11 +1728,9 @@ def upload_videos():
     def check_cookie_validity():
         max_retries = 2
         for attempt in range(max_retries):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 from main import cookie_auth
-                result = loop.run_until_complete(cookie_auth(account_file))
+                result = browser_pool.run(cookie_auth(account_file))
                 douyin_logger.info(f"Cookie验证结果: {result} for {cookie} (尝试 {attempt + 1}/{max_retries})")
                 return result
             except Exception as e:
@@ -2104,13 +1754,12 @@ def upload_videos():
                     # 还有重试机会，等待一下再试
                     import time
                     time.sleep(1)
-            finally:
-                loop.close()
         
         # 理论上不会到达这里
         return False
     
-    if not check_cookie_validity():
+    # None 表示无法判断（风控拦截、页面超时等），继续上传
+    if check_cookie_validity() is False:
         # Cookie失效，跳过上传任务
         douyin_logger.warning(f"Cookie {cookie} 已失效，跳过上传任务")
         
@@ -2122,14 +1771,34 @@ def upload_videos():
             "skip_upload": True  # 标记为跳过上传
         })
     
-    # 启动批量上传线程
-    thread = threading.Thread(
-        target=batch_upload_thread,
-        args=(videos, account_file, location, publish_date, upload_interval, risk_limit)
-    )
-    thread.start()
+    # 调度前剔除已知的重复视频
+    duplicates = find_duplicate_videos(videos)
+    for video, reason in duplicates.items():
+        douyin_logger.warning(f"视频 {os.path.basename(video)} {reason}，已跳过")
+        log_upload_history(
+            cookie_name=cookie,
+            filename=os.path.basename(video),
+            status="skipped",
+            reason=reason
+        )
+    videos = [v for v in videos if v not in duplicates]
+    if not videos:
+        return jsonify({"success": False, "message": "上传队列中的视频均为重复视频", "skipped": duplicates}), 400
     
-    return jsonify({"success": True, "message": "上传任务已开始"})
+    # 提交到上传调度器
+    is_uploading = True
+    try:
+        upload_scheduler.start("single", lambda run: [
+            batch_upload_job(run, videos, account_file, location, publish_date, upload_interval, risk_limit)
+        ])
+    except RuntimeError as e:
+        is_uploading = False
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    message = "上传任务已开始"
+    if duplicates:
+        message += f"，已跳过 {len(duplicates)} 个重复视频"
+    return jsonify({"success": True, "message": message, "skipped": duplicates})
 
 @app.route('/api/upload_status')
 def upload_status():
@@ -2298,7 +1967,8 @@ def get_title_tags_from_txt(video_path):
                 return title, tags
     return os.path.splitext(os.path.basename(video_path))[0], []
 
-def batch_upload_thread(videos, account_file, location, publish_date, upload_interval=5, risk_limit=5):
+async def batch_upload_job(run, videos, account_file, location, publish_date, upload_interval=5, risk_limit=5):
+    """单账号批量上传协程，运行在上传调度器中"""
     global is_uploading, upload_tasks
     
     # 确保upload_interval是一个合法的整数
@@ -2322,29 +1992,31 @@ def batch_upload_thread(videos, account_file, location, publish_date, upload_int
     # 创建视频列表的副本，避免重复上传
     videos_to_upload = list(videos)  # 创建副本
     upload_tasks = [{"path": v, "name": os.path.basename(v), "status": "等待中"} for v in videos_to_upload]
+    cookie_name = os.path.basename(account_file)
+    
+    def set_task_status(video_path, status):
+        for task in upload_tasks:
+            if task["path"] == video_path:
+                task["status"] = status
+                break
     
     # 记录实际使用的上传间隔
-    print(f"[DEBUG] 批量上传开始: 视频数量={len(videos_to_upload)}, 上传间隔={upload_interval}分钟")
+    douyin_logger.info(f"批量上传开始: 视频数量={len(videos_to_upload)}, 上传间隔={upload_interval}分钟")
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         # 使用while循环而不是for循环，确保可以动态移除已上传的视频
-        while videos_to_upload:
-            print(f"[DEBUG] 当前要上传的视频列表: {[os.path.basename(v) for v in videos_to_upload]}")
-            # 风控检测
-            cookie_name = os.path.basename(account_file)
-            count = get_upload_count_last_hour(cookie_name)
-            if count >= risk_limit:
+        while videos_to_upload and not run.stopped:
+            # 风控检测：等待到窗口内最早的记录滑出一小时窗口为止
+            wait_seconds = get_rate_limit_wait_seconds(cookie_name, risk_limit)
+            if wait_seconds > 0:
                 # 更新所有任务状态为等待风控
-                wait_message = f"风控限制：每小时最多{risk_limit}个，已上传{count}个，等待中..."
-                douyin_logger.warning(f"账号 {cookie_name} 上传过于频繁，已自动延迟（每小时最多{risk_limit}个，已上传{count}个）")
+                wait_message = f"风控限制：每小时最多{risk_limit}个，{int(wait_seconds // 60) + 1}分钟后继续..."
+                douyin_logger.warning(f"账号 {cookie_name} 上传过于频繁，已自动延迟 {int(wait_seconds)} 秒（每小时最多{risk_limit}个）")
                 for task in upload_tasks:
                     if task["status"] == "等待中" or task["status"] == "上传中":
                         task["status"] = wait_message
-                # 等待一小时后再继续
-                time.sleep(60 * 60)  # 等待1小时
+                if not await run.sleep(wait_seconds):
+                    break
                 # 恢复等待状态
                 for task in upload_tasks:
                     if task["status"] == wait_message:
@@ -2353,12 +2025,7 @@ def batch_upload_thread(videos, account_file, location, publish_date, upload_int
             
             # 取出第一个视频进行上传
             video_path = videos_to_upload[0]
-            
-            # 更新状态
-            for task in upload_tasks:
-                if task["path"] == video_path:
-                    task["status"] = "上传中"
-                    break
+            set_task_status(video_path, "上传中")
             
             video_name = os.path.basename(video_path)
             title, tags = get_title_tags_from_txt(os.path.join("videos", video_path))
@@ -2366,55 +2033,48 @@ def batch_upload_thread(videos, account_file, location, publish_date, upload_int
             try:
                 # 创建状态更新回调函数
                 def update_status_callback(status_message):
-                    for task in upload_tasks:
-                        if task["path"] == video_path:
-                            task["status"] = status_message
-                            break
+                    set_task_status(video_path, status_message)
                 
-                upload_result = loop.run_until_complete(async_upload(video_path, account_file, title, tags, location, publish_date, update_status_callback))
+                # 扫码重新登录可能需要较长时间，在获取上传名额之前完成
+                upload_result, upload_duration = False, None
+                if await ensure_upload_login(account_file, update_status_callback):
+                    async with upload_scheduler.slot():
+                        upload_started = time.time()
+                        upload_result = await async_upload(video_path, account_file, title, tags, location, publish_date,
+                                                           update_status_callback, check_login=False)
+                        upload_duration = round(time.time() - upload_started, 1)
                 
                 # 根据上传结果更新状态
                 if upload_result:
-                    # 更新状态为完成
-                    for task in upload_tasks:
-                        if task["path"] == video_path:
-                            task["status"] = "上传成功"
-                            break
+                    set_task_status(video_path, "上传成功")
                     douyin_logger.info(f"[+] 视频 {video_name} 上传成功")
                     # 写入历史（成功）
                     log_upload_history(
-                        cookie_name=os.path.basename(account_file),
-                        filename=os.path.basename(video_path),
+                        cookie_name=cookie_name,
+                        filename=video_name,
                         status="success",
-                        reason="上传成功"
+                        reason="上传成功",
+                        duration=upload_duration
                     )
                 else:
                     # 检查是否是因为重复导致的失败
                     from utils.md5_manager import md5_manager
                     full_path = os.path.join("videos", video_path)
-                    if os.path.exists(full_path) and md5_manager.is_duplicate(full_path):
-                        # 更新状态为重复
-                        for task in upload_tasks:
-                            if task["path"] == video_path:
-                                task["status"] = "视频重复"
-                                break
+                    if os.path.exists(full_path) and await run_in_thread(md5_manager.is_duplicate, full_path):
+                        set_task_status(video_path, "视频重复")
                         douyin_logger.warning(f"视频 {video_name} 重复，已跳过")
                         log_upload_history(
-                            cookie_name=os.path.basename(account_file),
-                            filename=os.path.basename(video_path),
+                            cookie_name=cookie_name,
+                            filename=video_name,
                             status="skipped",
                             reason="视频重复"
                         )
                     else:
-                        # 更新状态为失败
-                        for task in upload_tasks:
-                            if task["path"] == video_path:
-                                task["status"] = "上传失败"
-                                break
+                        set_task_status(video_path, "上传失败")
                         douyin_logger.error(f"视频 {video_name} 上传失败")
                         log_upload_history(
-                            cookie_name=os.path.basename(account_file),
-                            filename=os.path.basename(video_path),
+                            cookie_name=cookie_name,
+                            filename=video_name,
                             status="failed",
                             reason="上传失败"
                         )
@@ -2425,20 +2085,17 @@ def batch_upload_thread(videos, account_file, location, publish_date, upload_int
                 # 如果还有视频要上传，并且上一个视频成功上传了（不是被跳过的），才等待间隔时间
                 if videos_to_upload and upload_result is not False:  # False表示视频被跳过或上传失败
                     douyin_logger.info(f"[+] 等待上传间隔 {upload_interval} 分钟后继续上传下一个视频")
-                    time.sleep(upload_interval * 60)
+                    if not await run.sleep(upload_interval * 60):
+                        break
                 elif videos_to_upload:
                     douyin_logger.info(f"[+] 跳过等待间隔，立即处理下一个视频")
                 
             except Exception as e:
                 douyin_logger.error(f"上传视频 {video_path} 时发生错误: {str(e)}")
-                # 更新状态为失败
-                for task in upload_tasks:
-                    if task["path"] == video_path:
-                        task["status"] = f"上传失败: {str(e)}"
-                        break
+                set_task_status(video_path, f"上传失败: {str(e)}")
                 log_upload_history(
-                    cookie_name=os.path.basename(account_file),
-                    filename=os.path.basename(video_path),
+                    cookie_name=cookie_name,
+                    filename=video_name,
                     status="failed",
                     reason=str(e)
                 )
@@ -2448,7 +2105,11 @@ def batch_upload_thread(videos, account_file, location, publish_date, upload_int
                 # 如果还有视频要上传，等待指定的间隔时间
                 if videos_to_upload:
                     douyin_logger.info(f"[+] 等待上传间隔 {upload_interval} 分钟后继续上传下一个视频")
-                    time.sleep(upload_interval * 60)
+                    if not await run.sleep(upload_interval * 60):
+                        break
+        
+        if run.stopped:
+            douyin_logger.info(f"账号 {cookie_name} 的批量上传已停止")
         
     except Exception as e:
         douyin_logger.error(f"批量上传任务失败: {str(e)}")
@@ -2458,10 +2119,23 @@ def batch_upload_thread(videos, account_file, location, publish_date, upload_int
                 task["status"] = f"任务失败: {str(e)}"
     finally:
         is_uploading = False
-        if loop and not loop.is_closed():
-            loop.close()
 
-async def async_upload(file_path, account_file, title, tags, location, publish_date, status_callback=None):
+async def ensure_upload_login(account_file, status_callback=None):
+    """上传前验证登录状态，cookie失效时通过WebSocket扫码重新登录
+
+    需要在获取上传名额之前调用，扫码登录期间不占用全局上传名额
+    """
+    if status_callback:
+        status_callback("验证登录中...")
+    try:
+        return await douyin_setup(account_file, handle=True, use_websocket=True, websocket_callback=douyin_cookie_gen_with_screenshots)
+    except Exception as e:
+        douyin_logger.error(f"验证登录状态失败: {str(e)}")
+        return False
+
+async def async_upload(file_path, account_file, title, tags, location, publish_date, status_callback=None,
+                       check_login=True):
+    """上传单个视频，check_login 为False时调用方已在获取上传名额前验证过登录状态"""
     full_path = os.path.join("videos", file_path)
     
     if status_callback:
@@ -2469,67 +2143,60 @@ async def async_upload(file_path, account_file, title, tags, location, publish_d
     
     # 导入MD5管理器并检查视频是否重复
     from utils.md5_manager import md5_manager
-    if md5_manager.is_duplicate(full_path):
+    if await run_in_thread(md5_manager.is_duplicate, full_path):
         if status_callback:
             status_callback("视频重复，跳过上传")
         douyin_logger.warning(f"检测到重复视频，跳过上传: {os.path.basename(full_path)}")
         return False  # 视频重复，返回上传失败
     
-    if status_callback:
-        status_callback("验证登录中...")
-    
     try:
-        ok = await douyin_setup(account_file, handle=True, use_websocket=True, websocket_callback=douyin_cookie_gen_with_screenshots)
-        if not ok:
+        if check_login and not await ensure_upload_login(account_file, status_callback):
             raise Exception("cookie文件无效或登录失败")
             
-        async with asyncio.Semaphore(1):
-            from playwright.async_api import async_playwright
-            async with async_playwright() as playwright:
+        if status_callback:
+            status_callback("准备上传中...")
+        
+        video = DouYinVideo(
+            title=title, 
+            file_path=full_path, 
+            tags=tags, 
+            publish_date=publish_date, 
+            account_file=account_file, 
+            thumbnail_path=None
+        )
+        
+        class StatusHandler:
+            @staticmethod
+            async def handle_event(event, message):
                 if status_callback:
-                    status_callback("准备上传中...")
-                
-                video = DouYinVideo(
-                    title=title, 
-                    file_path=full_path, 
-                    tags=tags, 
-                    publish_date=publish_date, 
-                    account_file=account_file, 
-                    thumbnail_path=None
-                )
-                
-                class StatusHandler:
-                    @staticmethod
-                    async def handle_event(event, message):
-                        if status_callback:
-                            if event == "upload_start":
-                                status_callback("开始上传视频...")
-                            elif event == "upload_progress":
-                                status_callback(f"上传中: {message}")
-                            elif event == "upload_complete":
-                                status_callback("视频上传完成")
-                            elif event == "upload_failed":
-                                status_callback(f"上传失败: {message}")
-                            elif event == "duplicate_detected":  # 新增事件处理
-                                status_callback(f"视频重复: {message}")
-                            elif event == "publish_start":
-                                status_callback("开始发布...")
-                            elif event == "publish_complete":
-                                status_callback("发布完成")
-                            else:
-                                status_callback(message)
-                
-                # 添加状态处理器
-                video.status_handler = StatusHandler()
-                upload_result = await video.main()  # 使用改进后的main方法，会自动记录MD5
-                
-                # 如果是由于视频重复导致的跳过，会返回False
-                if upload_result is False:
-                    if status_callback:
-                        status_callback("视频已存在，已跳过上传")
-                    return False
-                
-                return upload_result  # 返回上传结果
+                    if event == "upload_start":
+                        status_callback("开始上传视频...")
+                    elif event == "upload_progress":
+                        status_callback(f"上传中: {message}")
+                    elif event == "upload_complete":
+                        status_callback("视频上传完成")
+                    elif event == "upload_failed":
+                        status_callback(f"上传失败: {message}")
+                    elif event == "duplicate_detected":  # 新增事件处理
+                        status_callback(f"视频重复: {message}")
+                    elif event == "publish_start":
+                        status_callback("开始发布...")
+                    elif event == "publish_complete":
+                        status_callback("发布完成")
+                    else:
+                        status_callback(message)
+        
+        # 添加状态处理器
+        video.status_handler = StatusHandler()
+        upload_result = await video.main()  # 使用改进后的main方法，会自动记录MD5
+        
+        # 如果是由于视频重复导致的跳过，会返回False
+        if upload_result is False:
+            if status_callback:
+                status_callback("视频已存在，已跳过上传")
+            return False
+        
+        return upload_result  # 返回上传结果
     except Exception as e:
         douyin_logger.error(f"上传过程中发生错误: {str(e)}")
         if status_callback:
@@ -2560,7 +2227,6 @@ async def douyin_cookie_gen_with_screenshots(account_file, session_id, proxy_id=
     from utils.proxy_manager import proxy_manager
     from utils.base_social_media import set_init_script
     from utils.fingerprint_manager import fingerprint_manager
-    from playwright.async_api import async_playwright
     
     from main import get_browser_launch_options
     
@@ -2597,115 +2263,140 @@ async def douyin_cookie_gen_with_screenshots(account_file, session_id, proxy_id=
         # 通知前端cookie失效，需要重新登录
         notify_cookie_expired(account_file, session_id)
 
-    async with async_playwright() as playwright:
-        try:
-            print(f"🚀 启动浏览器: headless={headless_mode}, session_id={session_id}")
-            douyin_logger.info(f"启动浏览器配置: {options}")
-            browser = await playwright.chromium.launch(**options)
+    # 使用指纹配置创建上下文
+    context_options = {
+        **fingerprint_config
+    }
+    
+    # 添加代理配置
+    if proxy_config:
+        context_options["proxy"] = proxy_config
+
+    print(f"🚀 启动浏览器: headless={headless_mode}, session_id={session_id}")
+    douyin_logger.info(f"启动浏览器配置: {options}")
+    try:
+        async with browser_pool.context(options, context_options) as context:
             print(f"✅ 浏览器启动成功")
-        except Exception as e:
-            error_msg = f"浏览器启动失败: {str(e)}"
-            print(f"❌ {error_msg}")
-            douyin_logger.error(error_msg)
-            socketio.emit('browser_status', {
-                'session_id': session_id,
-                'status': 'error',
-                'message': error_msg
-            })
-            return
-        
-        # 使用指纹配置创建上下文
-        context_options = {
-            **fingerprint_config
-        }
-        
-        # 添加代理配置
-        if proxy_config:
-            context_options["proxy"] = proxy_config
-            
-        context = await browser.new_context(**context_options)
-        context = await set_init_script(context, cookie_filename)
-        page = await context.new_page()
+            context = await set_init_script(context, cookie_filename)
+            page = await context.new_page()
         
-        # 线程安全地标记会话为活跃状态
-        with browser_data_lock:
-            active_browser_sessions[session_id] = True
-            browser_pages[session_id] = page  # 存储页面对象用于点击操作
-            browser_click_queue[session_id] = []  # 初始化点击队列
+            # 线程安全地标记会话为活跃状态
+            with browser_data_lock:
+                active_browser_sessions[session_id] = True
+                browser_pages[session_id] = page  # 存储页面对象用于点击操作
+                browser_input_queues[session_id] = asyncio.Queue(maxsize=MAX_CLICK_QUEUE_SIZE)  # 初始化点击/输入队列
         
-        # 启动截图和点击处理任务（降低截图频率提升性能）
-        screenshot_task = asyncio.create_task(capture_screenshots(page, session_id, interval=0.5))
-        click_task = asyncio.create_task(handle_click_events(page, session_id))
+            # 启动截图和点击处理任务（降低截图频率提升性能）
+            screenshot_task = asyncio.create_task(capture_screenshots(page, session_id, interval=0.5))
+            click_task = asyncio.create_task(handle_click_events(page, session_id, browser_input_queues[session_id]))
         
-        try:
-            print(f"🌐 开始加载抖音页面...")
-            await page.goto("https://creator.douyin.com/", timeout=30000)
-            print(f"✅ 抖音页面加载成功")
+            try:
+                print(f"🌐 开始加载抖音页面...")
+                await page.goto("https://creator.douyin.com/", timeout=30000)
+                print(f"✅ 抖音页面加载成功")
             
-            # 通知前端浏览器已启动
-            socketio.emit('browser_status', {
-                'session_id': session_id,
-                'status': 'browser_opened',
-                'message': '浏览器已启动，页面加载完成，开始截图传输'
-            })
+                # 通知前端浏览器已启动
+                browser_view_hub.emit_status(session_id, {
+                    'status': 'browser_opened',
+                    'message': '浏览器已启动，页面加载完成，开始画面传输'
+                })
             
-            # 等待会话关闭（不再使用page.pause()，而是监听会话状态）
-            while active_browser_sessions.get(session_id, False):
-                await asyncio.sleep(1)
+                # 等待会话关闭（不再使用page.pause()，而是监听会话状态）
+                while active_browser_sessions.get(session_id, False):
+                    await asyncio.sleep(1)
             
-            # 会话关闭时自动保存cookie
-            try:
-                await context.storage_state(path=account_file)
-                douyin_logger.info(f"浏览器关闭，已自动保存Cookie到: {account_file}")
+                # 会话关闭时自动保存cookie
+                try:
+                    await context.storage_state(path=account_file)
+                    douyin_logger.info(f"浏览器关闭，已自动保存Cookie到: {account_file}")
                 
-                # 通知前端Cookie生成完成
-                socketio.emit('browser_status', {
-                    'session_id': session_id,
-                    'status': 'cookie_saved',
-                    'message': 'Cookie已保存成功'
-                })
+                    # 通知前端Cookie生成完成
+                    browser_view_hub.emit_status(session_id, {
+                        'status': 'cookie_saved',
+                        'message': 'Cookie已保存成功'
+                    })
+                except Exception as e:
+                    douyin_logger.error(f"保存Cookie失败: {str(e)}")
+                    browser_view_hub.emit_status(session_id, {
+                        'status': 'error',
+                        'message': f'保存Cookie失败: {str(e)}'
+                    })
+            
             except Exception as e:
-                douyin_logger.error(f"保存Cookie失败: {str(e)}")
-                socketio.emit('browser_status', {
-                    'session_id': session_id,
+                douyin_logger.error(f"Cookie生成过程出错: {str(e)}")
+                browser_view_hub.emit_status(session_id, {
                     'status': 'error',
-                    'message': f'保存Cookie失败: {str(e)}'
+                    'message': f'生成过程出错: {str(e)}'
                 })
-            
-        except Exception as e:
-            douyin_logger.error(f"Cookie生成过程出错: {str(e)}")
-            socketio.emit('browser_status', {
-                'session_id': session_id,
-                'status': 'error',
-                'message': f'生成过程出错: {str(e)}'
-            })
-        finally:
-            # 线程安全地停止截图和点击处理
-            with browser_data_lock:
-                active_browser_sessions[session_id] = False
+            finally:
+                # 线程安全地停止截图和点击处理
+                with browser_data_lock:
+                    active_browser_sessions[session_id] = False
                 
-                # 清理会话数据
-                try:
-                    if session_id in browser_pages:
-                        del browser_pages[session_id]
-                    if session_id in browser_click_queue:
-                        del browser_click_queue[session_id]
-                    if session_id in browser_screenshot_data:
-                        del browser_screenshot_data[session_id]
-                except KeyError:
-                    pass  # 资源已经被清理
-            
-            screenshot_task.cancel()
-            click_task.cancel()
+                    # 清理会话数据
+                    try:
+                        if session_id in browser_pages:
+                            del browser_pages[session_id]
+                        if session_id in browser_input_queues:
+                            del browser_input_queues[session_id]
+                    except KeyError:
+                        pass  # 资源已经被清理
             
-            try:
-                await browser.close()
-                douyin_logger.info(f"浏览器已关闭: {session_id}")
-            except Exception as e:
-                douyin_logger.error(f"关闭浏览器时出错: {str(e)}")
+                screenshot_task.cancel()
+                click_task.cancel()
+            douyin_logger.info(f"浏览器会话已结束: {session_id}")
+    except Exception as e:
+        error_msg = f"浏览器启动失败: {str(e)}"
+        print(f"❌ {error_msg}")
+        douyin_logger.error(error_msg)
+        browser_view_hub.emit_status(session_id, {
+            'status': 'error',
+            'message': error_msg
+        })
 
 async def capture_screenshots(page, session_id, interval=0.5):
-    """捕获页面截图并通过WebSocket发送"""
+    """推送浏览器画面：优先使用CDP画面推送，不可用时回退到定时截图；没有客户端观看时暂停"""
+    if BROWSER_SCREENCAST_ENABLED:
+        screencast = PageScreencast(page, lambda data, metadata: publish_screencast_frame(session_id, data, metadata))
+        if await screencast.start():
+            douyin_logger.info(f"已启动CDP画面推送: {session_id}")
+            try:
+                while True:
+                    with browser_data_lock:
+                        if not active_browser_sessions.get(session_id, False):
+                            break
+                    viewers = browser_view_hub.viewer_count(session_id)
+                    if viewers == 0 and screencast.running:
+                        await screencast.stop()
+                        douyin_logger.info(f"会话 {session_id} 没有观看者，暂停画面推送")
+                    elif viewers > 0 and not screencast.running:
+                        await screencast.start()
+                        douyin_logger.info(f"会话 {session_id} 有 {viewers} 个观看者，恢复画面推送")
+                    await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                douyin_logger.info(f"画面推送任务已取消: {session_id}")
+            finally:
+                await screencast.stop()
+                douyin_logger.info(f"CDP画面推送已停止: {session_id}, 共推送 {screencast.frames} 帧")
+                browser_view_hub.clear_session(session_id)
+            return
+        douyin_logger.warning(f"CDP画面推送不可用，回退到定时截图: {session_id}")
+    
+    await poll_screenshots(page, session_id, interval)
+
+def publish_screencast_frame(session_id, data, metadata):
+    """发布CDP画面帧（data为base64编码的JPEG，解码后以二进制发送）"""
+    browser_view_hub.publish_frame(
+        session_id,
+        base64.b64decode(data),
+        mime='image/jpeg',
+        width=metadata.get('deviceWidth'),
+        height=metadata.get('deviceHeight'),
+        timestamp=metadata.get('timestamp')
+    )
+
+async def poll_screenshots(page, session_id, interval=0.5):
+    """定时捕获页面截图并通过WebSocket发送（CDP画面推送不可用时使用）"""
     last_screenshot_hash = None
     try:
         while True:
@@ -2713,6 +2404,11 @@ async def capture_screenshots(page, session_id, interval=0.5):
             with browser_data_lock:
                 if not active_browser_sessions.get(session_id, False):
                     break
+            
+            # 没有客户端观看时不截图
+            if browser_view_hub.viewer_count(session_id) == 0:
+                await asyncio.sleep(interval)
+                continue
                     
             try:
                 # 截图（完整页面显示）
@@ -2728,25 +2424,9 @@ async def capture_screenshots(page, session_id, interval=0.5):
                 screenshot_hash = hashlib.md5(screenshot).hexdigest()
                 
                 if screenshot_hash != last_screenshot_hash:
-                    # 转换为base64
-                    screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
-                    screenshot_data = {
-                        'data': f"data:image/png;base64,{screenshot_b64}",
-                        'timestamp': time.time()
-                    }
-                    
-                    # 线程安全存储到全局变量
-                    with browser_data_lock:
-                        browser_screenshot_data[session_id] = screenshot_data
-                    
-                    # 发送到所有连接的客户端
+                    # 以二进制发送给订阅该会话的客户端
                     print(f"📸 发送新截图到客户端: session_id={session_id}, 数据大小={len(screenshot)} bytes")
-                    socketio.emit('browser_screenshot', {
-                        'session_id': session_id,
-                        'screenshot': screenshot_data['data'],
-                        'timestamp': screenshot_data['timestamp']
-                    })
-                    
+                    browser_view_hub.publish_frame(session_id, screenshot, mime='image/png')
                     last_screenshot_hash = screenshot_hash
                 else:
                     print(f"⏭️ 跳过重复截图: session_id={session_id}")
@@ -2765,22 +2445,28 @@ async def capture_screenshots(page, session_id, interval=0.5):
         douyin_logger.info(f"截图任务已取消: {session_id}")
     finally:
         # 清理截图数据
-        with browser_data_lock:
-            if session_id in browser_screenshot_data:
-                del browser_screenshot_data[session_id]
+        browser_view_hub.clear_session(session_id)
 
-async def handle_click_events(page, session_id, interval=0.1):
-    """处理前端发送的点击和输入事件"""
+def _is_type_event(event):
+    return event.get('type') == 'input' and event.get('action') == 'type' and bool(event.get('text'))
+
+async def handle_click_events(page, session_id, queue):
+    """处理前端发送的点击和输入事件（事件到达时立即唤醒，连续的文本输入合并为一次输入）"""
+    pending = None
     try:
         while True:
-            # 线程安全检查会话状态和事件队列
-            event = None
-            with browser_data_lock:
-                if not active_browser_sessions.get(session_id, False):
-                    break
-                # 检查是否有待处理的事件
-                if session_id in browser_click_queue and browser_click_queue[session_id]:
-                    event = browser_click_queue[session_id].pop(0)
+            event = pending if pending is not None else await queue.get()
+            pending = None
+            
+            # 合并队列中紧随其后的文本输入事件
+            if _is_type_event(event):
+                while not queue.empty():
+                    next_event = queue.get_nowait()
+                    if _is_type_event(next_event) and len(event['text']) + len(next_event['text']) <= MAX_INPUT_TEXT_LENGTH:
+                        event = {**event, 'text': event['text'] + next_event['text']}
+                    else:
+                        pending = next_event
+                        break
             
             if event:
                 try:
@@ -2792,12 +2478,12 @@ async def handle_click_events(page, session_id, interval=0.1):
                         await page.mouse.click(x, y)
                         douyin_logger.info(f"执行点击操作: ({x}, {y}) for session {session_id}")
                         
-                        socketio.emit('click_executed', {
+                        browser_view_hub.emit('click_executed', {
                             'session_id': session_id,
                             'x': x,
                             'y': y,
                             'message': f'已点击位置: ({x}, {y})'
-                        })
+                        }, session_id)
                         
                     elif event['type'] == 'input':
                         # 处理输入事件
@@ -2810,24 +2496,24 @@ async def handle_click_events(page, session_id, interval=0.1):
                             await page.keyboard.type(text)
                             douyin_logger.info(f"输入文本: '{text}' for session {session_id}")
                             
-                            socketio.emit('input_executed', {
+                            browser_view_hub.emit('input_executed', {
                                 'session_id': session_id,
                                 'action': action,
                                 'text': text,
                                 'message': f'已输入: {text}'
-                            })
+                            }, session_id)
                             
                         elif action == 'press' and key:
                             # 按键操作
                             await page.keyboard.press(key)
                             douyin_logger.info(f"按键操作: '{key}' for session {session_id}")
                             
-                            socketio.emit('input_executed', {
+                            browser_view_hub.emit('input_executed', {
                                 'session_id': session_id,
                                 'action': action,
                                 'key': key,
                                 'message': f'已按键: {key}'
-                            })
+                            }, session_id)
                             
                         elif action == 'clear':
                             # 清空输入框 (Ctrl+A + Delete)
@@ -2835,15 +2521,13 @@ async def handle_click_events(page, session_id, interval=0.1):
                             await page.keyboard.press('Delete')
                             douyin_logger.info(f"清空输入框 for session {session_id}")
                             
-                            socketio.emit('input_executed', {
+                            browser_view_hub.emit('input_executed', {
                                 'session_id': session_id,
                                 'action': action,
                                 'message': '已清空输入框'
-                            })
+                            }, session_id)
                 except Exception as e:
                     douyin_logger.error(f"执行操作失败: {str(e)}")
-            
-            await asyncio.sleep(interval)
                 
     except asyncio.CancelledError:
         douyin_logger.info(f"事件处理任务已取消: {session_id}")
@@ -2872,16 +2556,13 @@ def validate_cookie(cookie_name):
         
         # 异步验证cookie
         def check_cookie():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 from main import cookie_auth
-                result = loop.run_until_complete(cookie_auth(account_file))
+                # 手动验证时跳过缓存，重新探测
+                result = browser_pool.run(cookie_auth(account_file, use_cache=False))
                 return result, None
             except Exception as e:
                 return False, str(e)
-            finally:
-                loop.close()
         
         is_valid, error = check_cookie()
         
@@ -2897,6 +2578,8 @@ def validate_cookie(cookie_name):
             
         if is_valid:
             response_data["message"] = "Cookie有效"
+        elif is_valid is None:
+            response_data["message"] = "暂时无法判断Cookie状态，请稍后重试"
         else:
             response_data["message"] = "Cookie已失效"
             
@@ -2912,13 +2595,19 @@ def validate_cookie(cookie_name):
 @app.route('/api/multi_tasks', methods=['GET'])
 def get_multi_tasks():
     """获取多账号任务列表"""
-    # 添加调试日志
-    for task in multi_account_tasks:
-        douyin_logger.debug(f"任务状态 - ID: {task['id']}, Cookie: {task['cookie']}, Status: {task['status']}, Completed: {task['completed_videos']}/{task['total_videos']}")
+    tasks = task_store.get_tasks()
+    
+    # 运行中的任务以内存中的实时状态为准（上传进度只保存在内存中）
+    live_tasks = {task["id"]: task for task in multi_account_tasks}
+    for task in tasks:
+        live_task = live_tasks.get(task["id"])
+        if live_task:
+            task["status"] = live_task.get("status", task["status"])
+            task["current_video"] = live_task.get("current_video", task["current_video"])
     
     return jsonify({
         "success": True,
-        "tasks": multi_account_tasks,
+        "tasks": tasks,
         "is_uploading": is_multi_uploading,
         "upload_mode": upload_mode,
         "current_task_index": current_task_index
@@ -2930,8 +2619,7 @@ def add_multi_task():
     try:
         data = request.json
         
-        task = {
-            "id": len(multi_account_tasks) + 1,
+        task_id = task_store.add_task({
             "cookie": data.get('cookie'),
             "videos": data.get('videos', []),
             "location": data.get('location', '杭州市'),
@@ -2941,20 +2629,15 @@ def add_multi_task():
             "publish_date": data.get('publish_date'),
             "publish_hour": data.get('publish_hour'),
             "publish_minute": data.get('publish_minute'),
-            "status": "waiting",  # waiting, uploading, completed, failed
-            "completed_videos": 0,
-            "total_videos": len(data.get('videos', [])),
-            "current_video": None,
             "created_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        })
         
-        multi_account_tasks.append(task)
-        save_multi_tasks_to_file()  # 保存到文件
+        multi_account_tasks.append(task_store.get_task(task_id))
         
         return jsonify({
             "success": True,
             "message": "任务添加成功",
-            "task_id": task["id"]
+            "task_id": task_id
         })
         
     except Exception as e:
@@ -2969,19 +2652,12 @@ def delete_multi_task(task_id):
     if is_multi_uploading:
         return jsonify({"success": False, "message": "上传进行中，无法删除任务"}), 400
     
-    # 查找并删除任务
-    task_index = None
-    for i, task in enumerate(multi_account_tasks):
-        if task["id"] == task_id:
-            task_index = i
-            break
-    
-    if task_index is not None:
-        removed_task = multi_account_tasks.pop(task_index)
-        save_multi_tasks_to_file()  # 保存到文件
+    task = task_store.get_task(task_id)
+    if task and task_store.delete_task(task_id):
+        multi_account_tasks = [t for t in multi_account_tasks if t["id"] != task_id]
         return jsonify({
             "success": True,
-            "message": f"已删除账号 {removed_task['cookie']} 的任务"
+            "message": f"已删除账号 {task['cookie']} 的任务"
         })
     else:
         return jsonify({"success": False, "message": "任务不存在"}), 404
@@ -2994,8 +2670,8 @@ def clear_multi_tasks():
     if is_multi_uploading:
         return jsonify({"success": False, "message": "上传进行中，无法清空任务"}), 400
     
-    multi_account_tasks.clear()
-    save_multi_tasks_to_file()  # 保存到文件
+    task_store.clear_tasks()
+    multi_account_tasks = []
     return jsonify({"success": True, "message": "已清空所有任务"})
 
 @app.route('/api/multi_upload', methods=['POST'])
@@ -3003,7 +2679,8 @@ def start_multi_upload():
     """开始多账号上传"""
     global is_multi_uploading, upload_mode, current_task_index
     
-    if is_multi_uploading:
+    # 停止后正在上传的视频会继续完成，协程全部退出前不能重新开始
+    if is_multi_uploading or upload_scheduler.is_running("multi"):
         return jsonify({"success": False, "message": "多账号上传已在进行中"}), 400
     
     if not multi_account_tasks:
@@ -3011,35 +2688,49 @@ def start_multi_upload():
     
     data = request.json
     upload_mode = data.get('mode', 'sequential')  # sequential 或 concurrent
+    restart = bool(data.get('restart'))  # 用户明确要求重新开始时重置全部作业
+    
+    # 重新从任务存储加载，保证作业状态准确
+    load_multi_tasks()
     
     # 处理任务状态（支持续传）
     for task in multi_account_tasks:
-        # 如果任务是stopped状态，保留已完成的视频数量，实现续传
-        if task["status"] == "stopped":
-            douyin_logger.info(f"检测到已停止的任务: {task['cookie']}，已完成 {task['completed_videos']}/{len(task['videos'])} 个视频，将从断点继续")
-            update_task_status(task, "waiting", f"准备从第 {task['completed_videos']+1} 个视频继续上传", save_to_file=False)
-        else:
-            # 其他状态重置计数
+        if restart or task["status"] == "completed":
+            # 重新开始或已完成的任务重置所有作业
+            task_store.reset_jobs(task["id"])
             task["completed_videos"] = 0
-            update_task_status(task, "waiting", None, save_to_file=False)
-    save_multi_tasks_to_file()  # 批量保存
+            update_task_status(task, "waiting", None, persist=False)
+        else:
+            # 已停止、失败或程序中断时处于上传中/等待中的任务：保留已完成的作业，失败的作业重试，
+            # 完成数以作业记录为准
+            task_store.retry_failed_jobs(task["id"])
+            task["completed_videos"] = task_store.count_finished_jobs(task["id"])
+            douyin_logger.info(f"继续任务: {task['cookie']}，已完成 {task['completed_videos']}/{len(task['videos'])} 个视频，将从断点继续")
+            update_task_status(task, "waiting", f"准备从第 {task['completed_videos']+1} 个视频继续上传", persist=False)
+        
+        # 调度前跳过已知的重复视频
+        skipped = task_store.skip_pending_jobs(task["id"], find_duplicate_videos(task_store.get_pending_videos(task["id"])))
+        if skipped:
+            task["completed_videos"] = task_store.count_finished_jobs(task["id"])
+            douyin_logger.info(f"任务 {task['cookie']} 已跳过 {skipped} 个重复视频")
+    save_multi_tasks()  # 批量保存
     
     current_task_index = 0
     is_multi_uploading = True
     
-    # 启动上传线程
-    if upload_mode == "concurrent":
-        # 并发模式：为每个账号启动独立线程
-        for task in multi_account_tasks:
-            thread = threading.Thread(
-                target=multi_account_upload_thread,
-                args=(task,)
-            )
-            thread.start()
-    else:
-        # 轮询模式：启动单个协调线程
-        thread = threading.Thread(target=sequential_upload_coordinator)
-        thread.start()
+    # 提交到上传调度器
+    try:
+        if upload_mode == "concurrent":
+            # 并发模式：每个账号一个协程，由调度器统一限制并发上传数
+            upload_scheduler.start("multi", lambda run: [
+                multi_account_upload_job(run, task) for task in multi_account_tasks
+            ])
+        else:
+            # 轮询模式：单个协程在账号之间轮询
+            upload_scheduler.start("multi", lambda run: [sequential_upload_job(run)])
+    except RuntimeError as e:
+        is_multi_uploading = False
+        return jsonify({"success": False, "message": str(e)}), 400
     
     return jsonify({
         "success": True,
@@ -3053,18 +2744,29 @@ def stop_multi_upload():
     global is_multi_uploading
     
     is_multi_uploading = False
+    upload_scheduler.stop("multi")
     
     # 更新所有任务状态为已停止（不仅仅是正在上传的）
     for task in multi_account_tasks:
         if task["status"] in ["uploading", "waiting"]:
-            update_task_status(task, "stopped", "已手动停止", save_to_file=False)
+            update_task_status(task, "stopped", "已手动停止", persist=False)
             douyin_logger.info(f"手动停止任务: {task['cookie']}, 状态从 {task['status']} 更改为 stopped")
-    save_multi_tasks_to_file()  # 批量保存
+    save_multi_tasks()  # 批量保存
     
     return jsonify({"success": True, "message": "多账号上传已停止"})
 
-def multi_account_upload_thread(task):
-    """单个账号的上传线程"""
+def parse_task_publish_date(task):
+    """解析任务的定时发布时间，立即发布返回0，格式错误返回None"""
+    if task["publish_type"] != 'schedule':
+        return 0
+    try:
+        publish_time = f"{task['publish_date']} {task['publish_hour']}:{task['publish_minute']}"
+        return datetime.strptime(publish_time, "%Y-%m-%d %H:%M")
+    except Exception:
+        return None
+
+async def multi_account_upload_job(run, task):
+    """并发模式下单个账号的上传协程"""
     global is_multi_uploading
     
     try:
@@ -3077,99 +2779,91 @@ def multi_account_upload_thread(task):
         account_file = os.path.join("cookie", task["cookie"])
         
         # 验证cookie有效性
-        def check_task_cookie_validity():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                from main import cookie_auth
-                result = loop.run_until_complete(cookie_auth(account_file))
-                return result
-            except Exception as e:
-                douyin_logger.error(f"验证cookie失败: {str(e)}")
-                return False
-            finally:
-                loop.close()
+        try:
+            from main import cookie_auth
+            cookie_valid = await cookie_auth(account_file)
+        except Exception as e:
+            douyin_logger.error(f"验证cookie失败: {str(e)}")
+            cookie_valid = False
         
-        if not check_task_cookie_validity():
+        # None 表示无法判断（风控拦截、页面超时等），继续上传
+        if cookie_valid is False:
             update_task_status(task, "failed", "Cookie已失效")
             douyin_logger.warning(f"任务 {task['cookie']} cookie失效，跳过上传")
             return
-            
-        # 风控检测
-        risk_limit = task.get('risk_limit', 5)
-        count = get_upload_count_last_hour(task['cookie'])
-        if count >= risk_limit:
-            update_task_status(task, "waiting", f"风控限制：每小时最多{risk_limit}个，已上传{count}个")
-            douyin_logger.warning(f"账号 {task['cookie']} 上传过于频繁，已自动延迟（每小时最多{risk_limit}个，已上传{count}个）")
-            # 等待一小时后再继续
-            time.sleep(60 * 60)  # 等待1小时
         
         # 处理发布时间
-        publish_date = 0
-        if task["publish_type"] == 'schedule':
-            try:
-                publish_time = f"{task['publish_date']} {task['publish_hour']}:{task['publish_minute']}"
-                publish_date = datetime.strptime(publish_time, "%Y-%m-%d %H:%M")
-            except Exception:
-                task["status"] = "failed"
-                task["current_video"] = "定时发布时间格式错误"
-                return
-        
-                        # 逐个上传视频
-                # 如果是从停止状态恢复的任务，从已完成的视频数量开始继续上传
-                start_index = task["completed_videos"] if task["completed_videos"] > 0 else 0
-                
-                for i, video_path in enumerate(task["videos"][start_index:], start=start_index):
-                    if not is_multi_uploading:  # 检查是否被停止
-                        update_task_status(task, "stopped", "已手动停止")
-                        douyin_logger.info(f"任务 {task['cookie']} 检测到停止信号，中断上传")
-                        break
-                        
-                    douyin_logger.info(f"任务 {task['cookie']} 上传第 {i+1}/{len(task['videos'])} 个视频")
+        publish_date = parse_task_publish_date(task)
+        if publish_date is None:
+            update_task_status(task, "failed", "定时发布时间格式错误")
+            return
+        
+        risk_limit = task.get('risk_limit', 5)
+        
+        # 逐个租用待上传的作业，停止后再次启动会精确地从未完成的作业继续
+        while True:
+            if run.stopped or not is_multi_uploading:  # 检查是否被停止
+                update_task_status(task, "stopped", "已手动停止")
+                douyin_logger.info(f"任务 {task['cookie']} 检测到停止信号，中断上传")
+                break
+            
+            # 风控检测：等待到窗口内最早的记录滑出一小时窗口为止
+            wait_seconds = get_rate_limit_wait_seconds(task['cookie'], risk_limit)
+            if wait_seconds > 0:
+                update_task_status(task, "waiting", f"风控限制：每小时最多{risk_limit}个，{int(wait_seconds // 60) + 1}分钟后继续")
+                douyin_logger.warning(f"账号 {task['cookie']} 上传过于频繁，已自动延迟 {int(wait_seconds)} 秒（每小时最多{risk_limit}个）")
+                if not await run.sleep(wait_seconds):
+                    update_task_status(task, "stopped", "已手动停止")
+                    break
+                update_task_status(task, "uploading")
+            
+            job = task_store.lease_next_job(task["id"])
+            if job is None:
+                break
+            video_path = job["video_path"]
                 
+            douyin_logger.info(f"任务 {task['cookie']} 上传第 {job['video_index']+1}/{len(task['videos'])} 个视频")
             task["current_video"] = os.path.basename(video_path)
             
             try:
-                # 上传单个视频
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
                 # 获取视频标题和标签
                 title, tags = get_title_tags_from_txt(os.path.join("videos", video_path))
                 
                 def update_status_callback(status_message):
                     task["current_video"] = f"{os.path.basename(video_path)} - {status_message}"
                 
-                success = loop.run_until_complete(async_upload(
-                    video_path, account_file, title, tags, 
-                    task["location"], publish_date, update_status_callback
-                ))
+                # 任务开始时已验证过cookie，持有上传名额期间不再进入扫码登录流程
+                async with upload_scheduler.slot():
+                    upload_started = time.time()
+                    success = await async_upload(
+                        video_path, account_file, title, tags, 
+                        task["location"], publish_date, update_status_callback, check_login=False
+                    )
+                    upload_duration = round(time.time() - upload_started, 1)
                 
                 if success:
+                    task_store.complete_job(job["id"])
                     task["completed_videos"] += 1
                     douyin_logger.info(f"账号 {task['cookie']} 成功上传视频: {video_path}")
-                    douyin_logger.info(f"DEBUG: 任务 {task['cookie']} 完成视频计数更新为: {task['completed_videos']}/{len(task['videos'])}")
                     
                     # 记录上传历史
                     log_upload_history(
                         cookie_name=task["cookie"],
                         filename=os.path.basename(video_path),
                         status="success",
-                        reason="上传成功"
+                        reason="上传成功",
+                        duration=upload_duration
                     )
                     
                     # 立即检查是否所有视频都已完成
                     if task["completed_videos"] >= len(task["videos"]):
-                        douyin_logger.info(f"DEBUG: 任务 {task['cookie']} 达到完成条件，准备设置为completed状态")
                         update_task_status(task, "completed", clear_video=True)
                         douyin_logger.info(f"任务 {task['cookie']} 已完成所有视频上传: {task['completed_videos']}/{len(task['videos'])}")
-                        douyin_logger.info(f"DEBUG: 任务 {task['cookie']} 状态已更新为: {task['status']}")
-                        # 已完成所有视频，后面的代码会处理后续逻辑
                     else:
                         # 如果还有视频要上传，保存当前进度
                         update_task_status(task, "uploading", f"已完成 {task['completed_videos']}/{len(task['videos'])}")
-                        douyin_logger.info(f"DEBUG: 任务 {task['cookie']} 部分完成，状态保存为uploading")
                 else:
+                    task_store.fail_job(job["id"], "上传失败")
                     douyin_logger.error(f"账号 {task['cookie']} 上传视频失败: {video_path}")
                     log_upload_history(
                         cookie_name=task["cookie"],
@@ -3178,20 +2872,22 @@ def multi_account_upload_thread(task):
                         reason="上传失败"
                     )
                 
-                loop.close()
-                
                 # 账号内视频上传间隔（并发模式）
                 # 只有在视频成功上传(而非跳过)的情况下才等待间隔时间
-                if i < len(task["videos"]) - 1 and is_multi_uploading and success is not False:
+                has_more = task_store.has_pending_jobs(task["id"])
+                if has_more and is_multi_uploading and success is not False:
                     douyin_logger.info(f"账号 {task['cookie']} 视频间隔等待 {task['upload_interval']} 分钟")
                     # 更新状态为等待中
                     update_task_status(task, "waiting", f"等待 {task['upload_interval']} 分钟后上传下一个视频")
-                    time.sleep(task["upload_interval"] * 60)
-                elif i < len(task["videos"]) - 1 and is_multi_uploading:
+                    if not await run.sleep(task["upload_interval"] * 60):
+                        update_task_status(task, "stopped", "已手动停止")
+                        break
+                elif has_more and is_multi_uploading:
                     douyin_logger.info(f"账号 {task['cookie']} 视频已跳过，立即处理下一个视频")
                     update_task_status(task, "waiting", f"视频已跳过，立即处理下一个视频")
                     
             except Exception as e:
+                task_store.fail_job(job["id"], str(e))
                 douyin_logger.error(f"上传视频 {video_path} 时发生错误: {str(e)}")
                 log_upload_history(
                     cookie_name=task["cookie"],
@@ -3211,19 +2907,19 @@ def multi_account_upload_thread(task):
                 else:
                     update_task_status(task, "failed", "上传失败")
         
+    except Exception as e:
+        update_task_status(task, "failed", f"错误: {str(e)}")
+        douyin_logger.error(f"账号 {task['cookie']} 上传任务失败: {str(e)}")
+    finally:
         # 检查是否所有任务都完成了（并发模式下）
         if upload_mode == "concurrent":
             all_completed = all(t["status"] in ["completed", "failed", "stopped"] for t in multi_account_tasks if t["videos"])
             if all_completed:
                 is_multi_uploading = False
                 douyin_logger.info("所有并发任务已完成，停止多账号上传")
-        
-    except Exception as e:
-        update_task_status(task, "failed", f"错误: {str(e)}")
-        douyin_logger.error(f"账号 {task['cookie']} 上传任务失败: {str(e)}")
 
-def sequential_upload_coordinator():
-    """轮询上传协调器 - 账号之间轮询上传"""
+async def sequential_upload_job(run):
+    """轮询上传协程 - 账号之间轮询上传"""
     global is_multi_uploading, current_task_index
     
     try:
@@ -3237,134 +2933,145 @@ def sequential_upload_coordinator():
         # 轮询逻辑：A账号上传1个视频 -> 等待间隔 -> B账号上传1个视频 -> 等待间隔 -> C账号上传1个视频...
         # 直到所有账号的所有视频都上传完成
         
-        # 为每个任务维护当前上传索引
         for task in valid_tasks:
-            # 如果是从停止状态恢复的任务，从已完成的视频数量开始继续上传
+            # 如果是从停止状态恢复的任务，作业表中未完成的作业会被继续上传
             if task["status"] == "waiting" and task["completed_videos"] > 0:
-                task["current_upload_index"] = task["completed_videos"]
                 douyin_logger.info(f"任务 {task['cookie']} 从断点继续上传: 已完成 {task['completed_videos']}/{len(task['videos'])} 个视频")
-            else:
-                task["current_upload_index"] = 0
             
             # 确保任务状态正确
             if task["status"] not in ["uploading", "waiting"]:
-                update_task_status(task, "waiting", None, save_to_file=False)
+                update_task_status(task, "waiting", None, persist=False)
+        
+        def has_pending():
+            return any(t["status"] != "stopped" and task_store.has_pending_jobs(t["id"]) for t in valid_tasks)
         
         # 持续轮询直到所有任务完成
-        while is_multi_uploading and any(task["current_upload_index"] < len(task["videos"]) for task in valid_tasks):
+        while is_multi_uploading and not run.stopped and has_pending():
+            uploaded_in_round = False
+            rate_limited_waits = []
             
             for task in valid_tasks:
-                if not is_multi_uploading:
+                if run.stopped or not is_multi_uploading:
                     douyin_logger.info(f"检测到停止信号，中断轮询上传")
                     break
                 
                 # 如果任务已被手动停止，跳过该任务
                 if task["status"] == "stopped":
-                    douyin_logger.info(f"跳过已停止的任务: {task['cookie']}")
                     continue
                     
                 # 如果该账号还有视频要上传
-                if task["current_upload_index"] < len(task["videos"]):
-                    current_task_index = task["id"]
+                if task_store.has_pending_jobs(task["id"]):
+                    # 风控检测：受限账号本轮跳过，不阻塞其他账号
+                    risk_limit = task.get('risk_limit', 5)
+                    wait_seconds = get_rate_limit_wait_seconds(task['cookie'], risk_limit)
+                    if wait_seconds > 0:
+                        rate_limited_waits.append(wait_seconds)
+                        update_task_status(task, "waiting", f"风控限制：每小时最多{risk_limit}个，{int(wait_seconds // 60) + 1}分钟后继续", persist=False)
+                        continue
                     
-                    # 执行单个视频上传
-                    video_index = task["current_upload_index"]
-                    success = upload_single_video_for_task(task, video_index)
+                    current_task_index = task["id"]
                     
-                    # 更新上传索引
-                    task["current_upload_index"] += 1
+                    # 租用该账号的下一个作业并上传
+                    job = task_store.lease_next_job(task["id"])
+                    if job is None:
+                        continue
+                    success = await upload_single_video_for_task(task, job)
+                    uploaded_in_round = True
                     
                     # 账号间隔等待（轮询模式的核心）
                     # 只有在上传成功（而非跳过视频）且还有其他账号需要上传时才等待
-                    if is_multi_uploading and any(t["current_upload_index"] < len(t["videos"]) for t in valid_tasks) and success is not False:
+                    if is_multi_uploading and has_pending() and success is not False:
                         douyin_logger.info(f"账号 {task['cookie']} 上传完成，等待 {task['upload_interval']} 分钟后轮询下一个账号")
-                        time.sleep(task["upload_interval"] * 60)
-                    elif is_multi_uploading and any(t["current_upload_index"] < len(t["videos"]) for t in valid_tasks):
+                        if not await run.sleep(task["upload_interval"] * 60):
+                            break
+                    elif is_multi_uploading and has_pending():
                         douyin_logger.info(f"账号 {task['cookie']} 视频已跳过，立即轮询下一个账号")
-        
-        # 清理临时索引
-        for task in valid_tasks:
-            if "current_upload_index" in task:
-                del task["current_upload_index"]
+            
+            # 本轮所有待上传账号都处于风控窗口内，等待最早解除的账号
+            if not uploaded_in_round and rate_limited_waits:
+                wait_seconds = min(rate_limited_waits)
+                douyin_logger.info(f"所有待上传账号均处于风控限制，{int(wait_seconds)} 秒后继续轮询")
+                if not await run.sleep(wait_seconds):
+                    break
         
         # 检查所有任务完成状态
         for task in valid_tasks:
             if task["completed_videos"] >= len(task["videos"]):
-                update_task_status(task, "completed", clear_video=True, save_to_file=False)
+                update_task_status(task, "completed", clear_video=True, persist=False)
             elif task["status"] not in ["stopped", "completed"]:
                 # 如果有部分完成，显示进度
                 if task["completed_videos"] > 0:
-                    update_task_status(task, "waiting", f"已完成 {task['completed_videos']}/{len(task['videos'])}", save_to_file=False)
+                    update_task_status(task, "waiting", f"已完成 {task['completed_videos']}/{len(task['videos'])}", persist=False)
                 else:
-                    update_task_status(task, "failed", "上传失败", save_to_file=False)
+                    update_task_status(task, "failed", "上传失败", persist=False)
         
         # 批量保存状态
-        save_multi_tasks_to_file()
+        save_multi_tasks()
         is_multi_uploading = False
         
     except Exception as e:
         douyin_logger.error(f"轮询上传协调器错误: {str(e)}")
         is_multi_uploading = False
 
-def upload_single_video_for_task(task, video_index):
-    """为指定任务上传单个视频"""
+async def upload_single_video_for_task(task, job):
+    """为指定任务上传单个视频（job 为 task_store.lease_next_job 租用的作业）"""
+    video_path = job["video_path"]
     try:
         task["status"] = "uploading"
-        video_path = task["videos"][video_index]
         task["current_video"] = os.path.basename(video_path)
         
         account_file = os.path.join("cookie", task["cookie"])
         
         # 验证cookie有效性
-        def check_task_cookie_validity():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                from main import cookie_auth
-                result = loop.run_until_complete(cookie_auth(account_file))
-                return result
-            except Exception as e:
-                return False
-            finally:
-                loop.close()
+        try:
+            from main import cookie_auth
+            cookie_valid = await cookie_auth(account_file)
+        except Exception:
+            cookie_valid = False
         
-        if not check_task_cookie_validity():
+        # None 表示无法判断（风控拦截、页面超时等），继续上传
+        # Cookie失效或发布时间错误时该账号的其余作业同样无法上传，一次性全部标记为失败，不再逐个轮询
+        if cookie_valid is False:
+            task_store.fail_job(job["id"], "Cookie已失效")
+            task_store.fail_pending_jobs(task["id"], "Cookie已失效")
             task["status"] = "failed"
             task["current_video"] = "Cookie已失效"
             return False
         
         # 处理发布时间
-        publish_date = 0
-        if task["publish_type"] == 'schedule':
-            try:
-                publish_time = f"{task['publish_date']} {task['publish_hour']}:{task['publish_minute']}"
-                publish_date = datetime.strptime(publish_time, "%Y-%m-%d %H:%M")
-            except Exception:
-                task["status"] = "failed"
-                task["current_video"] = "定时发布时间格式错误"
-                return False
+        publish_date = parse_task_publish_date(task)
+        if publish_date is None:
+            task_store.fail_job(job["id"], "定时发布时间格式错误")
+            task_store.fail_pending_jobs(task["id"], "定时发布时间格式错误")
+            task["status"] = "failed"
+            task["current_video"] = "定时发布时间格式错误"
+            return False
         
         # 上传视频
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         
         title, tags = get_title_tags_from_txt(os.path.join("videos", video_path))
         
         def update_status_callback(status_message):
             task["current_video"] = f"{os.path.basename(video_path)} - {status_message}"
         
-        success = loop.run_until_complete(async_upload(
-            video_path, account_file, title, tags, 
-            task["location"], publish_date, update_status_callback
-        ))
+        # 上面已在获取上传名额前验证过cookie，持有上传名额期间不再进入扫码登录流程
+        async with upload_scheduler.slot():
+            upload_started = time.time()
+            success = await async_upload(
+                video_path, account_file, title, tags, 
+                task["location"], publish_date, update_status_callback, check_login=False
+            )
+            upload_duration = round(time.time() - upload_started, 1)
         
         if success:
+            task_store.complete_job(job["id"])
             task["completed_videos"] += 1
             log_upload_history(
                 cookie_name=task["cookie"],
                 filename=os.path.basename(video_path),
                 status="success",
-                reason="上传成功"
+                reason="上传成功",
+                duration=upload_duration
             )
             
             # 检查是否所有视频都已完成
@@ -3378,8 +3085,9 @@ def upload_single_video_for_task(task, video_index):
             # 检查是否是因为视频重复导致的
             from utils.md5_manager import md5_manager
             full_path = os.path.join("videos", video_path)
-            if os.path.exists(full_path) and md5_manager.is_duplicate(full_path):
+            if os.path.exists(full_path) and await run_in_thread(md5_manager.is_duplicate, full_path):
                 # 更新任务状态为跳过（视频重复）
+                task_store.skip_job(job["id"], "视频重复")
                 log_upload_history(
                     cookie_name=task["cookie"],
                     filename=os.path.basename(video_path),
@@ -3394,6 +3102,7 @@ def upload_single_video_for_task(task, video_index):
                 return False
             else:
                 # 真正的上传失败
+                task_store.fail_job(job["id"], "上传失败")
                 log_upload_history(
                     cookie_name=task["cookie"],
                     filename=os.path.basename(video_path),
@@ -3403,10 +3112,10 @@ def upload_single_video_for_task(task, video_index):
                 # 上传失败但不设置整个任务为失败，继续下一个视频
                 update_task_status(task, task["status"], f"上传失败: {os.path.basename(video_path)}")
         
-        loop.close()
         return success
         
     except Exception as e:
+        task_store.fail_job(job["id"], str(e))
         task["status"] = "failed"
         task["current_video"] = f"错误: {str(e)}"
         log_upload_history(
@@ -3456,8 +3165,6 @@ def set_video_permissions():
         
         # 启动权限设置任务
         def permission_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 from utils.douyin_video_deleter import set_douyin_video_permissions
                 
@@ -3468,7 +3175,7 @@ def set_video_permissions():
                         'account': account_file
                     })
                 
-                result = loop.run_until_complete(
+                result = browser_pool.run(
                     set_douyin_video_permissions(
                         cookie_path, 
                         permission_value, 
@@ -3490,8 +3197,6 @@ def set_video_permissions():
                     'error': str(e),
                     'account': account_file
                 })
-            finally:
-                loop.close()
         
         # 在后台线程中运行权限设置任务
         thread = threading.Thread(target=permission_thread)
@@ -3514,6 +3219,91 @@ def set_video_permissions():
         }), 500
 
 
+def build_remote_videos_result(video_details, cached=False):
+    """把视频详情转换为前端使用的列表结果"""
+    videos = []
+
+    for i, video_detail in enumerate(video_details):
+        try:
+            title = video_detail.get('title') or f"视频 {i + 1}"
+            publish_time = video_detail.get('publish_time') or "未知时间"
+            video_status = video_detail.get('status') or "未知状态"
+            metrics = video_detail.get('metrics') or {}
+
+            # 确定状态颜色
+            if video_status == "仅自己可见":
+                status_color = "private"
+            elif video_status == "公开":
+                status_color = "published"
+            elif video_status == "好友可见":
+                status_color = "friends"
+            elif video_status == "已发布":
+                status_color = "published"
+            else:
+                status_color = "unknown"
+
+            videos.append({
+                "index": video_detail.get('index', i),
+                "aweme_id": video_detail.get('aweme_id'),
+                "title": title.strip(),
+                "publish_time": publish_time.strip(),
+                "status": video_status,
+                "status_color": status_color,
+                "metrics": metrics,
+                "can_delete": True,  # 暂时设为True，实际应从card_element检查
+                "is_disabled": False,  # 暂时设为False，实际应从card_element检查
+                "is_private": video_status == "仅自己可见",
+                "play_count": metrics.get("播放", "0")  # 保持向后兼容
+            })
+
+        except Exception as e:
+            videos.append({
+                "index": i,
+                "title": f"视频 {i + 1}",
+                "publish_time": "获取失败",
+                "status": "获取失败",
+                "status_color": "error",
+                "metrics": {},
+                "can_delete": False,
+                "is_disabled": False,
+                "is_private": False,
+                "play_count": "0",
+                "error": str(e)
+            })
+
+    return {
+        "success": True,
+        "message": f"成功获取 {len(videos)} 个视频信息" + ("（缓存）" if cached else ""),
+        "videos": videos,
+        "cached": cached
+    }
+
+
+def emit_cached_remote_videos(account_file, event, force_refresh=False):
+    """发送缓存的远程视频清单
+
+    Returns:
+        (bool, bool): (是否还需要打开浏览器抓取, 是否只增量抓取新作品)
+    """
+    cached_videos = None if force_refresh else remote_inventory.get_videos(account_file)
+    if cached_videos is None:
+        return True, False
+    socketio.emit(event, {
+        'result': build_remote_videos_result(cached_videos, cached=True),
+        'account': account_file
+    })
+    if remote_inventory.is_fresh(account_file):
+        return False, False
+    # 增量抓取只更新新作品，超过完整刷新间隔时完整抓取以更新旧作品并移除已删除的作品
+    return True, not remote_inventory.needs_full_refresh(account_file)
+
+
+def update_remote_inventory(account_file, video_details, incremental):
+    """把接口抓取到的视频写入远程视频清单，增量抓取时返回合并后的完整列表"""
+    remote_inventory.save(account_file, video_details, full=not incremental)
+    return remote_inventory.get_videos(account_file) if incremental else video_details
+
+
 @app.route('/api/videos/list_remote', methods=['POST'])
 def list_remote_videos():
     """获取远程抖音创作者中心的视频列表（删除管理用）"""
@@ -3534,10 +3324,11 @@ def list_remote_videos():
                 "message": "Cookie文件不存在"
             }), 400
         
+        # refresh=true 时忽略缓存，重新完整抓取
+        force_refresh = bool(data.get('refresh'))
+        
         # 启动获取视频列表任务
         def get_videos_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 from utils.douyin_video_deleter import DouyinVideoDeleter
                 
@@ -3546,6 +3337,11 @@ def list_remote_videos():
                 # 设置操作类型为删除管理
                 deleter.operation_type = "删除管理"
                 
+                # TTL内直接返回缓存的清单；过期时先返回缓存，再抓取新作品
+                need_fetch, incremental = emit_cached_remote_videos(account_file, 'video_list_result', force_refresh)
+                if not need_fetch:
+                    return
+                
                 # 临时修改删除器来获取视频信息而不删除
                 async def get_video_info_only():
                     """只获取视频信息不删除"""
@@ -3553,7 +3349,6 @@ def list_remote_videos():
                     from utils.proxy_manager import proxy_manager
                     from main import get_browser_launch_options
                     from utils.base_social_media import set_init_script
-                    from playwright.async_api import async_playwright
                     
                     proxy_config = proxy_manager.get_proxy_for_playwright(deleter.cookie_filename)
                     
@@ -3564,117 +3359,53 @@ def list_remote_videos():
                     launch_options = get_browser_launch_options(headless=headless_mode, proxy_config=proxy_config)
                     fingerprint_config = fingerprint_manager.get_playwright_config(deleter.cookie_filename)
                     
-                    browser = None
-                    context = None
+                    context_options = {
+                        "storage_state": deleter.account_file,
+                        **fingerprint_config
+                    }
                     
-                    try:
-                        async with async_playwright() as playwright:
-                            browser = await playwright.chromium.launch(**launch_options)
-                            
-                            context_options = {
-                                "storage_state": deleter.account_file,
-                                **fingerprint_config
-                            }
-                            
-                            if proxy_config:
-                                context_options["proxy"] = proxy_config
-                            
-                            context = await browser.new_context(**context_options)
-                            context = await set_init_script(context, deleter.cookie_filename)
-                            
-                            page = await context.new_page()
-                            
-                            # 访问视频管理页面
-                            await page.goto("https://creator.douyin.com/creator-micro/content/manage")
-                            await page.wait_for_timeout(5000)
-                            
-                            # 检查登录状态
-                            if await page.locator('text=手机号登录').count() > 0:
-                                return {
-                                    "success": False,
-                                    "message": "Cookie已失效，需要重新登录",
-                                    "videos": []
-                                }
-                            
-                            # 设置进度回调函数
-                            async def progress_callback(status_message):
-                                socketio.emit('video_list_progress', {
-                                    'status': status_message,
-                                    'account': account_file
-                                })
-                            
-                            deleter.status_callback = progress_callback
-                            
-                            # 获取视频详细信息，包括权限状态
-                            video_details = await deleter.get_video_details(page)
-                            videos = []
-                            
-                            for i, video_detail in enumerate(video_details):
-                                try:
-                                    title = video_detail.get('title', f"视频 {i + 1}")
-                                    publish_time = video_detail.get('publish_time', "未知时间")
-                                    video_status = video_detail.get('status', "未知状态")
-                                    metrics = video_detail.get('metrics', {})
-                                    
-                                    # 确定状态颜色
-                                    if video_status == "仅自己可见":
-                                        status_color = "private"
-                                    elif video_status == "公开":
-                                        status_color = "published"
-                                    elif video_status == "好友可见":
-                                        status_color = "friends"
-                                    elif video_status == "已发布":
-                                        status_color = "published"
-                                    else:
-                                        status_color = "unknown"
-                                    
-                                    videos.append({
-                                        "index": video_detail.get('index', i),
-                                        "title": title.strip(),
-                                        "publish_time": publish_time.strip(),
-                                        "status": video_status,
-                                        "status_color": status_color,
-                                        "metrics": metrics,
-                                        "can_delete": True,  # 暂时设为True，实际应从card_element检查
-                                        "is_disabled": False,  # 暂时设为False，实际应从card_element检查
-                                        "is_private": video_status == "仅自己可见",
-                                        "play_count": metrics.get("播放", "0")  # 保持向后兼容
-                                    })
-                                    
-                                except Exception as e:
-                                    videos.append({
-                                        "index": i,
-                                        "title": f"视频 {i + 1}",
-                                        "publish_time": "获取失败",
-                                        "status": "获取失败",
-                                        "status_color": "error",
-                                        "metrics": {},
-                                        "can_delete": False,
-                                        "is_disabled": False,
-                                        "is_private": False,
-                                        "play_count": "0",
-                                        "error": str(e)
-                                    })
-                            
+                    if proxy_config:
+                        context_options["proxy"] = proxy_config
+                    
+                    async with browser_pool.context(launch_options, context_options) as context:
+                        context = await set_init_script(context, deleter.cookie_filename)
+                        
+                        page = await context.new_page()
+                        # 在打开页面之前开始监听作品列表接口
+                        capture = deleter.capture_video_list(page) if VIDEO_LIST_NETWORK_CAPTURE else None
+                        
+                        # 访问视频管理页面
+                        await page.goto("https://creator.douyin.com/creator-micro/content/manage")
+                        await page.wait_for_timeout(5000)
+                        
+                        # 检查登录状态
+                        if await page.locator('text=手机号登录').count() > 0:
                             return {
-                                "success": True,
-                                "message": f"成功获取 {len(videos)} 个视频信息",
-                                "videos": videos
+                                "success": False,
+                                "message": "Cookie已失效，需要重新登录",
+                                "videos": []
                             }
-                    
-                    finally:
-                        if context:
-                            try:
-                                await context.close()
-                            except:
-                                pass
-                        if browser:
-                            try:
-                                await browser.close()
-                            except:
-                                pass
+                        
+                        # 设置进度回调函数
+                        async def progress_callback(status_message):
+                            socketio.emit('video_list_progress', {
+                                'status': status_message,
+                                'account': account_file
+                            })
+                        
+                        deleter.status_callback = progress_callback
+                        
+                        # 获取视频详细信息，包括权限状态（优先读取接口数据）
+                        if capture:
+                            known_ids = remote_inventory.known_ids(account_file) if incremental else None
+                            video_details = await deleter.get_video_details_from_network(page, capture, known_ids=known_ids)
+                        else:
+                            video_details = await deleter.get_video_details(page)
+                        if capture and capture.responses:
+                            video_details = update_remote_inventory(account_file, video_details, incremental)
+                        return build_remote_videos_result(video_details)
                 
-                result = loop.run_until_complete(get_video_info_only())
+                result = browser_pool.run(get_video_info_only())
                 
                 # 发送结果
                 socketio.emit('video_list_result', {
@@ -3688,8 +3419,6 @@ def list_remote_videos():
                     'error': str(e),
                     'account': account_file
                 })
-            finally:
-                loop.close()
         
         # 在后台线程中运行任务
         thread = threading.Thread(target=get_videos_thread)
@@ -3729,10 +3458,11 @@ def list_remote_videos_for_permissions():
                 "message": "Cookie文件不存在"
             }), 400
         
+        # refresh=true 时忽略缓存，重新完整抓取
+        force_refresh = bool(data.get('refresh'))
+        
         # 启动获取视频列表任务
         def get_videos_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 from utils.douyin_video_deleter import DouyinVideoDeleter
                 
@@ -3741,6 +3471,11 @@ def list_remote_videos_for_permissions():
                 # 设置操作类型为权限设置
                 deleter.operation_type = "权限设置"
                 
+                # TTL内直接返回缓存的清单；过期时先返回缓存，再抓取新作品
+                need_fetch, incremental = emit_cached_remote_videos(account_file, 'permission_video_list_result', force_refresh)
+                if not need_fetch:
+                    return
+                
                 # 临时修改删除器来获取视频信息而不删除
                 async def get_video_info_only():
                     """只获取视频信息不删除"""
@@ -3748,7 +3483,6 @@ def list_remote_videos_for_permissions():
                     from utils.proxy_manager import proxy_manager
                     from main import get_browser_launch_options
                     from utils.base_social_media import set_init_script
-                    from playwright.async_api import async_playwright
                     
                     # 设置进度回调函数
                     async def progress_callback(status_message):
@@ -3768,108 +3502,44 @@ def list_remote_videos_for_permissions():
                     launch_options = get_browser_launch_options(headless=headless_mode, proxy_config=proxy_config)
                     fingerprint_config = fingerprint_manager.get_playwright_config(deleter.cookie_filename)
                     
-                    browser = None
-                    context = None
+                    context_options = {
+                        "storage_state": deleter.account_file,
+                        **fingerprint_config
+                    }
                     
-                    try:
-                        async with async_playwright() as playwright:
-                            browser = await playwright.chromium.launch(**launch_options)
-                            
-                            context_options = {
-                                "storage_state": deleter.account_file,
-                                **fingerprint_config
-                            }
-                            
-                            if proxy_config:
-                                context_options["proxy"] = proxy_config
-                            
-                            context = await browser.new_context(**context_options)
-                            context = await set_init_script(context, deleter.cookie_filename)
-                            
-                            page = await context.new_page()
-                            
-                            # 访问视频管理页面
-                            await page.goto("https://creator.douyin.com/creator-micro/content/manage")
-                            await page.wait_for_timeout(5000)
-                            
-                            # 检查登录状态
-                            if await page.locator('text=手机号登录').count() > 0:
-                                return {
-                                    "success": False,
-                                    "message": "Cookie已失效，需要重新登录",
-                                    "videos": []
-                                }
-                            
-                            # 获取视频详细信息，包括权限状态
-                            video_details = await deleter.get_video_details(page)
-                            videos = []
-                            
-                            for i, video_detail in enumerate(video_details):
-                                try:
-                                    title = video_detail.get('title', f"视频 {i + 1}")
-                                    publish_time = video_detail.get('publish_time', "未知时间")
-                                    video_status = video_detail.get('status', "未知状态")
-                                    metrics = video_detail.get('metrics', {})
-                                    
-                                    # 确定状态颜色
-                                    if video_status == "仅自己可见":
-                                        status_color = "private"
-                                    elif video_status == "公开":
-                                        status_color = "published"
-                                    elif video_status == "好友可见":
-                                        status_color = "friends"
-                                    elif video_status == "已发布":
-                                        status_color = "published"
-                                    else:
-                                        status_color = "unknown"
-                                    
-                                    videos.append({
-                                        "index": video_detail.get('index', i),
-                                        "title": title.strip(),
-                                        "publish_time": publish_time.strip(),
-                                        "status": video_status,
-                                        "status_color": status_color,
-                                        "metrics": metrics,
-                                        "can_delete": True,  # 暂时设为True，实际应从card_element检查
-                                        "is_disabled": False,  # 暂时设为False，实际应从card_element检查
-                                        "is_private": video_status == "仅自己可见",
-                                        "play_count": metrics.get("播放", "0")  # 保持向后兼容
-                                    })
-                                    
-                                except Exception as e:
-                                    videos.append({
-                                        "index": i,
-                                        "title": f"视频 {i + 1}",
-                                        "publish_time": "获取失败",
-                                        "status": "获取失败",
-                                        "status_color": "error",
-                                        "metrics": {},
-                                        "can_delete": False,
-                                        "is_disabled": False,
-                                        "is_private": False,
-                                        "play_count": "0",
-                                        "error": str(e)
-                                    })
-                            
+                    if proxy_config:
+                        context_options["proxy"] = proxy_config
+                    
+                    async with browser_pool.context(launch_options, context_options) as context:
+                        context = await set_init_script(context, deleter.cookie_filename)
+                        
+                        page = await context.new_page()
+                        # 在打开页面之前开始监听作品列表接口
+                        capture = deleter.capture_video_list(page) if VIDEO_LIST_NETWORK_CAPTURE else None
+                        
+                        # 访问视频管理页面
+                        await page.goto("https://creator.douyin.com/creator-micro/content/manage")
+                        await page.wait_for_timeout(5000)
+                        
+                        # 检查登录状态
+                        if await page.locator('text=手机号登录').count() > 0:
                             return {
-                                "success": True,
-                                "message": f"成功获取 {len(videos)} 个视频信息",
-                                "videos": videos
+                                "success": False,
+                                "message": "Cookie已失效，需要重新登录",
+                                "videos": []
                             }
-                    
-                    finally:
-                        if context:
-                            try:
-                                await context.close()
-                            except:
-                                pass
-                        if browser:
-                            try:
-                                await browser.close()
-                            except:
-                                pass
+                        
+                        # 获取视频详细信息，包括权限状态（优先读取接口数据）
+                        if capture:
+                            known_ids = remote_inventory.known_ids(account_file) if incremental else None
+                            video_details = await deleter.get_video_details_from_network(page, capture, known_ids=known_ids)
+                        else:
+                            video_details = await deleter.get_video_details(page)
+                        if capture and capture.responses:
+                            video_details = update_remote_inventory(account_file, video_details, incremental)
+                        return build_remote_videos_result(video_details)
                 
-                result = loop.run_until_complete(get_video_info_only())
+                result = browser_pool.run(get_video_info_only())
                 
                 # 发送结果 - 使用不同的事件名
                 socketio.emit('permission_video_list_result', {
@@ -3883,8 +3553,6 @@ def list_remote_videos_for_permissions():
                     'error': str(e),
                     'account': account_file
                 })
-            finally:
-                loop.close()
         
         # 在后台线程中运行任务
         thread = threading.Thread(target=get_videos_thread)
@@ -3930,8 +3598,6 @@ def delete_videos():
         
         # 启动删除任务
         def delete_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
                 from utils.douyin_video_deleter import delete_douyin_videos, delete_specific_douyin_videos
                 
@@ -3944,12 +3610,12 @@ def delete_videos():
                 
                 if delete_type == 'selected' and video_titles:
                     # 删除指定视频
-                    result = loop.run_until_complete(
+                    result = browser_pool.run(
                         delete_specific_douyin_videos(cookie_path, video_titles, status_callback)
                     )
                 elif delete_type == 'all':
                     # 删除所有视频
-                    result = loop.run_until_complete(
+                    result = browser_pool.run(
                         delete_douyin_videos(cookie_path, max_count, status_callback)
                     )
                 else:
@@ -3970,8 +3636,6 @@ def delete_videos():
                     'error': str(e),
                     'account': account_file
                 })
-            finally:
-                loop.close()
         
         # 在后台线程中运行删除任务
         thread = threading.Thread(target=delete_thread)
@@ -4055,7 +3719,9 @@ def get_extract_status(task_id):
     return jsonify({
         "status": task['status'],
         "message": task.get('message', ''),
-        "extracted_count": task.get('extracted_count', 0)
+        "extracted_count": task.get('extracted_count', 0),
+        "bytes_done": task.get('bytes_done', 0),
+        "bytes_total": task.get('bytes_total', 0)
     })
 
 def extract_archive_thread(task_id, archive_path, temp_dir, filename):
@@ -4064,22 +3730,18 @@ def extract_archive_thread(task_id, archive_path, temp_dir, filename):
         # 更新状态
         archive_extraction_tasks[task_id]['message'] = '正在解压压缩包...'
         
-        # 创建解压目标目录
-        extract_dir = os.path.join(temp_dir, 'extracted')
-        os.makedirs(extract_dir, exist_ok=True)
-        
-        # 根据文件类型选择解压方式
-        if filename.endswith('.zip'):
-            extract_zip(archive_path, extract_dir, task_id)
-        elif filename.endswith('.rar') and RARFILE_AVAILABLE:
-            extract_rar(archive_path, extract_dir, task_id)
-        elif filename.endswith('.7z') and PY7ZR_AVAILABLE:
-            extract_7z(archive_path, extract_dir, task_id)
-        else:
-            raise Exception(f"不支持的文件格式: {filename}")
+        def on_progress(bytes_done, bytes_total, video_count):
+            task = archive_extraction_tasks[task_id]
+            task['bytes_done'] = bytes_done
+            task['bytes_total'] = bytes_total
+            task['extracted_count'] = video_count
+            task['message'] = (f'已提取 {video_count} 个视频文件 '
+                               f'({bytes_done / 1024 / 1024:.1f}/{bytes_total / 1024 / 1024:.1f} MB)')
         
-        # 查找并移动视频文件
-        video_count = move_video_files(extract_dir, task_id)
+        # 只提取视频及其描述、封面文件，直接写入videos目录
+        os.makedirs("videos", exist_ok=True)
+        stats = ArchiveExtractor(archive_path, "videos", on_progress).run()
+        video_count = stats['video_count']
         
         # 清理临时文件
         shutil.rmtree(temp_dir, ignore_errors=True)
@@ -4088,10 +3750,13 @@ def extract_archive_thread(task_id, archive_path, temp_dir, filename):
         archive_extraction_tasks[task_id] = {
             'status': 'completed',
             'message': f'解压完成，共提取 {video_count} 个视频文件',
-            'extracted_count': video_count
+            'extracted_count': video_count,
+            'bytes_done': stats['bytes'],
+            'bytes_total': stats['bytes']
         }
         
-        douyin_logger.info(f"压缩包解压完成: {filename}, 提取视频: {video_count} 个")
+        douyin_logger.info(f"压缩包解压完成: {filename}, 提取视频: {video_count} 个，"
+                           f"文件: {stats['file_count']} 个，跳过: {stats['skipped']} 个")
         
     except Exception as e:
         error_msg = f"解压失败: {str(e)}"
@@ -4107,104 +3772,6 @@ def extract_archive_thread(task_id, archive_path, temp_dir, filename):
             'extracted_count': 0
         }
 
-def extract_zip(archive_path, extract_dir, task_id):
-    """解压ZIP文件"""
-    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
-
-def extract_rar(archive_path, extract_dir, task_id):
-    """解压RAR文件"""
-    with rarfile.RarFile(archive_path) as rar_ref:
-        rar_ref.extractall(extract_dir)
-
-def extract_7z(archive_path, extract_dir, task_id):
-    """解压7Z文件"""
-    with py7zr.SevenZipFile(archive_path, mode='r') as z:
-        z.extractall(extract_dir)
-
-def move_video_files(extract_dir, task_id):
-    """查找并移动视频文件到videos目录，保持文件夹结构"""
-    video_count = 0
-    
-    # 确保videos目录存在
-    os.makedirs("videos", exist_ok=True)
-    
-    # 支持的视频格式
-    video_extensions = ('.mp4', '.mov', '.avi', '.mkv', '.flv', '.webm', '.wmv', '.3gp', '.m4v')
-    
-    # 递归查找所有视频文件
-    for root, dirs, files in os.walk(extract_dir):
-        for file in files:
-            if file.lower().endswith(video_extensions):
-                source_path = os.path.join(root, file)
-                
-                # 计算相对路径，保持文件夹结构
-                relative_path = os.path.relpath(root, extract_dir)
-                
-                # 如果是在根目录下的文件，直接放到videos目录
-                if relative_path == '.':
-                    target_dir = "videos"
-                else:
-                    # 保持原有的文件夹结构
-                    target_dir = os.path.join("videos", relative_path)
-                
-                # 确保目标目录存在
-                os.makedirs(target_dir, exist_ok=True)
-                
-                # 生成目标文件名，避免重名
-                base_name = os.path.splitext(file)[0]
-                extension = os.path.splitext(file)[1]
-                target_name = file
-                counter = 1
-                
-                while os.path.exists(os.path.join(target_dir, target_name)):
-                    target_name = f"{base_name}_{counter}{extension}"
-                    counter += 1
-                
-                target_path = os.path.join(target_dir, target_name)
-                
-                try:
-                    # 移动文件
-                    shutil.move(source_path, target_path)
-                    video_count += 1
-                    
-                    # 更新进度
-                    archive_extraction_tasks[task_id]['extracted_count'] = video_count
-                    archive_extraction_tasks[task_id]['message'] = f'已提取 {video_count} 个视频文件'
-                    
-                    # 构建显示路径
-                    display_path = os.path.join(relative_path, target_name) if relative_path != '.' else target_name
-                    douyin_logger.info(f"移动视频文件: {file} -> {display_path}")
-                    
-                    # 尝试查找对应的txt文件（标题和标签）
-                    txt_source = os.path.join(root, base_name + '.txt')
-                    if os.path.exists(txt_source):
-                        txt_target = os.path.join(target_dir, os.path.splitext(target_name)[0] + '.txt')
-                        try:
-                            shutil.move(txt_source, txt_target)
-                            txt_display_path = os.path.join(relative_path, os.path.splitext(target_name)[0] + '.txt') if relative_path != '.' else os.path.splitext(target_name)[0] + '.txt'
-                            douyin_logger.info(f"移动描述文件: {base_name}.txt -> {txt_display_path}")
-                        except Exception as e:
-                            douyin_logger.warning(f"移动描述文件失败: {str(e)}")
-                    
-                    # 尝试查找对应的图片文件（封面）
-                    for img_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif']:
-                        img_source = os.path.join(root, base_name + img_ext)
-                        if os.path.exists(img_source):
-                            img_target = os.path.join(target_dir, os.path.splitext(target_name)[0] + img_ext)
-                            try:
-                                shutil.move(img_source, img_target)
-                                img_display_path = os.path.join(relative_path, os.path.splitext(target_name)[0] + img_ext) if relative_path != '.' else os.path.splitext(target_name)[0] + img_ext
-                                douyin_logger.info(f"移动封面文件: {base_name}{img_ext} -> {img_display_path}")
-                                break  # 只移动第一个找到的图片
-                            except Exception as e:
-                                douyin_logger.warning(f"移动封面文件失败: {str(e)}")
-                    
-                except Exception as e:
-                    douyin_logger.error(f"移动视频文件失败: {file}, 错误: {str(e)}")
-    
-    return video_count
-
 # 抖音采集相关的全局变量
 def init_app_services():
     """初始化应用服务"""
@@ -5259,9 +4826,7 @@ def douyin_parse_link():
 def init_app():
     """应用初始化"""
     # 加载多账号任务数据
-    load_multi_tasks_from_file()
-    # 启动内存清理线程
-    start_cleanup_thread()
+    load_multi_tasks()
     # 检查Downloader服务状态
     init_app_services()
 
@@ -5376,11 +4941,33 @@ def check_md5_duplicate():
         is_duplicate = md5_manager.is_duplicate(full_path)
         md5_value = md5_manager.calculate_md5(full_path)
         
+        # 画面相近的已上传视频（剪辑后MD5不同的同一素材）
+        # 抽帧需要多次调用ffmpeg，不在请求线程中执行：未缓存指纹时在后台计算，稍后再次检查即可得到结果
+        near_duplicates = []
+        near_duplicates_pending = False
+        if video_fingerprint_index.available:
+            near_duplicates = video_fingerprint_index.find_near_duplicates(full_path, compute=False)
+            if near_duplicates is None:
+                video_fingerprint_index.fingerprint_in_background(full_path)
+                near_duplicates = []
+                near_duplicates_pending = True
+        
+        if is_duplicate:
+            message = "视频已存在"
+        elif near_duplicates:
+            message = f"画面与已上传视频 {near_duplicates[0]['filename']} 相近"
+        elif near_duplicates_pending:
+            message = "视频MD5未重复，画面指纹计算中，请稍后再次检查"
+        else:
+            message = "视频未重复"
+        
         return jsonify({
             "success": True,
             "is_duplicate": is_duplicate,
             "md5": md5_value,
-            "message": "视频已存在" if is_duplicate else "视频未重复"
+            "near_duplicates": near_duplicates,
+            "near_duplicates_pending": near_duplicates_pending,
+            "message": message
         })
     except Exception as e:
         douyin_logger.error(f"检查MD5失败: {str(e)}")
@@ -5438,14 +5025,100 @@ def add_video_md5():
             "message": f"添加MD5记录失败: {str(e)}"
         }), 500
 
+@app.route('/api/md5/warm', methods=['POST'])
+def warm_md5_cache():
+    """预先计算文件夹内视频的MD5并写入缓存（在去重扫描的进程池中后台执行，进度同扫描任务）"""
+    try:
+        from utils.md5_scan import md5_scan_manager
+        
+        data = request.get_json() or {}
+        folder_path = data.get('folder_path', '')
+        full_path = os.path.join("videos", folder_path)
+        
+        # 验证路径安全性
+        if '..' in folder_path or not os.path.commonpath([os.path.abspath("videos"), os.path.abspath(full_path)]) == os.path.abspath("videos"):
+            return jsonify({"success": False, "message": "无效的文件夹路径"}), 400
+        
+        if not os.path.isdir(full_path):
+            return jsonify({"success": False, "message": "文件夹不存在"}), 404
+        
+        scan = md5_scan_manager.start(folder_path, on_progress=emit_md5_scan_progress,
+                                      recursive=data.get('recursive', True), prune_cache=True)
+        return jsonify({
+            "success": True,
+            "scan_id": scan.id,
+            "message": "MD5缓存预热已开始"
+        }), 202
+    except Exception as e:
+        douyin_logger.error(f"预热MD5缓存失败: {str(e)}")
+        return jsonify({
+            "success": False,
+            "message": f"预热MD5缓存失败: {str(e)}"
+        }), 500
+
+def emit_md5_scan_progress(scan):
+    """推送重复视频扫描进度"""
+    socketio.emit('md5_scan_progress', scan.to_dict(include_results=scan.finished))
+
+@app.route('/api/md5/scan', methods=['POST'])
+def start_md5_scan():
+    """扫描文件夹中的重复视频（后台并行计算MD5）"""
+    try:
+        from utils.md5_scan import md5_scan_manager
+        
+        data = request.get_json() or {}
+        folder_path = data.get('folder_path', '')
+        full_path = os.path.join("videos", folder_path)
+        
+        # 验证路径安全性
+        if '..' in folder_path or not os.path.commonpath([os.path.abspath("videos"), os.path.abspath(full_path)]) == os.path.abspath("videos"):
+            return jsonify({"success": False, "message": "无效的文件夹路径"}), 400
+        
+        if not os.path.isdir(full_path):
+            return jsonify({"success": False, "message": "文件夹不存在"}), 404
+        
+        scan = md5_scan_manager.start(folder_path, on_progress=emit_md5_scan_progress)
+        return jsonify({
+            "success": True,
+            "scan_id": scan.id,
+            "message": "重复视频扫描已开始"
+        }), 202
+    except Exception as e:
+        douyin_logger.error(f"启动重复视频扫描失败: {str(e)}")
+        return jsonify({
+            "success": False,
+            "message": f"启动重复视频扫描失败: {str(e)}"
+        }), 500
+
+@app.route('/api/md5/scan/<scan_id>', methods=['GET'])
+def get_md5_scan(scan_id):
+    """获取重复视频扫描结果"""
+    from utils.md5_scan import md5_scan_manager
+    
+    scan = md5_scan_manager.get_scan(scan_id)
+    if not scan:
+        return jsonify({"success": False, "message": "扫描任务不存在"}), 404
+    return jsonify({"success": True, "scan": scan.to_dict(include_results=True)})
+
+@app.route('/api/md5/scan/<scan_id>/cancel', methods=['POST'])
+def cancel_md5_scan(scan_id):
+    """取消重复视频扫描"""
+    from utils.md5_scan import md5_scan_manager
+    
+    if not md5_scan_manager.cancel(scan_id):
+        return jsonify({"success": False, "message": "扫描任务不存在"}), 404
+    return jsonify({"success": True, "message": "已取消扫描"})
+
 @app.route('/api/stop_upload', methods=['POST'])
 def stop_upload():
     """中止上传任务"""
     global is_uploading, is_multi_uploading
     
-    # 标记上传状态为已中止
+    # 标记上传状态为已中止，并立即唤醒正在等待的上传协程
     is_uploading = False
     is_multi_uploading = False
+    upload_scheduler.stop("single")
+    upload_scheduler.stop("multi")
     
     # 更新所有等待中的任务状态为已中止
     for task in upload_tasks:
@@ -5461,7 +5134,7 @@ def stop_upload():
             douyin_logger.info(f"保存任务 {task['cookie']} 的上传进度: {task['completed_videos']}/{len(task['videos'])}，以便下次续传")
     
     # 保存多账号任务状态
-    save_multi_tasks_to_file()
+    save_multi_tasks()
     
     return jsonify({
         "success": True,
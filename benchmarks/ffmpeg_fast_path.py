@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+FFmpeg处理方式基准测试
+对比 流复制 / 仅音频重编码 / 重新编码 三种处理方式的耗时和吞吐量
+
+用法:
+    python benchmarks/ffmpeg_fast_path.py                  # 使用生成的测试视频
+    python benchmarks/ffmpeg_fast_path.py a.mp4 b.mp4      # 使用指定视频
+    python benchmarks/ffmpeg_fast_path.py --duration 60 --repeat 3
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ffmpeg_command import build_ffmpeg_command, get_processing_mode, PROCESSING_MODE_NAMES  # noqa: E402
+from utils.ffmpeg_runner import run_ffmpeg  # noqa: E402
+
+# 各处理方式对应的编辑设置
+BENCH_SETTINGS = {
+    'copy': {'bitrate': {'keep_original': True}},
+    'audio': {'bitrate': {'keep_original': True}, 'abFusion': {'enabled': True, 'audioPhaseAdjust': True}},
+    'encode': {'bitrate': {'keep_original': True}, 'transform': {'flipH': True}},
+}
+
+SAMPLE_SIZES = ('1280x720', '1920x1080')
+
+
+def generate_samples(work_dir, duration):
+    """生成带音频的H.264测试视频"""
+    samples = []
+    for size in SAMPLE_SIZES:
+        path = os.path.join(work_dir, f"sample_{size}_{duration}s.mp4")
+        cmd = ['ffmpeg', '-f', 'lavfi', '-i', f'testsrc2=duration={duration}:size={size}:rate=30',
+               '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+               '-c:v', 'libx264', '-preset', 'veryfast', '-c:a', 'aac', '-shortest', '-y', path]
+        returncode, stderr_tail = run_ffmpeg(cmd, duration=duration)
+        if returncode != 0:
+            raise RuntimeError(f"生成测试视频失败: {stderr_tail}")
+        samples.append((path, duration))
+    return samples
+
+
+def probe_duration(path):
+    import json
+    import subprocess
+    result = subprocess.run(['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', path],
+                            capture_output=True, text=True)
+    try:
+        return float(json.loads(result.stdout)['format']['duration'])
+    except (ValueError, KeyError):
+        return None
+
+
+def bench(input_path, duration, mode, work_dir, repeat):
+    output_path = os.path.join(work_dir, f"out_{mode}{os.path.splitext(input_path)[1]}")
+    cmd = build_ffmpeg_command(input_path, output_path, BENCH_SETTINGS[mode])
+    assert get_processing_mode(cmd) == mode, f"设置未走预期的处理方式: {mode}"
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        returncode, stderr_tail = run_ffmpeg(cmd, duration=duration)
+        elapsed = time.perf_counter() - start
+        if returncode != 0:
+            raise RuntimeError(f"{mode} 处理失败: {stderr_tail}")
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FFmpeg流复制/重新编码基准测试')
+    parser.add_argument('inputs', nargs='*', help='测试视频，不指定时自动生成')
+    parser.add_argument('--duration', type=int, default=30, help='生成测试视频的时长（秒）')
+    parser.add_argument('--repeat', type=int, default=1, help='每项重复次数（取最快一次）')
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg'):
+        print('未找到ffmpeg，无法运行基准测试')
+        return 1
+
+    work_dir = tempfile.mkdtemp(prefix='ffmpeg_bench_')
+    try:
+        if args.inputs:
+            samples = [(path, probe_duration(path)) for path in args.inputs]
+        else:
+            print(f"生成测试视频（{args.duration}秒）...")
+            samples = generate_samples(work_dir, args.duration)
+
+        print(f"{'输入':<36} {'处理方式':<10} {'耗时(s)':>9} {'倍速':>8} {'MB/s':>9}")
+        for input_path, duration in samples:
+            size_mb = os.path.getsize(input_path) / (1024 * 1024)
+            for mode in ('copy', 'audio', 'encode'):
+                elapsed = bench(input_path, duration, mode, work_dir, args.repeat)
+                speed = f"{duration / elapsed:.1f}x" if duration else '-'
+                print(f"{os.path.basename(input_path):<36} {PROCESSING_MODE_NAMES[mode]:<10} "
+                      f"{elapsed:>9.2f} {speed:>8} {size_mb / elapsed:>9.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+视频指纹索引查询基准测试
+用随机指纹填充索引，测量建立分段索引的耗时和单次查询耗时（需要numpy）
+
+用法:
+    python benchmarks/fingerprint_index.py --videos 100000 --queries 1000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.video_fingerprint import VideoFingerprintIndex, NUMPY_AVAILABLE  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='视频指纹索引查询基准测试')
+    parser.add_argument('--videos', type=int, default=100000, help='索引中的视频数量')
+    parser.add_argument('--queries', type=int, default=1000, help='查询次数')
+    parser.add_argument('--flip-bits', type=int, default=12, help='查询指纹相对原指纹翻转的位数')
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        print('未安装numpy，无法运行基准测试')
+        return 1
+
+    import numpy as np
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        index = VideoFingerprintIndex(os.path.join(work_dir, 'fingerprint.db'))
+        index._ensure_loaded()
+        vectors = rng.integers(0, np.iinfo(np.uint64).max, size=(args.videos, index.frame_count),
+                               dtype=np.uint64, endpoint=True)
+        index._ids = list(range(args.videos))
+        index._vectors = vectors
+
+        start = time.perf_counter()
+        index._rebuild()
+        print(f"建立索引: {args.videos} 个视频，{time.perf_counter() - start:.3f}s")
+
+        # 查询：在随机选取的已有指纹上随机翻转若干位
+        targets = rng.integers(0, args.videos, size=args.queries)
+        queries = vectors[targets].copy()
+        for query in queries:
+            for bit in rng.choice(index.frame_count * 64, size=args.flip_bits, replace=False):
+                query[bit // 64] ^= np.uint64(1) << np.uint64(bit % 64)
+
+        found = 0
+        start = time.perf_counter()
+        for target, query in zip(targets, queries):
+            found += int(target) in index._search(query, index.max_distance)
+        elapsed = time.perf_counter() - start
+        print(f"查询: {args.queries} 次，平均 {elapsed * 1000 / args.queries:.3f}ms，"
+              f"召回 {found}/{args.queries}（翻转 {args.flip_bits} 位，阈值 {index.max_distance}）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite连接方式基准测试
+对比"每次操作新建连接"与 SQLiteStore 线程本地长连接的吞吐量，
+负载为上传历史式的 1次插入 + 1次按索引查询，并统计 "database is locked" 错误次数
+
+用法:
+    python benchmarks/sqlite_store.py --ops 5000 --threads 4
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sqlite_store import SQLiteStore  # noqa: E402
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cookie_name TEXT,
+    filename TEXT,
+    ts INTEGER
+)'''
+INSERT_SQL = 'INSERT INTO history (cookie_name, filename, ts) VALUES (?, ?, ?)'
+QUERY_SQL = 'SELECT COUNT(*) FROM history WHERE cookie_name = ? AND ts > ?'
+
+
+def op_connect_per_call(db_path, worker, i):
+    """原有写法：每次操作新建连接、提交后关闭"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute(INSERT_SQL, (f'cookie_{worker}', f'video_{i}.mp4', i))
+    conn.commit()
+    c.execute(QUERY_SQL, (f'cookie_{worker}', i - 100))
+    c.fetchone()
+    conn.close()
+
+
+def make_pooled_op(store):
+    def op(db_path, worker, i):
+        store.execute(INSERT_SQL, (f'cookie_{worker}', f'video_{i}.mp4', i))
+        store.fetchone(QUERY_SQL, (f'cookie_{worker}', i - 100))
+    return op
+
+
+def run(label, op, db_path, ops, threads):
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = ops // threads
+
+    def worker(n):
+        for i in range(per_thread):
+            try:
+                op(db_path, n, i)
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                with lock:
+                    errors[0] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} 线程 {threads}: {per_thread * threads / elapsed:9.0f} ops/s，"
+          f"database is locked {errors[0]} 次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite连接方式基准测试')
+    parser.add_argument('--ops', type=int, default=5000, help='每轮操作总数')
+    parser.add_argument('--threads', type=int, default=4, help='并发线程数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for threads in sorted({1, args.threads}):
+            db_path = os.path.join(work_dir, f'connect_{threads}.db')
+            conn = sqlite3.connect(db_path)
+            conn.execute(SCHEMA)
+            conn.close()
+            run('每次新建连接', op_connect_per_call, db_path, args.ops, threads)
+
+            store = SQLiteStore(os.path.join(work_dir, f'pooled_{threads}.db'))
+            store.execute(SCHEMA)
+            run('共享连接池', make_pooled_op(store), store.db_path, args.ops, threads)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,4 +4,55 @@
 """
 
 # Chrome浏览器路径配置
-LOCAL_CHROME_PATH = ""  # 留空使用系统默认Chromium，或设置为实际Chrome路径 
\ No newline at end of file
+LOCAL_CHROME_PATH = ""  # 留空使用系统默认Chromium，或设置为实际Chrome路径 
+
+# 浏览器池配置
+BROWSER_POOL_SIZE = 2  # 每组启动参数（headless/代理）最多常驻的浏览器进程数
+BROWSER_POOL_MAX_CONTEXTS = 4  # 单个浏览器同时承载的上下文数量
+BROWSER_POOL_RECYCLE_AFTER = 50  # 单个浏览器分配多少次上下文后回收重启
+BROWSER_POOL_IDLE_TIMEOUT = 600  # 浏览器空闲多少秒后关闭
+
+# 数据库配置
+SQLITE_BUSY_TIMEOUT = 30  # 数据库被其他连接锁定时最多等待的秒数
+FINGERPRINT_LAST_USED_FLUSH_INTERVAL = 30  # 浏览器指纹最后使用时间批量写回的间隔（秒）
+
+# 代理健康检查配置
+PROXY_HEALTH_CHECK_ENABLED = True  # 后台定时检测所有代理
+PROXY_HEALTH_CHECK_INTERVAL = 300  # 两轮检测之间的间隔（秒）
+PROXY_HEALTH_CHECK_URL = "http://httpbin.org/ip"  # 检测目标地址，返回200即视为可用
+PROXY_HEALTH_CHECK_TIMEOUT = 10  # 单个代理的检测超时（秒）
+PROXY_HEALTH_CHECK_CONCURRENCY = 20  # 同时检测的代理数量
+PROXY_HEALTH_EWMA_ALPHA = 0.3  # 延迟和成功率EWMA的平滑系数，越大越看重最近的结果
+PROXY_UNHEALTHY_AFTER = 3  # 连续失败多少次后标记为不可用（只影响新分配，已映射的账号仍使用该代理）
+
+# 上传调度配置
+UPLOAD_MAX_CONCURRENCY = 3  # 全局同时进行的视频上传数量
+
+# 浏览器实时画面配置
+BROWSER_SCREENCAST_ENABLED = True  # 使用CDP Page.startScreencast推送画面，关闭则回退到定时PNG截图
+BROWSER_SCREENCAST_QUALITY = 60  # JPEG画质（0-100）
+BROWSER_SCREENCAST_MAX_WIDTH = 1280  # 画面最大宽度（像素）
+BROWSER_SCREENCAST_MAX_HEIGHT = 1280  # 画面最大高度（像素）
+
+# 视频处理任务池配置
+VIDEO_JOB_MAX_WORKERS = 0  # 同时运行的FFmpeg进程数，0表示根据CPU核数和内存预算自动计算
+VIDEO_JOB_MEMORY_BUDGET_MB = 4096  # 视频处理可用的内存预算（MB），可用内存更小时以可用内存为准
+VIDEO_JOB_MEMORY_PER_ENCODE_MB = 600  # 单个FFmpeg编码进程预估占用内存（MB）
+
+# 远程视频管理配置
+VIDEO_LIST_NETWORK_CAPTURE = True  # 获取远程视频列表时读取作品列表接口响应，关闭则逐个解析页面卡片（会打开每个视频的权限弹窗）
+BULK_ACTION_REPLAY_ENABLED = True  # 批量删除/设置权限时录制第一个视频的接口请求并在页面内重放，失败的视频回退到逐个点击
+BULK_ACTION_CONCURRENCY = 3  # 同时重放的请求数
+BULK_ACTION_DELAY_RANGE = (0.5, 1.5)  # 每个请求发送前的随机间隔（秒）
+BULK_ACTION_MAX_CONSECUTIVE_FAILURES = 3  # 连续失败多少次后停止重放
+REMOTE_INVENTORY_TTL = 600  # 远程视频清单缓存有效期（秒），过期后先返回缓存再在后台增量刷新
+REMOTE_INVENTORY_FULL_REFRESH_INTERVAL = 3600  # 远程视频清单完整刷新间隔（秒），增量刷新只抓取新作品，旧作品的状态和数据靠完整刷新更新
+
+# 视频去重扫描配置
+MD5_SCAN_WORKERS = 0  # 并行计算MD5的进程数，0表示 min(CPU核数, 4)
+MD5_SCAN_CHUNK_SIZE_MB = 8  # 扫描时每次读取的大小（MB）
+
+# 视频感知指纹配置（需要numpy和ffmpeg）
+VIDEO_FINGERPRINT_ENABLED = True  # 上传前检查画面相近的已上传视频（剪辑后MD5不同的同一素材）
+VIDEO_FINGERPRINT_FRAMES = 8  # 每个视频抽取的帧数
+VIDEO_FINGERPRINT_MAX_DISTANCE = 24  # 判定为同一素材的最大总汉明距离（须小于 帧数*4）
@@ -1,15 +1,18 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright, Page
+from playwright.async_api import async_playwright, Page
 import os
 import asyncio
 
-from conf import LOCAL_CHROME_PATH
+from conf import LOCAL_CHROME_PATH, VIDEO_FINGERPRINT_ENABLED
 from utils.base_social_media import set_init_script
+from utils.browser_pool import browser_pool, run_in_thread
+from utils.cookie_validator import cookie_validator
 from utils.log import douyin_logger
 from utils.proxy_manager import proxy_manager
 from utils.md5_manager import md5_manager
+from utils.video_fingerprint import video_fingerprint_index
 
 
 def get_browser_launch_options(headless=True, proxy_config=None):
@@ -118,7 +121,26 @@ def get_browser_launch_options(headless=True, proxy_config=None):
     return options
 
 
-async def cookie_auth(account_file):
+async def cookie_auth(account_file, use_cache=True):
+    """验证cookie是否有效：优先使用缓存和HTTP探测，结果不确定时才启动浏览器验证"""
+    result = await cookie_validator.validate(account_file, use_cache=use_cache)
+    if result is not None:
+        douyin_logger.info(f"[+] cookie {'有效' if result else '失效'} (HTTP探测)")
+        return result
+
+    result = await browser_cookie_auth(account_file)
+    # 只缓存明确的结果（None 不写入缓存）
+    cookie_validator.store(account_file, result)
+    return result
+
+
+async def browser_cookie_auth(account_file):
+    """启动浏览器访问上传页验证cookie
+
+    Returns:
+        True/False: 明确的有效/失效结果
+        None: 页面加载超时或浏览器出错，无法判断
+    """
     from utils.fingerprint_manager import fingerprint_manager
     
     cookie_filename = os.path.basename(account_file)
@@ -128,37 +150,39 @@ async def cookie_auth(account_file):
     # 获取浏览器指纹配置
     fingerprint_config = fingerprint_manager.get_playwright_config(cookie_filename)
 
-    browser = None
-    context = None
+    # 使用指纹配置创建上下文
+    context_options = {
+        "storage_state": account_file,
+        **fingerprint_config
+    }
+    
+    # 添加代理配置
+    if proxy_config:
+        context_options["proxy"] = proxy_config
+
     try:
-        async with async_playwright() as playwright:
-            browser = await playwright.chromium.launch(**launch_options)
-            
-            # 使用指纹配置创建上下文
-            context_options = {
-                "storage_state": account_file,
-                **fingerprint_config
-            }
-            
-            # 添加代理配置
-            if proxy_config:
-                context_options["proxy"] = proxy_config
-                
-            context = await browser.new_context(**context_options)
+        async with browser_pool.context(launch_options, context_options) as context:
             context = await set_init_script(context, cookie_filename)
             
             # 创建一个新的页面
             page = await context.new_page()
-            # 访问指定的 URL
-            await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-            
+            # 访问指定的 URL（导航失败/网络错误时无法判断）
+            try:
+                await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+            except Exception as e:
+                douyin_logger.warning(f"上传页导航失败，无法判断cookie是否有效: {str(e)}")
+                return None
+
             try:
                 await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
             except Exception as e:
-                douyin_logger.warning(f"页面加载超时: {str(e)}")
-                print("[+] 等待5秒 cookie 失效")
-                return False
-                
+                # cookie失效时会从上传页重定向到登录页，停留在其他页面或出现登录入口即为失效
+                if "/content/upload" not in page.url or await page.get_by_text('手机号登录').count():
+                    print(f"[+] cookie 失效 - 已重定向到: {page.url}")
+                    return False
+                douyin_logger.warning(f"页面加载超时，无法判断cookie是否有效: {str(e)}")
+                return None
+
             # 2024.06.17 抖音创作者中心改版
             if await page.get_by_text('手机号登录').count():
                 print("[+] cookie 失效 - 检测到登录页面")
@@ -169,23 +193,12 @@ async def cookie_auth(account_file):
                 
     except Exception as e:
         douyin_logger.error(f"Cookie验证过程中发生错误: {str(e)}")
-        return False
-    finally:
-        # 确保资源总是被释放
-        if context:
-            try:
-                await context.close()
-            except Exception as e:
-                douyin_logger.warning(f"关闭浏览器上下文时出错: {str(e)}")
-        if browser:
-            try:
-                await browser.close()
-            except Exception as e:
-                douyin_logger.warning(f"关闭浏览器时出错: {str(e)}")
+        return None
 
 
 async def douyin_setup(account_file, handle=False, use_websocket=False, websocket_callback=None):
-    if not os.path.exists(account_file) or not await cookie_auth(account_file):
+    # cookie_auth 返回None表示无法判断（风控拦截、页面超时等），按有效处理，由上传页面自行检测登录态
+    if not os.path.exists(account_file) or await cookie_auth(account_file) is False:
         if not handle:
             # Todo alert message
             return False
@@ -281,7 +294,7 @@ class DouYinVideo(object):
         douyin_logger.info('视频出错了，重新上传中')
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright, location: str = "杭州市") -> None:
+    async def upload(self, location: str = "杭州市") -> None:
         from utils.fingerprint_manager import fingerprint_manager
         
         # 获取Cookie对应的代理配置
@@ -300,8 +313,6 @@ class DouYinVideo(object):
         
         # 使用 Chromium 浏览器启动一个浏览器实例
         launch_options = get_browser_launch_options(headless=headless_mode, proxy_config=proxy_config)
-            
-        browser = await playwright.chromium.launch(**launch_options)
         
         # 创建浏览器上下文配置，集成指纹配置
         context_options = {
@@ -316,9 +327,13 @@ class DouYinVideo(object):
         else:
             douyin_logger.info(f"未配置代理，使用直连 for cookie: {cookie_filename}")
             
-        # 创建一个浏览器上下文，使用指定的 cookie 文件、代理和指纹
-        context = await browser.new_context(**context_options)
-        context = await set_init_script(context, cookie_filename)
+        # 从浏览器池获取浏览器上下文，使用指定的 cookie 文件、代理和指纹
+        async with browser_pool.context(launch_options, context_options) as context:
+            context = await set_init_script(context, cookie_filename)
+            await self.publish(context, location)
+
+    async def publish(self, context, location: str = "杭州市") -> None:
+        """在已创建的浏览器上下文中完成上传和发布"""
 
         # 创建一个新的页面
         page = await context.new_page()
@@ -500,9 +515,6 @@ class DouYinVideo(object):
         douyin_logger.success('  [-]cookie更新完毕！')
         await self.notify_status("upload_progress", "更新Cookie信息...")
         await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
     
     async def set_thumbnail(self, page: Page, thumbnail_path: str):
         if thumbnail_path:
@@ -533,25 +545,48 @@ class DouYinVideo(object):
     async def main(self):
         # 检查视频是否重复上传
         douyin_logger.info(f"检查视频是否重复上传: {self.file_path}")
-        if md5_manager.is_duplicate(self.file_path):
+        # 计算MD5需要完整读取文件，放到线程中执行避免阻塞浏览器池事件循环
+        if await run_in_thread(md5_manager.is_duplicate, self.file_path):
             douyin_logger.warning(f"视频重复检测: 检测到该视频已经上传过，跳过上传: {os.path.basename(self.file_path)}")
             if self.status_handler:
                 await self.status_handler.handle_event("duplicate_detected", f"视频重复检测: 跳过上传已存在视频")
             return False
         
+        # 剪辑后MD5不同的同一素材，按画面指纹检查
+        if VIDEO_FINGERPRINT_ENABLED and video_fingerprint_index.available:
+            matches = await run_in_thread(video_fingerprint_index.find_near_duplicates, self.file_path, None, 1)
+            if matches:
+                match = matches[0]
+                douyin_logger.warning(f"视频重复检测: 画面与已上传视频 {match['filename']} 相近"
+                                      f"（账号 {match['cookie_name'] or '未知'}，距离 {match['distance']}），"
+                                      f"跳过上传: {os.path.basename(self.file_path)}")
+                if self.status_handler:
+                    await self.status_handler.handle_event("duplicate_detected", f"视频重复检测: 画面与已上传视频 {match['filename']} 相近，跳过上传")
+                return False
+        
         # 视频不重复，开始上传
         try:
-            async with async_playwright() as playwright:
-                await self.upload(playwright)
-                
+            await self.upload()
+
             # 上传成功后，记录视频MD5
             cookie_name = os.path.basename(self.account_file)
-            md5_manager.record_md5(
+            await run_in_thread(
+                md5_manager.record_md5,
                 self.file_path, 
                 cookie_name=cookie_name,
                 title=self.title, 
                 tags=self.tags
             )
+            if VIDEO_FINGERPRINT_ENABLED and video_fingerprint_index.available:
+                # MD5在线程中读取（record_md5 已写入摘要缓存），不在浏览器池事件循环中读文件
+                def add_fingerprint():
+                    video_fingerprint_index.add_video(
+                        self.file_path,
+                        md5=md5_manager.calculate_md5(self.file_path),
+                        cookie_name=cookie_name,
+                        title=self.title
+                    )
+                await run_in_thread(add_fingerprint)
             return True
         except Exception as e:
             douyin_logger.error(f"视频上传失败: {str(e)}")
@@ -69,6 +69,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // WebSocket和浏览器视图相关变量
     let socket = null;
     let currentBrowserSession = null;
+    let browserViewportSize = null;  // 画面对应的浏览器视口尺寸（CDP画面可能被缩放）
+    let browserFrameUrl = null;  // 当前画面的Blob URL
     
     // 缩放和平移相关变量
     let currentZoom = 1.0;
@@ -860,6 +862,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 <td>${proxy.host}:${proxy.port}</td>
                 <td><span class="proxy-status ${proxy.status}">${proxy.status === 'active' ? '活跃' : '不活跃'}</span></td>
                 <td>${proxy.speed_ms > 0 ? proxy.speed_ms + 'ms' : '-'}</td>
+                <td>${proxy.last_check ? Math.round(proxy.success_rate * 100) + '%' : '-'}</td>
                 <td class="proxy-actions">
                     <button class="test-btn" onclick="testProxy(${proxy.id})">
                         <i class="ri-pulse-line"></i> 测试
@@ -1084,8 +1087,12 @@ document.addEventListener('DOMContentLoaded', function() {
             handleBrowserStatus(data);
         });
         
-        socket.on('browser_screenshot', function(data) {
+        // 画面帧以二进制发送，处理完成后确认，服务端收到确认后才发送下一帧
+        socket.on('browser_frame', function(data, ack) {
             handleBrowserScreenshot(data);
+            if (typeof ack === 'function') {
+                ack();
+            }
         });
         
         socket.on('click_received', function(data) {
@@ -1153,6 +1160,22 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // 添加点击事件监听器
         setupBrowserScreenshotClick();
+        
+        // 订阅当前会话的画面和状态
+        if (socket && currentBrowserSession) {
+            socket.emit('subscribe_browser_view', {
+                session_id: currentBrowserSession
+            });
+        }
+    }
+    
+    // 退订浏览器会话
+    function unsubscribeBrowserView() {
+        if (socket && currentBrowserSession) {
+            socket.emit('unsubscribe_browser_view', {
+                session_id: currentBrowserSession
+            });
+        }
     }
     
     // 关闭浏览器视图
@@ -1169,6 +1192,7 @@ document.addEventListener('DOMContentLoaded', function() {
             setTimeout(() => {
                 if (browserViewModal && !browserViewModal.classList.contains('hidden')) {
                     browserViewModal.classList.add('hidden');
+                    unsubscribeBrowserView();
                     currentBrowserSession = null;
                     // 清理状态
                     browserScreenshot.src = '';
@@ -1178,6 +1202,7 @@ document.addEventListener('DOMContentLoaded', function() {
         } else {
             // 如果没有活跃会话，直接关闭UI
             browserViewModal.classList.add('hidden');
+            unsubscribeBrowserView();
             currentBrowserSession = null;
             
             // 清理状态
@@ -1248,8 +1273,14 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // 更新截图
-        browserScreenshot.src = data.screenshot;
+        // 更新截图（二进制帧转为Blob URL，并释放上一帧）
+        const previousUrl = browserFrameUrl;
+        browserFrameUrl = URL.createObjectURL(new Blob([data.frame], { type: data.mime || 'image/jpeg' }));
+        browserScreenshot.src = browserFrameUrl;
+        if (previousUrl) {
+            URL.revokeObjectURL(previousUrl);
+        }
+        browserViewportSize = (data.width && data.height) ? { width: data.width, height: data.height } : null;
         
         // 确保图片完整显示，不被裁切
         browserScreenshot.onload = function() {
@@ -1310,8 +1341,10 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // 获取点击坐标（相对于图片，考虑缩放）
             const rect = browserScreenshot.getBoundingClientRect();
-            const scaleX = browserScreenshot.naturalWidth / (rect.width / currentZoom);
-            const scaleY = browserScreenshot.naturalHeight / (rect.height / currentZoom);
+            const sourceWidth = browserViewportSize ? browserViewportSize.width : browserScreenshot.naturalWidth;
+            const sourceHeight = browserViewportSize ? browserViewportSize.height : browserScreenshot.naturalHeight;
+            const scaleX = sourceWidth / (rect.width / currentZoom);
+            const scaleY = sourceHeight / (rect.height / currentZoom);
             
             // 计算在实际浏览器中的坐标
             const browserX = Math.round((event.clientX - rect.left) * scaleX / currentZoom);
@@ -2633,6 +2666,9 @@ document.addEventListener('DOMContentLoaded', function() {
                         loadCookies();
                     }
                     alert('Cookie验证成功，可以正常使用');
+                } else if (data.valid === null) {
+                    // 无法判断（风控拦截、页面超时等），不标记为失效
+                    alert(data.message);
                 } else {
                     // Cookie无效，添加到失效列表
                     expiredCookies.add(selectedCookie);
@@ -4387,7 +4423,8 @@ ${videoList}${moreVideos}`);
                         setTimeout(() => closeUploadProgress(progressDialog), 3000);
                         
                     } else if (data.status === 'processing') {
-                        updateUploadProgress(progressDialog, 80, '正在解压...', data.message || '');
+                        const percent = data.bytes_total ? Math.round(data.bytes_done * 100 / data.bytes_total) : 80;
+                        updateUploadProgress(progressDialog, percent, '正在解压...', data.message || '');
                         setTimeout(checkStatus, 1000);
                         
                     } else {
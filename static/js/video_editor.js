@@ -1755,6 +1755,13 @@ async function processTaskVideo(task) {
         
         const result = await response.json();
         
+        // 文件夹处理会提交到后端任务池，轮询任务进度直到结束
+        if (response.ok && result.success && result.job_id) {
+            task.jobId = result.job_id;
+            await waitForVideoJob(task, result.job_id);
+            return;
+        }
+        
         if (response.ok && result.success) {
             // 更新任务状态为完成
             updateTaskStatus(task.id, 'completed', 100, result);
@@ -1769,6 +1776,47 @@ async function processTaskVideo(task) {
     }
 }
 
+// 轮询后端视频处理任务进度
+async function waitForVideoJob(task, jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        
+        // 任务已在前端取消
+        if (task.status !== 'processing') return;
+        
+        const response = await fetch(`/api/video/jobs/${jobId}`);
+        const job = await response.json();
+        
+        if (!response.ok || !job.success) {
+            updateTaskStatus(task.id, 'failed', 100, null, job.message || '查询任务进度失败');
+            return;
+        }
+        
+        if (job.status === 'running' || job.status === 'cancelling') {
+            updateTaskStatus(task.id, 'processing', Math.min(99, Math.round(job.progress)));
+            continue;
+        }
+        
+        if (job.processed_files.length > 0) {
+            let message = `成功处理 ${job.processed_files.length} 个视频`;
+            if (job.failed_files.length > 0) {
+                message += `，${job.failed_files.length} 个视频处理失败`;
+            }
+            updateTaskStatus(task.id, 'completed', 100, {
+                success: true,
+                processed_files: job.processed_files,
+                failed_files: job.failed_files,
+                output_file: job.processed_files.length === 1 ? job.processed_files[0].processed : '',
+                message: message
+            });
+        } else {
+            const errorMsg = job.status === 'cancelled' ? '任务已取消' : `所有视频处理失败: ${job.failed_files.join('; ')}`;
+            updateTaskStatus(task.id, 'failed', 100, null, errorMsg);
+        }
+        return;
+    }
+}
+
 // 取消任务
 function cancelTask(taskId) {
     const taskIndex = tasksList.findIndex(t => t.id === taskId);
@@ -1778,7 +1826,11 @@ function cancelTask(taskId) {
     
     // 如果任务正在处理中，尝试取消处理
     if (task.status === 'processing') {
-        // TODO: 添加向后端发送取消请求的代码
+        // 通知后端取消任务池中的处理（终止正在运行的FFmpeg）
+        if (task.jobId) {
+            fetch(`/api/video/jobs/${task.jobId}/cancel`, { method: 'POST' })
+                .catch(error => console.error('取消后端任务失败:', error));
+        }
         
         // 更新任务状态为失败
         updateTaskStatus(taskId, 'failed', 100, null, '任务已取消');
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+压缩包解压模块
+只读取压缩包的成员列表决定要提取的文件（视频及同名的txt描述、封面图片），
+逐个成员流式写入videos目录下的最终位置，不再整包解压到临时目录后再移动；
+视频在写入的同时计算MD5并写入摘要缓存，进度按字节报告
+"""
+
+import hashlib
+import os
+import shutil
+import time
+import uuid
+import zipfile
+
+from utils.log import douyin_logger
+from utils.md5_manager import md5_manager, hash_file, file_identity, HASH_CHUNK_SIZE, VIDEO_EXTENSIONS
+
+# 尝试导入压缩包解压库
+try:
+    import rarfile
+    RARFILE_AVAILABLE = True
+except ImportError:
+    RARFILE_AVAILABLE = False
+    print("警告: rarfile 库未安装，无法解压 .rar 文件")
+
+try:
+    import py7zr
+    PY7ZR_AVAILABLE = True
+except ImportError:
+    PY7ZR_AVAILABLE = False
+    print("警告: py7zr 库未安装，无法解压 .7z 文件")
+
+# 视频的封面图片扩展名，按顺序只提取第一个找到的
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+# 进度回调的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+
+def safe_member_parts(name):
+    """把成员名拆分为路径各级，绝对路径或包含 .. 的成员返回None"""
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or ':' in parts[0] or name.startswith(('/', '\\')):
+        return None
+    return parts
+
+
+def _unique_name(target_dir, file_name, reserved):
+    """目标目录中已存在或本次已分配的文件名后追加 _1、_2..."""
+    base_name, extension = os.path.splitext(file_name)
+    target_name = file_name
+    counter = 1
+    while os.path.join(target_dir, target_name) in reserved or os.path.exists(os.path.join(target_dir, target_name)):
+        target_name = f"{base_name}_{counter}{extension}"
+        counter += 1
+    return target_name
+
+
+def plan_extraction(members, dest_dir):
+    """根据成员列表确定要提取的文件及其最终路径，保持压缩包内的文件夹结构
+
+    Args:
+        members: [(key, name, size)]，key 为读取该成员时使用的对象
+
+    Returns:
+        (list, int): ([{key, name, size, target, is_video}], 跳过的成员数)
+    """
+    by_dir = {}
+    for key, name, size in members:
+        parts = safe_member_parts(name)
+        if parts is None:
+            douyin_logger.warning(f"跳过不安全的压缩包成员: {name}")
+            continue
+        by_dir.setdefault(tuple(parts[:-1]), {})[parts[-1]] = (key, name, size)
+
+    planned = []
+    reserved = set()
+    for dir_parts, files in by_dir.items():
+        target_dir = os.path.join(dest_dir, *dir_parts)
+        for file_name, (key, name, size) in files.items():
+            if not file_name.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            target_name = _unique_name(target_dir, file_name, reserved)
+            target_path = os.path.join(target_dir, target_name)
+            reserved.add(target_path)
+            planned.append({'key': key, 'name': name, 'size': size, 'target': target_path, 'is_video': True})
+
+            # 同名的描述文件和封面图片跟随视频的目标文件名
+            base_name = os.path.splitext(file_name)[0]
+            target_base = os.path.splitext(target_path)[0]
+            companions = [base_name + '.txt']
+            image = next((base_name + ext for ext in IMAGE_EXTENSIONS if base_name + ext in files), None)
+            if image:
+                companions.append(image)
+            for companion in companions:
+                if companion in files:
+                    c_key, c_name, c_size = files[companion]
+                    c_target = target_base + os.path.splitext(companion)[1]
+                    reserved.add(c_target)
+                    planned.append({'key': c_key, 'name': c_name, 'size': c_size, 'target': c_target,
+                                    'is_video': False})
+
+    skipped = len(members) - len(planned)
+    return planned, skipped
+
+
+class ArchiveExtractor:
+    """压缩包流式解压"""
+
+    def __init__(self, archive_path, dest_dir="videos", progress_callback=None):
+        """
+        Args:
+            progress_callback: (已写入字节数, 需写入总字节数, 已提取视频数) 回调
+        """
+        self.archive_path = archive_path
+        self.dest_dir = dest_dir
+        self.progress_callback = progress_callback
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.video_count = 0
+        self.file_count = 0
+        self.skipped = 0
+        self._last_progress = 0
+
+    def run(self):
+        """解压压缩包，返回统计信息"""
+        name = self.archive_path.lower()
+        if name.endswith('.zip'):
+            with zipfile.ZipFile(self.archive_path, 'r') as archive:
+                members = [(info, info.filename, info.file_size) for info in archive.infolist() if not info.is_dir()]
+                self._stream_members(archive, members)
+        elif name.endswith('.rar') and RARFILE_AVAILABLE:
+            with rarfile.RarFile(self.archive_path) as archive:
+                members = [(info, info.filename, info.file_size) for info in archive.infolist() if not info.is_dir()]
+                self._stream_members(archive, members)
+        elif name.endswith('.7z') and PY7ZR_AVAILABLE:
+            self._extract_7z()
+        else:
+            raise Exception(f"不支持的文件格式: {os.path.basename(self.archive_path)}")
+
+        self._report(force=True)
+        return {
+            'video_count': self.video_count,
+            'file_count': self.file_count,
+            'skipped': self.skipped,
+            'bytes': self.bytes_done
+        }
+
+    def _plan(self, members):
+        planned, self.skipped = plan_extraction(members, self.dest_dir)
+        self.bytes_total = sum(item['size'] for item in planned)
+        self._report(force=True)
+        return planned
+
+    def _report(self, force=False):
+        now = time.time()
+        if self.progress_callback and (force or now - self._last_progress >= PROGRESS_INTERVAL):
+            self._last_progress = now
+            self.progress_callback(self.bytes_done, self.bytes_total, self.video_count)
+
+    def _finish_file(self, item, identity=None, md5_value=None):
+        """文件已写入最终位置：计数，视频写入MD5摘要缓存"""
+        self.file_count += 1
+        if item['is_video']:
+            self.video_count += 1
+            if identity and md5_value:
+                md5_manager.store_cached_md5(identity, item['target'], md5_value)
+        douyin_logger.info(f"提取文件: {item['name']} -> {item['target']}")
+
+    def _stream_members(self, archive, members):
+        """zip/rar：逐个成员打开读取流，写入临时文件后原子替换为最终文件"""
+        for item in self._plan(members):
+            os.makedirs(os.path.dirname(item['target']), exist_ok=True)
+            part_path = item['target'] + '.part'
+            md5_hash = hashlib.md5() if item['is_video'] else None
+            try:
+                with archive.open(item['key']) as src, open(part_path, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+                        dst.write(chunk)
+                        if md5_hash:
+                            md5_hash.update(chunk)
+                        self.bytes_done += len(chunk)
+                        self._report()
+                os.replace(part_path, item['target'])
+            except Exception as e:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                douyin_logger.error(f"提取文件失败: {item['name']}, 错误: {str(e)}")
+                continue
+            identity = file_identity(os.stat(item['target'])) if md5_hash else None
+            self._finish_file(item, identity, md5_hash.hexdigest() if md5_hash else None)
+
+    def _extract_7z(self):
+        """7z：py7zr 不支持按成员读取流，只解压选中的成员到videos下的暂存目录（同一文件系统），
+        再重命名到最终位置并计算MD5"""
+        staging_dir = os.path.join(self.dest_dir, f".extracting_{uuid.uuid4().hex[:8]}")
+        try:
+            with py7zr.SevenZipFile(self.archive_path, mode='r') as archive:
+                members = [(info.filename, info.filename, info.uncompressed or 0)
+                           for info in archive.list() if not info.is_directory]
+                planned = self._plan(members)
+                if planned:
+                    archive.extract(path=staging_dir, targets=[item['name'] for item in planned])
+
+            for item in planned:
+                source_path = os.path.join(staging_dir, *safe_member_parts(item['name']))
+                if not os.path.exists(source_path):
+                    douyin_logger.error(f"提取文件失败: {item['name']}, 解压后未找到文件")
+                    continue
+                os.makedirs(os.path.dirname(item['target']), exist_ok=True)
+                os.replace(source_path, item['target'])
+                identity, md5_value = hash_file(item['target']) if item['is_video'] else (None, None)
+                self.bytes_done += item['size']
+                self._finish_file(item, identity, md5_value)
+                self._report()
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
@@ -1,14 +1,13 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
 from utils.fingerprint_manager import fingerprint_manager
+from utils.human_behavior import BEHAVIOR_SCRIPT
 
-async def set_init_script(context, cookie_name=None):
-    """设置初始化脚本，包括浏览器指纹伪装和人类行为模拟"""
-    from utils.human_behavior import human_behavior
-    
-    # 注入人类行为模拟脚本
-    await human_behavior.add_behavior_script(context)
-    
-    # 增强反检测脚本
-    basic_anti_detect_script = """
+# 增强反检测脚本
+ANTI_DETECT_SCRIPT = """
     // 增强反检测脚本
     (function() {
         'use strict';
@@ -217,18 +216,90 @@ async def set_init_script(context, cookie_name=None):
         console.log('🛡️ 增强反检测脚本已激活 - 所有已知检测方法已被规避');
     })();
     """
+
+
+def minify_script(script):
+    """去掉缩进、空行和整行的 // 注释
+
+    保留换行（不依赖分号自动插入规则），含模板字符串（反引号）的脚本原样返回
+    """
+    if '`' in script:
+        return script.strip()
+    lines = []
+    for line in script.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def isolate_script(script):
+    """用 try/catch 包裹脚本，合并后某一部分运行时抛出异常不影响其余部分"""
+    return 'try {\n' + script + '\n} catch (e) {}'
+
+
+class InitScriptBundleCache:
+    """初始化脚本合并缓存
+
+    把人类行为模拟、反检测和指纹伪装脚本合并压缩成一个脚本，每个上下文只调用一次 add_init_script。
+    合并结果按指纹JSON的哈希缓存，指纹重新生成后哈希变化，旧的合并脚本随之淘汰
+    """
+
+    def __init__(self, max_bundles=256):
+        self.max_bundles = max_bundles
+        self._bundles = OrderedDict()  # 指纹哈希 -> 合并脚本
+        self._cookie_keys = {}  # cookie -> 当前指纹哈希
+        self._lock = threading.Lock()
+        self._base_script = (isolate_script(minify_script(BEHAVIOR_SCRIPT)) + '\n'
+                             + isolate_script(minify_script(ANTI_DETECT_SCRIPT)))
+
+    def get_script(self, cookie_name=None):
+        """返回合并后的初始化脚本，未指定cookie时不含指纹伪装"""
+        if not cookie_name:
+            return self._base_script
+
+        fingerprint_json = fingerprint_manager.get_fingerprint_json(cookie_name)
+        key = hashlib.sha1(fingerprint_json.encode('utf-8')).hexdigest()
+        with self._lock:
+            script = self._bundles.get(key)
+            if script is not None:
+                self._bundles.move_to_end(key)
+                return script
+
+        fingerprint_script = fingerprint_manager.inject_fingerprint_script(json.loads(fingerprint_json))
+        script = self._base_script + '\n' + isolate_script(minify_script(fingerprint_script))
+        with self._lock:
+            # 指纹已重新生成，淘汰该账号旧指纹的合并脚本
+            old_key = self._cookie_keys.get(cookie_name)
+            if old_key and old_key != key:
+                self._bundles.pop(old_key, None)
+            self._cookie_keys[cookie_name] = key
+            self._bundles[key] = script
+            while len(self._bundles) > self.max_bundles:
+                self._bundles.popitem(last=False)
+        return script
+
+    def clear(self):
+        with self._lock:
+            self._bundles.clear()
+            self._cookie_keys.clear()
+
+
+# 全局初始化脚本缓存实例
+init_script_bundles = InitScriptBundleCache()
+
+
+async def set_init_script(context, cookie_name=None):
+    """设置初始化脚本，包括浏览器指纹伪装和人类行为模拟（合并为一个脚本注入）"""
+    try:
+        script = init_script_bundles.get_script(cookie_name)
+    except Exception as e:
+        print(f"❌ 注入浏览器指纹失败: {str(e)}")
+        script = init_script_bundles.get_script()
+        cookie_name = None
     
-    # 注入基础反检测脚本
-    await context.add_init_script(basic_anti_detect_script)
-    
-    # 如果提供了cookie名称，则注入对应的浏览器指纹
+    await context.add_init_script(script)
     if cookie_name:
-        try:
-            fingerprint = fingerprint_manager.get_or_create_fingerprint(cookie_name)
-            fingerprint_script = fingerprint_manager.inject_fingerprint_script(fingerprint)
-            await context.add_init_script(fingerprint_script)
-            print(f"✅ 已为 {cookie_name} 注入浏览器指纹伪装")
-        except Exception as e:
-            print(f"❌ 注入浏览器指纹失败: {str(e)}")
+        print(f"✅ 已为 {cookie_name} 注入浏览器指纹伪装")
     
-    return context 
\ No newline at end of file
+    return context
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+浏览器池模块
+常驻若干个预热的Chromium进程，按启动参数签名（headless/代理/可执行路径）分组，
+为每个账号分配相互隔离的BrowserContext，避免每次上传、验证、删除都重新启动浏览器
+"""
+
+import asyncio
+import functools
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from conf import BROWSER_POOL_SIZE, BROWSER_POOL_MAX_CONTEXTS, BROWSER_POOL_RECYCLE_AFTER, BROWSER_POOL_IDLE_TIMEOUT
+from utils.log import douyin_logger
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """在默认线程池中执行阻塞函数，避免阻塞浏览器池事件循环（asyncio.to_thread 需要 Python 3.9+）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+class PooledBrowser:
+    """池中的单个浏览器进程"""
+
+    def __init__(self, browser, signature):
+        self.browser = browser
+        self.signature = signature
+        self.uses = 0  # 已分配过的上下文数量
+        self.active_contexts = 0  # 当前正在使用的上下文数量
+        self.retired = False  # 达到回收次数后不再分配新上下文
+        self.last_used = time.time()
+
+    @property
+    def healthy(self):
+        return not self.retired and self.browser.is_connected()
+
+
+class BrowserPool:
+    """Chromium浏览器池
+
+    Playwright对象只能在创建它的事件循环中使用，因此浏览器池自带一个常驻事件循环线程，
+    所有使用浏览器的协程都通过 run()/submit() 投递到该循环中执行。
+    """
+
+    def __init__(self, max_browsers=BROWSER_POOL_SIZE, max_contexts_per_browser=BROWSER_POOL_MAX_CONTEXTS,
+                 recycle_after=BROWSER_POOL_RECYCLE_AFTER, idle_timeout=BROWSER_POOL_IDLE_TIMEOUT,
+                 health_check_interval=30):
+        self.max_browsers = max_browsers  # 每个签名最多保持的浏览器进程数
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.recycle_after = recycle_after  # 单个浏览器分配N次上下文后回收重启
+        self.idle_timeout = idle_timeout  # 空闲超过该秒数的浏览器会被关闭
+        self.health_check_interval = health_check_interval
+
+        self._loop = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._playwright = None
+        self._browsers = {}  # signature -> [PooledBrowser]
+        self._launching = {}  # signature -> 正在启动（已预留名额）的浏览器数量
+        self._lock = None  # asyncio.Condition，在池事件循环中创建；归还上下文或移除浏览器时通知等待分配的协程
+        self._health_task = None
+
+    # ---------- 事件循环 ----------
+
+    def _ensure_loop(self):
+        """启动浏览器池的常驻事件循环线程"""
+        with self._thread_lock:
+            if self._loop and self._thread and self._thread.is_alive():
+                return self._loop
+
+            ready = threading.Event()
+
+            def loop_thread():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                self._lock = asyncio.Condition()
+                self._health_task = loop.create_task(self._health_check_loop())
+                ready.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=loop_thread, name="browser-pool", daemon=True)
+            self._thread.start()
+            ready.wait()
+            douyin_logger.info("浏览器池事件循环已启动")
+            return self._loop
+
+    @property
+    def loop(self):
+        return self._ensure_loop()
+
+    def submit(self, coro):
+        """将协程投递到浏览器池事件循环，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout=None):
+        """在浏览器池事件循环中执行协程并同步等待结果（供线程中的同步代码调用）"""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在浏览器池事件循环内部同步等待协程")
+        return self.submit(coro).result(timeout)
+
+    # ---------- 浏览器分配 ----------
+
+    @staticmethod
+    def _signature(launch_options):
+        """根据启动参数计算分组签名"""
+        return json.dumps({
+            'headless': launch_options.get('headless', True),
+            'proxy': launch_options.get('proxy'),
+            'executable_path': launch_options.get('executable_path'),
+        }, sort_keys=True)
+
+    async def _launch(self, launch_options, signature):
+        """启动浏览器进程（在锁外执行，调用方已预留名额），由调用方加入分组"""
+        browser = await self._playwright.chromium.launch(**launch_options)
+        browser.on("disconnected", lambda _: self._on_disconnected())
+        return PooledBrowser(browser, signature)
+
+    def _on_disconnected(self):
+        douyin_logger.warning("浏览器池: 检测到浏览器进程断开，将在下次分配时替换")
+        # 唤醒等待分配的协程，由其移除崩溃的浏览器后重新分配
+        self._loop.create_task(self._notify())
+
+    async def _notify(self):
+        async with self._lock:
+            self._lock.notify_all()
+
+    async def _close_browser(self, pooled):
+        browsers = self._browsers.get(pooled.signature, [])
+        if pooled in browsers:
+            browsers.remove(pooled)
+        try:
+            if pooled.browser.is_connected():
+                await pooled.browser.close()
+        except Exception as e:
+            douyin_logger.warning(f"浏览器池: 关闭浏览器时出错: {str(e)}")
+
+    async def _prune(self, signature):
+        """移除崩溃的浏览器，关闭已到回收次数且空闲的浏览器"""
+        for pooled in list(self._browsers.get(signature, [])):
+            if not pooled.browser.is_connected():
+                douyin_logger.warning("浏览器池: 移除已崩溃的浏览器")
+                await self._close_browser(pooled)
+            elif pooled.retired and pooled.active_contexts == 0:
+                douyin_logger.info(f"浏览器池: 浏览器已使用{pooled.uses}次，回收重启")
+                await self._close_browser(pooled)
+
+    def _assign(self, pooled):
+        pooled.uses += 1
+        pooled.active_contexts += 1
+        pooled.last_used = time.time()
+        if pooled.uses >= self.recycle_after:
+            pooled.retired = True
+        return pooled
+
+    async def _acquire(self, launch_options):
+        """分配浏览器：优先使用有空闲名额的浏览器，分组未满时预留名额并在锁外启动新浏览器，
+        分组已满时等待其他上下文归还，不超过 max_contexts_per_browser"""
+        signature = self._signature(launch_options)
+        async with self._lock:
+            while True:
+                await self._prune(signature)
+                healthy = [b for b in self._browsers.get(signature, []) if b.healthy]
+                free = [b for b in healthy if b.active_contexts < self.max_contexts_per_browser]
+
+                if free:
+                    return self._assign(min(free, key=lambda b: b.active_contexts))
+                if len(healthy) + self._launching.get(signature, 0) < max(1, self.max_browsers):
+                    break
+                await self._lock.wait()
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._launching[signature] = self._launching.get(signature, 0) + 1
+
+        # 启动浏览器较慢，在锁外进行，不阻塞其他分组的分配和归还
+        pooled = None
+        try:
+            pooled = await self._launch(launch_options, signature)
+        finally:
+            async with self._lock:
+                self._launching[signature] -= 1
+                if not self._launching[signature]:
+                    self._launching.pop(signature)
+                if pooled is not None:
+                    self._browsers.setdefault(signature, []).append(pooled)
+                    self._assign(pooled)
+                    douyin_logger.info(f"浏览器池: 启动新浏览器 (当前分组数量: {len(self._browsers[signature])})")
+                # 新浏览器的其余名额可供等待者使用；启动失败时释放预留的名额
+                self._lock.notify_all()
+        return pooled
+
+    async def _release(self, pooled):
+        async with self._lock:
+            pooled.active_contexts = max(0, pooled.active_contexts - 1)
+            pooled.last_used = time.time()
+            if not pooled.browser.is_connected() or (pooled.retired and pooled.active_contexts == 0):
+                await self._close_browser(pooled)
+            self._lock.notify_all()
+
+    @asynccontextmanager
+    async def context(self, launch_options, context_options):
+        """从池中分配一个隔离的浏览器上下文，退出时自动关闭上下文并归还浏览器
+
+        Args:
+            launch_options: get_browser_launch_options() 返回的启动参数
+            context_options: browser.new_context() 的参数（指纹、代理、storage_state等）
+        """
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("浏览器池上下文必须在浏览器池事件循环中使用，请通过 browser_pool.run() 调用")
+
+        context = None
+        pooled = None
+        for attempt in range(2):
+            pooled = await self._acquire(launch_options)
+            try:
+                context = await pooled.browser.new_context(**context_options)
+                break
+            except Exception as e:
+                crashed = not pooled.browser.is_connected()
+                await self._release(pooled)
+                if not crashed or attempt == 1:
+                    raise
+                douyin_logger.warning(f"浏览器池: 浏览器已崩溃，替换后重试: {str(e)}")
+
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception as e:
+                douyin_logger.warning(f"关闭浏览器上下文时出错: {str(e)}")
+            await self._release(pooled)
+
+    # ---------- 健康检查与关闭 ----------
+
+    async def health_check(self):
+        """清理崩溃、待回收以及空闲超时的浏览器"""
+        async with self._lock:
+            now = time.time()
+            for signature in list(self._browsers.keys()):
+                await self._prune(signature)
+                for pooled in list(self._browsers.get(signature, [])):
+                    if pooled.active_contexts == 0 and now - pooled.last_used > self.idle_timeout:
+                        douyin_logger.info("浏览器池: 关闭空闲超时的浏览器")
+                        await self._close_browser(pooled)
+                if not self._browsers.get(signature):
+                    self._browsers.pop(signature, None)
+            self._lock.notify_all()
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                douyin_logger.error(f"浏览器池健康检查失败: {str(e)}")
+
+    def get_stats(self):
+        """获取浏览器池状态"""
+        stats = []
+        for signature, browsers in list(self._browsers.items()):
+            for pooled in browsers:
+                stats.append({
+                    'signature': json.loads(signature),
+                    'connected': pooled.browser.is_connected(),
+                    'uses': pooled.uses,
+                    'active_contexts': pooled.active_contexts,
+                    'retired': pooled.retired,
+                    'last_used': pooled.last_used
+                })
+        return stats
+
+    async def _shutdown(self):
+        async with self._lock:
+            for browsers in list(self._browsers.values()):
+                for pooled in list(browsers):
+                    await self._close_browser(pooled)
+            self._browsers.clear()
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+    def shutdown(self):
+        """关闭所有浏览器和Playwright驱动"""
+        if not self._loop or not self._thread or not self._thread.is_alive():
+            return
+        try:
+            self.run(self._shutdown(), timeout=30)
+        except Exception as e:
+            douyin_logger.error(f"关闭浏览器池失败: {str(e)}")
+
+
+# 全局浏览器池实例
+browser_pool = BrowserPool()
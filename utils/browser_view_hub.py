@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+浏览器画面分发模块
+每个浏览器会话对应一个Socket.IO房间，画面和状态只发送给订阅了该会话的客户端；
+画面以二进制发送，每个客户端只保留最新一帧：上一帧未确认前到达的新帧会覆盖旧帧，
+慢客户端直接丢帧而不会在服务端堆积缓冲
+"""
+
+import threading
+import time
+
+from utils.log import douyin_logger
+
+# 客户端超过该时间未确认上一帧，视为确认丢失，继续发送
+FRAME_ACK_TIMEOUT = 5
+
+
+class ViewerSlot:
+    """单个客户端的帧发送状态"""
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.inflight_since = None  # 已发送但未确认的帧的发送时间
+        self.pending = None  # 等待发送的最新帧
+        self.sent = 0
+        self.dropped = 0
+
+
+class BrowserViewHub:
+    """按会话分发浏览器画面和状态"""
+
+    def __init__(self, socketio=None):
+        self.socketio = socketio
+        self._viewers = {}  # session_id -> {sid: ViewerSlot}
+        self._latest = {}  # session_id -> 最新一帧
+        self._status = {}  # session_id -> 最新状态
+        self._lock = threading.Lock()
+
+    def init_app(self, socketio):
+        self.socketio = socketio
+
+    @staticmethod
+    def room(session_id):
+        return f"browser_{session_id}"
+
+    # ---------- 订阅 ----------
+
+    def subscribe(self, session_id, sid):
+        """客户端订阅会话，立即补发最新状态和最新一帧
+
+        Returns:
+            bool: 是否已有画面可补发
+        """
+        with self._lock:
+            self._viewers.setdefault(session_id, {})[sid] = ViewerSlot(sid)
+            status = self._status.get(session_id)
+            frame = self._latest.get(session_id)
+        self.socketio.server.enter_room(sid, self.room(session_id), namespace='/')
+        douyin_logger.info(f"客户端 {sid} 订阅浏览器会话 {session_id}")
+        if status:
+            self.socketio.emit('browser_status', status, to=sid)
+        if frame:
+            self._offer(session_id, sid, frame)
+        return frame is not None
+
+    def unsubscribe(self, session_id, sid):
+        with self._lock:
+            viewers = self._viewers.get(session_id)
+            if viewers:
+                viewers.pop(sid, None)
+                if not viewers:
+                    del self._viewers[session_id]
+        try:
+            self.socketio.server.leave_room(sid, self.room(session_id), namespace='/')
+        except Exception:
+            pass  # 客户端已断开
+
+    def remove_client(self, sid):
+        """客户端断开时退出所有会话"""
+        with self._lock:
+            session_ids = [session_id for session_id, viewers in self._viewers.items() if sid in viewers]
+        for session_id in session_ids:
+            self.unsubscribe(session_id, sid)
+
+    def viewer_count(self, session_id):
+        with self._lock:
+            return len(self._viewers.get(session_id, {}))
+
+    # ---------- 发送 ----------
+
+    def emit(self, event, data, session_id):
+        """向订阅了会话的客户端发送事件"""
+        self.socketio.emit(event, data, to=self.room(session_id))
+
+    def emit_status(self, session_id, data):
+        """发送浏览器状态，并记录最新状态供后订阅的客户端补发"""
+        data = {'session_id': session_id, **data}
+        with self._lock:
+            self._status[session_id] = data
+        self.emit('browser_status', data, session_id)
+
+    def publish_frame(self, session_id, image, mime='image/jpeg', width=None, height=None, timestamp=None):
+        """发布一帧画面（image为二进制图片数据）"""
+        frame = {
+            'session_id': session_id,
+            'frame': image,
+            'mime': mime,
+            'width': width,
+            'height': height,
+            'timestamp': timestamp or time.time()
+        }
+        with self._lock:
+            self._latest[session_id] = frame
+            sids = list(self._viewers.get(session_id, {}))
+        for sid in sids:
+            self._offer(session_id, sid, frame)
+
+    def _offer(self, session_id, sid, frame):
+        with self._lock:
+            slot = self._viewers.get(session_id, {}).get(sid)
+            if slot is None:
+                return
+            if slot.inflight_since and time.time() - slot.inflight_since < FRAME_ACK_TIMEOUT:
+                # 上一帧尚未确认，只保留最新一帧
+                if slot.pending is not None:
+                    slot.dropped += 1
+                slot.pending = frame
+                return
+            slot.inflight_since = time.time()
+            slot.pending = None
+            slot.sent += 1
+        self._send(session_id, sid, frame)
+
+    def _send(self, session_id, sid, frame):
+        try:
+            self.socketio.emit('browser_frame', frame, to=sid,
+                               callback=lambda *args: self._on_ack(session_id, sid))
+        except Exception as e:
+            douyin_logger.warning(f"发送画面到客户端 {sid} 失败: {str(e)}")
+            with self._lock:
+                slot = self._viewers.get(session_id, {}).get(sid)
+                if slot:
+                    slot.inflight_since = None
+
+    def _on_ack(self, session_id, sid):
+        with self._lock:
+            slot = self._viewers.get(session_id, {}).get(sid)
+            if slot is None:
+                return
+            frame = slot.pending
+            slot.pending = None
+            if frame is None:
+                slot.inflight_since = None
+                return
+            slot.inflight_since = time.time()
+            slot.sent += 1
+        self._send(session_id, sid, frame)
+
+    # ---------- 清理 ----------
+
+    def clear_session(self, session_id):
+        """会话结束时清理最新帧和状态（订阅关系保留到客户端退订或断开）"""
+        with self._lock:
+            self._latest.pop(session_id, None)
+            self._status.pop(session_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                session_id: [{'sid': slot.sid, 'sent': slot.sent, 'dropped': slot.dropped}
+                             for slot in viewers.values()]
+                for session_id, viewers in self._viewers.items()
+            }
+
+
+# 全局浏览器画面分发实例
+browser_view_hub = BrowserViewHub()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+远程视频批量操作模块
+第一个视频仍通过页面点击完成，同时录制页面发出的写请求（删除/修改可见范围）；
+其余视频把录制请求中的作品ID替换后，在已登录的页面内用 fetch 重放，
+限制并发并加入随机间隔，逐个返回结果，重放失败的视频交回页面点击流程处理
+"""
+
+import asyncio
+import json
+import random
+from urllib.parse import urlparse
+
+from conf import BULK_ACTION_CONCURRENCY, BULK_ACTION_DELAY_RANGE, BULK_ACTION_MAX_CONSECUTIVE_FAILURES
+from utils.log import douyin_logger
+
+# 只录制创作者中心接口域名上的 XHR/fetch 请求，排除埋点、日志上报等同样带有作品ID的请求
+CREATOR_API_HOST = 'creator.douyin.com'
+RECORDABLE_RESOURCE_TYPES = ('xhr', 'fetch')
+
+# 可录制的写接口路径关键字
+DELETE_API_KEYWORDS = ('aweme/delete', 'item/delete')
+PERMISSION_API_KEYWORDS = ('aweme/update', 'item/update', 'permission', 'private_status', 'visibility')
+
+# 浏览器不允许 fetch 设置的请求头，由浏览器自动填写
+FORBIDDEN_HEADERS = ('cookie', 'host', 'origin', 'referer', 'user-agent', 'content-length', 'connection',
+                     'accept-encoding')
+
+# 在页面内发送请求，带上页面的登录Cookie
+REPLAY_SCRIPT = """
+async ({method, url, headers, body}) => {
+    const response = await fetch(url, {method, headers, body, credentials: 'include'});
+    const text = await response.text();
+    return {status: response.status, text: text.slice(0, 4000)};
+}
+"""
+
+
+def _status_code(text):
+    """接口返回JSON中的 status_code，无法解析时返回None"""
+    try:
+        payload = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return payload.get('status_code') if isinstance(payload, dict) else None
+
+
+class RecordedRequest:
+    """录制到的写请求，item_id 为录制时操作的作品ID"""
+
+    def __init__(self, item_id, method, url, headers, post_data, status_code=None):
+        self.item_id = item_id
+        self.method = method
+        self.url = url
+        self.headers = {k: v for k, v in headers.items()
+                        if not k.startswith(':') and not k.lower().startswith('sec-') and k.lower() not in FORBIDDEN_HEADERS}
+        self.post_data = post_data
+        self.status_code = status_code  # 录制请求的响应 status_code
+
+    def for_item(self, item_id):
+        """替换作品ID后的请求参数"""
+        return {
+            'method': self.method,
+            'url': self.url.replace(self.item_id, item_id),
+            'headers': self.headers,
+            'body': self.post_data.replace(self.item_id, item_id) if self.post_data else None
+        }
+
+    @property
+    def replayable(self):
+        """录制请求本身返回成功（status_code 为0）时才能重放，否则无法区分成功与错误响应"""
+        return self.status_code == 0
+
+    def is_success(self, status, text):
+        """重放响应必须是 2xx 且JSON的 status_code 为0，非JSON响应视为失败"""
+        return 200 <= status < 300 and _status_code(text) == 0
+
+
+class ActionRecorder:
+    """录制页面操作某个作品时发出的第一个写请求
+
+    只录制创作者中心接口域名上、路径匹配 api_keywords 的非GET XHR/fetch 请求，且URL或请求体中包含作品ID
+    """
+
+    def __init__(self, page, item_id, api_keywords):
+        self.page = page
+        self.item_id = str(item_id)
+        self.api_keywords = api_keywords
+        self.request = None
+        self._response_task = None
+        page.on('request', self._on_request)
+
+    def _on_request(self, request):
+        if self.request is not None or request.method == 'GET':
+            return
+        if request.resource_type not in RECORDABLE_RESOURCE_TYPES:
+            return
+        parsed = urlparse(request.url)
+        if parsed.hostname != CREATOR_API_HOST or not any(keyword in parsed.path for keyword in self.api_keywords):
+            return
+        if self.item_id not in request.url and self.item_id not in (request.post_data or ''):
+            return
+        self.request = request
+        self._response_task = asyncio.ensure_future(self._read_response(request))
+
+    async def _read_response(self, request):
+        try:
+            response = await request.response()
+            return _status_code(await response.text()) if response else None
+        except Exception:
+            return None
+
+    async def finish(self, timeout=5):
+        """停止录制，返回 RecordedRequest，没有录制到时返回None"""
+        self.page.remove_listener('request', self._on_request)
+        if self.request is None:
+            return None
+        status_code = None
+        try:
+            status_code = await asyncio.wait_for(self._response_task, timeout)
+        except asyncio.TimeoutError:
+            pass
+        headers = await self.request.all_headers()
+        return RecordedRequest(self.item_id, self.request.method, self.request.url, headers,
+                               self.request.post_data, status_code)
+
+
+async def replay_action(page, recorded, item_ids, on_result=None, concurrency=BULK_ACTION_CONCURRENCY,
+                        delay_range=BULK_ACTION_DELAY_RANGE, max_consecutive_failures=BULK_ACTION_MAX_CONSECUTIVE_FAILURES):
+    """对多个作品重放录制的请求
+
+    连续失败达到 max_consecutive_failures 次时停止（通常是接口签名或参数不能复用），未执行的作品不出现在结果中
+
+    Args:
+        on_result: async 回调 (item_id, success, message)
+
+    Returns:
+        dict: {item_id: (success, message)}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+    consecutive_failures = 0
+    aborted = False
+
+    async def replay(item_id):
+        nonlocal consecutive_failures, aborted
+        async with semaphore:
+            if aborted:
+                return
+            await asyncio.sleep(random.uniform(*delay_range))
+            try:
+                response = await page.evaluate(REPLAY_SCRIPT, recorded.for_item(item_id))
+                success = recorded.is_success(response['status'], response['text'])
+                message = "成功" if success else f"HTTP {response['status']}: {response['text'][:200]}"
+            except Exception as e:
+                success, message = False, str(e)
+
+            results[item_id] = (success, message)
+            consecutive_failures = 0 if success else consecutive_failures + 1
+            if consecutive_failures >= max_consecutive_failures and not aborted:
+                aborted = True
+                douyin_logger.warning(f"批量重放连续失败 {consecutive_failures} 次，停止重放: {message}")
+            if on_result:
+                await on_result(item_id, success, message)
+
+    await asyncio.gather(*(replay(item_id) for item_id in item_ids))
+    return results
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Cookie有效性检测模块
+读取storage_state中的cookie，通过HTTP请求创作者中心接口判断登录状态，
+结果按cookie文件缓存（文件修改后自动失效），只有无法判断时才需要启动浏览器验证
+"""
+
+import json
+import os
+import threading
+import time
+
+import httpx
+
+from utils.log import douyin_logger
+from utils.proxy_manager import proxy_manager
+
+# 创作者中心轻量接口：已登录返回用户信息，未登录返回错误码或跳转登录页
+CREATOR_PROBE_URL = "https://creator.douyin.com/web/api/media/user/info/"
+CREATOR_REFERER = "https://creator.douyin.com/creator-micro/content/upload"
+# 判断登录态必须存在的cookie
+SESSION_COOKIE_NAMES = ("sessionid", "sessionid_ss", "sid_tt")
+
+
+class CookieValidator:
+    """基于HTTP探测的Cookie有效性检测器"""
+
+    def __init__(self, valid_ttl=600, invalid_ttl=120, timeout=10):
+        self.valid_ttl = valid_ttl  # 有效结果缓存时间（秒）
+        self.invalid_ttl = invalid_ttl  # 失效结果缓存时间（秒）
+        self.timeout = timeout
+        self._cache = {}  # account_file -> (file_key, result, checked_at)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_key(account_file):
+        """cookie文件标识，文件被重新保存后缓存自动失效"""
+        try:
+            stat = os.stat(account_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def get_cached(self, account_file):
+        """获取缓存的检测结果，未命中返回None"""
+        file_key = self._file_key(account_file)
+        with self._lock:
+            entry = self._cache.get(account_file)
+        if not entry or file_key is None:
+            return None
+        cached_key, result, checked_at = entry
+        ttl = self.valid_ttl if result else self.invalid_ttl
+        if cached_key != file_key or time.time() - checked_at > ttl:
+            return None
+        return result
+
+    def store(self, account_file, result):
+        """写入检测结果"""
+        file_key = self._file_key(account_file)
+        if file_key is None or result is None:
+            return
+        with self._lock:
+            self._cache[account_file] = (file_key, bool(result), time.time())
+
+    def invalidate(self, account_file=None):
+        """清除指定cookie（或全部）的缓存"""
+        with self._lock:
+            if account_file is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(account_file, None)
+
+    @staticmethod
+    def _load_cookies(account_file):
+        """读取storage_state中抖音域名下未过期的cookie"""
+        with open(account_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        now = time.time()
+        cookies = {}
+        for cookie in state.get('cookies', []):
+            if 'douyin.com' not in cookie.get('domain', ''):
+                continue
+            expires = cookie.get('expires', -1)
+            if expires and 0 < expires < now:
+                continue
+            cookies[cookie['name']] = cookie['value']
+        return cookies
+
+    def _build_proxy_url(self, account_file):
+        proxy_config = proxy_manager.get_proxy_for_playwright(os.path.basename(account_file))
+        if not proxy_config:
+            return None
+        server = proxy_config['server']
+        if proxy_config.get('username') and proxy_config.get('password'):
+            scheme, _, address = server.partition('://')
+            return f"{scheme}://{proxy_config['username']}:{proxy_config['password']}@{address}"
+        return server
+
+    async def probe(self, account_file):
+        """HTTP探测cookie是否有效
+
+        Returns:
+            True/False: 明确的有效/失效结果
+            None: 无法判断（网络错误、接口变化等），需要回退到浏览器验证
+        """
+        if not os.path.exists(account_file):
+            return False
+
+        try:
+            cookies = self._load_cookies(account_file)
+        except Exception as e:
+            douyin_logger.warning(f"读取cookie文件失败: {account_file}, {str(e)}")
+            return False
+
+        if not any(name in cookies for name in SESSION_COOKIE_NAMES):
+            douyin_logger.info(f"Cookie缺少登录态字段或已过期: {os.path.basename(account_file)}")
+            return False
+
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                          "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Referer": CREATOR_REFERER,
+            "Accept": "application/json, text/plain, */*",
+        }
+
+        try:
+            async with httpx.AsyncClient(proxy=self._build_proxy_url(account_file), cookies=cookies,
+                                         headers=headers, timeout=self.timeout,
+                                         follow_redirects=False) as client:
+                response = await client.get(CREATOR_PROBE_URL)
+        except Exception as e:
+            douyin_logger.warning(f"Cookie HTTP探测失败，将回退到浏览器验证: {str(e)}")
+            return None
+
+        # 跳转到登录页说明登录态失效
+        if response.is_redirect:
+            location = response.headers.get('location', '')
+            if 'login' in location or 'passport' in location:
+                return False
+            return None
+
+        # 403 通常是风控/WAF拦截了不带浏览器特征的请求，不代表登录态失效，返回None交给浏览器验证判断
+        if response.status_code == 401:
+            return False
+        if response.status_code != 200:
+            return None
+
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+
+        status_code = data.get('status_code')
+        if status_code == 0 and data.get('user'):
+            return True
+        message = str(data.get('status_msg') or data.get('message') or '')
+        if status_code == 8 or '登录' in message or 'login' in message.lower():
+            return False
+        return None
+
+    async def validate(self, account_file, use_cache=True):
+        """检测cookie有效性，优先使用缓存，无法判断时返回None"""
+        if use_cache:
+            cached = self.get_cached(account_file)
+            if cached is not None:
+                return cached
+
+        result = await self.probe(account_file)
+        self.store(account_file, result)
+        return result
+
+
+# 全局Cookie检测器实例
+cookie_validator = CookieValidator()
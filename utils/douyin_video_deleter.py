@@ -7,17 +7,113 @@
 
 import os
 import asyncio
-from playwright.async_api import Playwright, async_playwright
 from utils.base_social_media import set_init_script
+from utils.browser_pool import browser_pool
 from utils.log import douyin_logger
 from utils.fingerprint_manager import fingerprint_manager
 from utils.proxy_manager import proxy_manager
 from utils.human_behavior import HumanBehaviorSimulator
+from utils.bulk_actions import ActionRecorder, replay_action, DELETE_API_KEYWORDS, PERMISSION_API_KEYWORDS
+from utils.remote_inventory import remote_inventory
+from conf import BULK_ACTION_REPLAY_ENABLED
 from main import get_browser_launch_options
 from datetime import datetime
 import time
 import random
 
+# 创作者中心作品列表接口的URL特征，只解析这些响应
+VIDEO_LIST_API_KEYWORDS = ('work_list', 'aweme/post', 'aweme/list')
+
+# 作品 status.private_status -> 可见范围，与权限弹窗的选项值一致
+PRIVATE_STATUS_NAMES = {
+    0: "公开",
+    1: "仅自己可见",
+    2: "好友可见",
+}
+
+# 作品 statistics 字段 -> 页面上的数据标签
+STATISTICS_LABELS = {
+    'play_count': "播放",
+    'digg_count': "点赞",
+    'comment_count': "评论",
+    'share_count': "分享",
+    'collect_count': "收藏",
+}
+
+
+def parse_aweme_item(item):
+    """解析作品列表接口中的单个作品，接口未提供的字段为None（之后从页面补充）"""
+    if not isinstance(item, dict):
+        return None
+    aweme_id = str(item.get('aweme_id') or item.get('item_id') or '')
+    if not aweme_id:
+        return None
+
+    status = item.get('status') if isinstance(item.get('status'), dict) else {}
+    visibility = PRIVATE_STATUS_NAMES.get(status.get('private_status'))
+    if visibility is None and 'is_private' in status:
+        visibility = "仅自己可见" if status['is_private'] else "公开"
+
+    create_time = item.get('create_time')
+    publish_time = (datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M')
+                    if isinstance(create_time, (int, float)) and create_time > 0 else None)
+
+    statistics = item.get('statistics')
+    metrics = ({label: str(statistics[key]) for key, label in STATISTICS_LABELS.items() if key in statistics}
+               if isinstance(statistics, dict) else None)
+
+    return {
+        "aweme_id": aweme_id,
+        "title": (item.get('desc') or '').strip() or None,
+        "status": visibility,
+        "in_review": bool(status.get('in_reviewing')),
+        "publish_time": publish_time,
+        "metrics": metrics,
+        "card_element": None
+    }
+
+
+class VideoListCapture:
+    """监听页面上作品列表接口的JSON响应（需在打开作品管理页之前创建）"""
+
+    def __init__(self, page):
+        self.page = page
+        self.items = {}  # aweme_id -> 作品信息，保持接口返回顺序
+        self.responses = 0  # 已解析的列表响应数量
+        self.has_more = True
+        self._tasks = set()
+        page.on('response', self._on_response)
+
+    def _on_response(self, response):
+        if not any(keyword in response.url for keyword in VIDEO_LIST_API_KEYWORDS):
+            return
+        task = asyncio.ensure_future(self._parse(response))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _parse(self, response):
+        try:
+            payload = await response.json()
+        except Exception:
+            return  # 非JSON响应或页面已关闭
+        aweme_list = payload.get('aweme_list') if isinstance(payload, dict) else None
+        if not isinstance(aweme_list, list):
+            return
+        self.responses += 1
+        for item in aweme_list:
+            video = parse_aweme_item(item)
+            if video and video['aweme_id'] not in self.items:
+                self.items[video['aweme_id']] = video
+        self.has_more = bool(payload.get('has_more'))
+
+    async def wait_idle(self):
+        """等待已收到的响应解析完成"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def close(self):
+        self.page.remove_listener('response', self._on_response)
+
 
 class DouyinVideoDeleter:
     """抖音视频删除器"""
@@ -162,6 +258,195 @@ class DouyinVideoDeleter:
         
         return video_details
     
+    def capture_video_list(self, page) -> VideoListCapture:
+        """开始监听作品列表接口（在 page.goto 作品管理页之前调用）"""
+        return VideoListCapture(page)
+    
+    async def get_video_details_from_network(self, page, capture: VideoListCapture, max_idle_scrolls: int = 3,
+                                             known_ids: set = None) -> list:
+        """从作品列表接口响应中获取视频信息
+        
+        滚动页面触发分页加载，直到接口返回没有更多或连续几次滚动没有新作品；
+        接口缺少的字段才从页面卡片补充，没有捕获到接口响应时回退到逐个解析卡片
+        
+        Args:
+            known_ids: 已缓存的作品ID，增量抓取时加载到已知作品所在的分页即停止
+        """
+        await self.notify_status("获取视频详情", "正在读取作品列表接口数据...")
+        await page.wait_for_timeout(2000)
+        
+        idle_scrolls = 0
+        try:
+            while capture.has_more and idle_scrolls < max_idle_scrolls:
+                await capture.wait_idle()
+                if known_ids and not known_ids.isdisjoint(capture.items):
+                    break
+                known = len(capture.items)
+                try:
+                    await page.locator('.video-card-zQ02ng').last.scroll_into_view_if_needed(timeout=3000)
+                except Exception:
+                    pass
+                await page.mouse.wheel(0, 3000)
+                await page.wait_for_timeout(1200)
+                await capture.wait_idle()
+                idle_scrolls = idle_scrolls + 1 if len(capture.items) == known else 0
+                await self.notify_status("视频扫描", f"📊 已获取 {len(capture.items)} 个视频")
+        finally:
+            capture.close()
+        
+        if not capture.responses:
+            douyin_logger.warning("未捕获到作品列表接口响应，改为逐个解析视频卡片")
+            return await self.get_video_details(page)
+        
+        video_details = list(capture.items.values())
+        for i, video in enumerate(video_details):
+            video["index"] = i
+        await self._fill_missing_from_dom(page, video_details)
+        
+        await self.notify_status("视频扫描", f"📊 共获取 {len(video_details)} 个视频")
+        return video_details
+    
+    async def _fill_missing_from_dom(self, page, video_details: list):
+        """从页面卡片补充接口中缺少的字段（卡片顺序与接口返回顺序一致）"""
+        missing = [video for video in video_details
+                   if None in (video["title"], video["status"], video["publish_time"], video["metrics"])]
+        cards = await page.locator('.video-card-zQ02ng').all() if missing else []
+        
+        for video in missing:
+            i = video["index"]
+            card = cards[i] if i < len(cards) else None
+            try:
+                if card is not None and video["title"] is None:
+                    video["title"] = (await card.locator('.info-title-text-YTLo9y').text_content() or "").strip() or None
+                if card is not None and video["publish_time"] is None:
+                    video["publish_time"] = (await card.locator('.info-time-iAYLF0').text_content() or "").strip() or None
+                if card is not None and video["status"] is None:
+                    # 只使用卡片上的标记判断，不再打开权限弹窗
+                    if await card.locator('.private-mark-WxEWEv').count() > 0:
+                        video["status"] = "仅自己可见"
+                    else:
+                        status_element = card.locator('.info-status-AIgxHw')
+                        if await status_element.count() > 0 and (await status_element.text_content() or "") == "已发布":
+                            video["status"] = "已发布"
+                if card is not None and video["metrics"] is None:
+                    metrics = {}
+                    for metric in await card.locator('.metric-item-u1CAYE').all():
+                        label = await metric.locator('.metric-label-AX_5OF').text_content() or ""
+                        if label:
+                            metrics[label] = await metric.locator('.metric-value-k4R5P_').text_content() or "0"
+                    video["metrics"] = metrics
+            except Exception as e:
+                douyin_logger.warning(f"补充第 {i + 1} 个视频信息时出错: {str(e)}")
+            
+            video["title"] = video["title"] or f"视频 {i + 1}"
+            video["publish_time"] = video["publish_time"] or "未知时间"
+            video["status"] = video["status"] or "其他状态"
+            video["metrics"] = video["metrics"] or {}
+    
+    async def _apply_bulk_action(self, page, capture: VideoListCapture, target_videos: list, ui_action,
+                                 api_keywords) -> dict:
+        """网络层批量操作
+        
+        第一个视频通过页面点击完成并录制写请求，其余视频在页面内重放该请求；
+        没有作品ID、未录制到请求或重放失败的视频不在返回结果中，由调用方继续用页面点击处理。
+        批量上传的视频常有同名作品，作品ID按卡片位置对应，结果按卡片索引返回
+        
+        Args:
+            target_videos: [{index, card, title}]，能确定作品ID的视频会补充 aweme_id 字段
+            ui_action: async (video_info) -> bool，通过页面点击处理单个视频
+            api_keywords: 可录制的写接口路径关键字
+        
+        Returns:
+            dict: {卡片索引: 是否成功}
+        """
+        await capture.wait_idle()
+        capture.close()
+        captured = list(capture.items.values())
+        title_counts = {}
+        for video in captured:
+            title_counts[video["title"]] = title_counts.get(video["title"], 0) + 1
+        unique_ids = {video["title"]: video["aweme_id"] for video in captured if title_counts[video["title"]] == 1}
+        
+        for video in target_videos:
+            i = video["index"]
+            # 卡片顺序与接口返回顺序一致，同名作品按位置对应
+            if i < len(captured) and captured[i]["title"] == video["title"]:
+                video["aweme_id"] = captured[i]["aweme_id"]
+            elif video["title"] in unique_ids:
+                video["aweme_id"] = unique_ids[video["title"]]
+        # 接口中没有出现的标题从清单中查找（清单只返回不重名的标题）
+        missing_titles = [video["title"] for video in target_videos
+                          if "aweme_id" not in video and video["title"] not in title_counts]
+        if missing_titles:
+            inventory_ids = remote_inventory.ids_by_title(self.cookie_filename, missing_titles)
+            for video in target_videos:
+                if "aweme_id" not in video and video["title"] in inventory_ids:
+                    video["aweme_id"] = inventory_ids[video["title"]]
+        
+        targets = []
+        seen_ids = set()
+        for video in target_videos:
+            if video.get("aweme_id") and video["aweme_id"] not in seen_ids:
+                seen_ids.add(video["aweme_id"])
+                targets.append(video)
+        if len(targets) < 2:
+            return {}
+        
+        # 第一个视频：页面点击并录制请求
+        first_video = targets[0]
+        recorder = ActionRecorder(page, first_video["aweme_id"], api_keywords)
+        first_success = await ui_action(first_video)
+        recorded = await recorder.finish()
+        if recorded is not None and not recorded.replayable:
+            # 页面点击流程不检查接口结果，以录制到的响应为准
+            await self.notify_status("批量模式", f"⚠️ 接口返回错误(status_code={recorded.status_code})，不重放，继续逐个点击处理")
+            return {first_video["index"]: False}
+        handled = {first_video["index"]: first_success}
+        if not first_success or recorded is None:
+            await self.notify_status("批量模式", "⚠️ 未录制到可重放的请求，继续逐个点击处理")
+            return handled
+        
+        await self.notify_status("批量模式", f"⚡ 已录制请求，开始批量处理其余 {len(targets) - 1} 个视频")
+        videos_by_id = {video["aweme_id"]: video for video in targets[1:]}
+        done = [1]
+        
+        async def report(aweme_id, success, message):
+            done[0] += 1
+            mark = "✅" if success else "❌"
+            await self.notify_status("进度更新", f"{mark} {done[0]}/{len(targets)}「{videos_by_id[aweme_id]['title']}」{message}")
+        
+        results = await replay_action(page, recorded, list(videos_by_id), on_result=report)
+        for aweme_id, (success, _) in results.items():
+            if success:
+                handled[videos_by_id[aweme_id]["index"]] = True
+        
+        # 页面上的卡片已过期，刷新后再处理剩余视频
+        await page.reload()
+        await page.wait_for_timeout(3000)
+        return handled
+    
+    async def _build_title_index(self, page) -> dict:
+        """一次读取页面上所有卡片的标题，构建 {标题: [卡片索引]}（页面刷新后需要重建）"""
+        titles = await page.locator('.video-card-zQ02ng').evaluate_all(
+            "cards => cards.map(card => (card.querySelector('.info-title-text-YTLo9y')?.textContent || '').trim())")
+        title_index = {}
+        for i, title in enumerate(titles):
+            title_index.setdefault(title, []).append(i)
+        return title_index
+    
+    def _sync_inventory(self, succeeded_videos: list, status: str = None):
+        """按作品ID把操作成功的视频同步到远程视频清单，status 为None表示已删除；
+        有视频无法确定作品ID时清单整体失效，下次获取列表时完整抓取"""
+        if not succeeded_videos:
+            return
+        aweme_ids = [video["aweme_id"] for video in succeeded_videos if video.get("aweme_id")]
+        if len(aweme_ids) < len(succeeded_videos):
+            remote_inventory.invalidate(self.cookie_filename)
+        elif status is None:
+            remote_inventory.remove_videos(self.cookie_filename, aweme_ids)
+        else:
+            remote_inventory.set_status(self.cookie_filename, aweme_ids, status)
+    
     async def get_video_permission_status(self, page, video_card) -> str:
         """获取视频的真实权限状态"""
         try:
@@ -377,26 +662,23 @@ class DouyinVideoDeleter:
         launch_options = get_browser_launch_options(headless=headless_mode, proxy_config=proxy_config)
         fingerprint_config = fingerprint_manager.get_playwright_config(self.cookie_filename)
         
-        browser = None
-        context = None
+        context_options = {
+            "storage_state": self.account_file,
+            **fingerprint_config
+        }
+        
+        if proxy_config:
+            context_options["proxy"] = proxy_config
+        
         success_count = 0
         
         try:
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(**launch_options)
-                
-                context_options = {
-                    "storage_state": self.account_file,
-                    **fingerprint_config
-                }
-                
-                if proxy_config:
-                    context_options["proxy"] = proxy_config
-                
-                context = await browser.new_context(**context_options)
+            async with browser_pool.context(launch_options, context_options) as context:
                 context = await set_init_script(context, self.cookie_filename)
                 
                 page = await context.new_page()
+                # 在打开页面之前开始监听作品列表接口，用于按标题找到作品ID
+                capture = self.capture_video_list(page) if BULK_ACTION_REPLAY_ENABLED else None
                 
                 await self.notify_status("访问页面", "正在访问抖音创作者中心...")
                 await page.goto("https://creator.douyin.com/creator-micro/content/manage")
@@ -448,12 +730,14 @@ class DouyinVideoDeleter:
                 target_videos = []
                 if video_titles:
                     # 根据标题精确匹配视频
+                    videos_by_title = {}
+                    for video_info in all_videos:
+                        videos_by_title.setdefault(video_info["title"], video_info)
                     for target_title in video_titles:
-                        for video_info in all_videos:
-                            if video_info["title"] == target_title.strip():
-                                target_videos.append(video_info)
-                                await self.notify_status("视频匹配", f"✅ 找到匹配视频: 「{video_info['title']}」(索引:{video_info['index']})")
-                                break
+                        video_info = videos_by_title.get(target_title.strip())
+                        if video_info:
+                            target_videos.append(video_info)
+                            await self.notify_status("视频匹配", f"✅ 找到匹配视频: 「{video_info['title']}」(索引:{video_info['index']})")
                         else:
                             await self.notify_status("视频未找到", f"❌ 未找到匹配视频: 「{target_title}」")
                 else:
@@ -468,11 +752,22 @@ class DouyinVideoDeleter:
                 await self.notify_status("任务开始", f"📋 批量权限设置任务 - 目标: {permission_name}")
                 await self.notify_status("任务详情", f"🎯 匹配到 {len(target_videos)} 个视频，计划设置 {set_count} 个")
                 
+                # 优先在页面内批量重放接口请求，剩余的视频逐个点击处理
+                handled = {}
+                if capture:
+                    handled = await self._apply_bulk_action(
+                        page, capture, target_videos[:set_count],
+                        lambda video: self.set_video_permission(page, video["card"], permission_value, video["title"]),
+                        PERMISSION_API_KEYWORDS)
+                success_count += sum(1 for ok in handled.values() if ok)
+                succeeded_videos = [video for video in target_videos[:set_count] if handled.get(video["index"])]
+                failed_videos = [video["title"] for video in target_videos[:set_count] if handled.get(video["index"]) is False]
+                ui_videos = [video for video in target_videos[:set_count] if video["index"] not in handled]
+                
                 # 逐个设置匹配的视频权限
-                failed_videos = []
-                for i in range(set_count):
+                for i in range(len(ui_videos)):
                     try:
-                        video_info = target_videos[i]
+                        video_info = ui_videos[i]
                         video_index = video_info["index"]
                         video_title = video_info["title"]
                         
@@ -518,20 +813,24 @@ class DouyinVideoDeleter:
                         
                         if await self.set_video_permission(page, video_card, permission_value, video_title):
                             success_count += 1
+                            succeeded_videos.append(video_info)
                         else:
                             failed_videos.append(video_title)
                         
                         # 每设置几个视频后刷新页面
-                        if (i + 1) % 3 == 0 and i + 1 < set_count:
+                        if (i + 1) % 3 == 0 and i + 1 < len(ui_videos):
                             await self.notify_status("页面刷新", f"🔄 已处理 {i+1} 个视频，刷新页面继续...")
                             await page.reload()
                             await page.wait_for_timeout(3000)
                         
                     except Exception as e:
-                        failed_videos.append(target_videos[i]["title"] if i < len(target_videos) else f"第{i+1}个视频")
+                        failed_videos.append(ui_videos[i]["title"] if i < len(ui_videos) else f"第{i+1}个视频")
                         await self.notify_status("处理异常", f"❌ 第 {i + 1} 个视频处理异常: {str(e)}")
                         continue
                 
+                # 同步远程视频清单
+                self._sync_inventory(succeeded_videos, permission_name)
+                
                 # 生成详细的完成报告
                 failed_count = len(failed_videos)
                 success_rate = round((success_count / set_count) * 100, 1) if set_count > 0 else 0
@@ -561,19 +860,6 @@ class DouyinVideoDeleter:
                 "success_count": success_count,
                 "total_videos": 0
             }
-        
-        finally:
-            # 确保资源释放
-            if context:
-                try:
-                    await context.close()
-                except Exception as e:
-                    douyin_logger.warning(f"关闭浏览器上下文时出错: {str(e)}")
-            if browser:
-                try:
-                    await browser.close()
-                except Exception as e:
-                    douyin_logger.warning(f"关闭浏览器时出错: {str(e)}")
     
     async def delete_single_video(self, page, video_card, video_index: int) -> bool:
         """删除单个视频"""
@@ -710,24 +996,18 @@ class DouyinVideoDeleter:
         launch_options = get_browser_launch_options(headless=headless_mode, proxy_config=proxy_config)
         fingerprint_config = fingerprint_manager.get_playwright_config(self.cookie_filename)
         
-        browser = None
-        context = None
+        # 使用指纹配置创建上下文
+        context_options = {
+            "storage_state": self.account_file,
+            **fingerprint_config
+        }
+        
+        # 添加代理配置
+        if proxy_config:
+            context_options["proxy"] = proxy_config
         
         try:
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(**launch_options)
-                
-                # 使用指纹配置创建上下文
-                context_options = {
-                    "storage_state": self.account_file,
-                    **fingerprint_config
-                }
-                
-                # 添加代理配置
-                if proxy_config:
-                    context_options["proxy"] = proxy_config
-                
-                context = await browser.new_context(**context_options)
+            async with browser_pool.context(launch_options, context_options) as context:
                 context = await set_init_script(context, self.cookie_filename)
                 
                 # 创建页面
@@ -836,6 +1116,10 @@ class DouyinVideoDeleter:
                         await self.notify_status("删除错误", f"❌ 删除第 {i + 1} 个视频时出错: {str(e)}")
                         continue
                 
+                # 按顺序删除时不记录标题，清单整体失效，下次获取列表时重新完整抓取
+                if success_count:
+                    remote_inventory.invalidate(self.cookie_filename)
+                
                 # 生成详细的完成报告
                 failed_count = len(failed_videos)
                 success_rate = round((success_count / delete_count) * 100, 1) if delete_count > 0 else 0
@@ -865,19 +1149,6 @@ class DouyinVideoDeleter:
                 "deleted_count": self.deleted_count,
                 "total_videos": self.total_videos
             }
-        
-        finally:
-            # 确保资源释放
-            if context:
-                try:
-                    await context.close()
-                except Exception as e:
-                    douyin_logger.warning(f"关闭浏览器上下文时出错: {str(e)}")
-            if browser:
-                try:
-                    await browser.close()
-                except Exception as e:
-                    douyin_logger.warning(f"关闭浏览器时出错: {str(e)}")
     
     async def delete_specific_videos(self, video_titles: list, status_callback=None) -> dict:
         """删除指定标题的视频"""
@@ -897,26 +1168,23 @@ class DouyinVideoDeleter:
         launch_options = get_browser_launch_options(headless=headless_mode, proxy_config=proxy_config)
         fingerprint_config = fingerprint_manager.get_playwright_config(self.cookie_filename)
         
-        browser = None
-        context = None
+        context_options = {
+            "storage_state": self.account_file,
+            **fingerprint_config
+        }
+        
+        if proxy_config:
+            context_options["proxy"] = proxy_config
+        
         success_count = 0
         
         try:
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(**launch_options)
-                
-                context_options = {
-                    "storage_state": self.account_file,
-                    **fingerprint_config
-                }
-                
-                if proxy_config:
-                    context_options["proxy"] = proxy_config
-                
-                context = await browser.new_context(**context_options)
+            async with browser_pool.context(launch_options, context_options) as context:
                 context = await set_init_script(context, self.cookie_filename)
                 
                 page = await context.new_page()
+                # 在打开页面之前开始监听作品列表接口，用于按标题找到作品ID
+                capture = self.capture_video_list(page) if BULK_ACTION_REPLAY_ENABLED else None
                 
                 await self.notify_status("访问页面", "正在访问抖音创作者中心...")
                 await page.goto("https://creator.douyin.com/creator-micro/content/manage")
@@ -966,12 +1234,14 @@ class DouyinVideoDeleter:
                 
                 # 根据标题精确匹配视频
                 target_videos = []
+                videos_by_title = {}
+                for video_info in all_videos:
+                    videos_by_title.setdefault(video_info["title"], video_info)
                 for target_title in video_titles:
-                    for video_info in all_videos:
-                        if video_info["title"] == target_title.strip():
-                            target_videos.append(video_info)
-                            await self.notify_status("视频匹配", f"✅ 找到匹配视频: 「{video_info['title']}」(索引:{video_info['index']})")
-                            break
+                    video_info = videos_by_title.get(target_title.strip())
+                    if video_info:
+                        target_videos.append(video_info)
+                        await self.notify_status("视频匹配", f"✅ 找到匹配视频: 「{video_info['title']}」(索引:{video_info['index']})")
                     else:
                         await self.notify_status("视频未找到", f"❌ 未找到匹配视频: 「{target_title}」")
                 
@@ -980,38 +1250,51 @@ class DouyinVideoDeleter:
                 await self.notify_status("任务开始", f"🗑️ 批量删除任务开始")
                 await self.notify_status("任务详情", f"🎯 匹配到 {delete_count} 个视频，准备删除")
                 
+                # 优先在页面内批量重放接口请求，剩余的视频逐个点击处理
+                handled = {}
+                if capture:
+                    handled = await self._apply_bulk_action(
+                        page, capture, target_videos,
+                        lambda video: self.delete_single_video(page, video["card"], video["index"]),
+                        DELETE_API_KEYWORDS)
+                success_count += sum(1 for ok in handled.values() if ok)
+                succeeded_videos = [video for video in target_videos if handled.get(video["index"])]
+                failed_videos = [video["title"] for video in target_videos if handled.get(video["index"]) is False]
+                ui_videos = [video for video in target_videos if video["index"] not in handled]
+                
                 # 逐个删除匹配的视频
-                failed_videos = []
-                for i in range(delete_count):
+                # 标题 -> 当前卡片索引，每次页面加载后一次性读取所有标题构建，不再逐个卡片比较标题
+                title_index = None
+                for i in range(len(ui_videos)):
                     try:
-                        video_info = target_videos[i]
+                        video_info = ui_videos[i]
                         video_index = video_info["index"]
                         video_title = video_info["title"]
                         
                         await self.notify_status("进度更新", f"📊 进度: {i+1}/{delete_count} - 已成功: {success_count}")
                         await self.notify_status("当前处理", f"🎯 正在处理第 {video_index + 1} 个视频: 「{video_title}」")
                         
-                        # 重新获取视频列表以获取最新的DOM元素
-                        current_videos = await page.locator('.video-card-zQ02ng').all()
-                        if len(current_videos) == 0:
-                            await self.notify_status("删除完成", f"✅ 所有视频已删除完毕，任务完成")
-                            break
+                        if title_index is None:
+                            title_index = await self._build_title_index(page)
+                            if not title_index:
+                                await self.notify_status("删除完成", f"✅ 所有视频已删除完毕，任务完成")
+                                break
                         
-                        # 直接通过标题查找视频卡片（不依赖可能变化的索引）
+                        # 通过标题查找视频卡片（同名视频按页面顺序依次处理），删除前核对卡片标题，不一致时重建索引
                         video_card = None
                         current_index = -1
-                        
-                        for j, card in enumerate(current_videos):
-                            try:
-                                check_title_element = card.locator('.info-title-text-YTLo9y')
-                                check_title = await check_title_element.text_content() or ""
-                                if check_title.strip() == video_title:
-                                    video_card = card
-                                    current_index = j
-                                    await self.notify_status("视频定位", f"✅ 在当前索引 {j} 找到视频「{video_title}」")
-                                    break
-                            except:
+                        for rebuilt in (False, True):
+                            if rebuilt:
+                                title_index = await self._build_title_index(page)
+                            indices = title_index.get(video_title)
+                            if not indices:
                                 continue
+                            card = page.locator('.video-card-zQ02ng').nth(indices[0])
+                            check_title = await card.locator('.info-title-text-YTLo9y').text_content() or ""
+                            if check_title.strip() == video_title:
+                                video_card, current_index = card, indices.pop(0)
+                                await self.notify_status("视频定位", f"✅ 在当前索引 {current_index} 找到视频「{video_title}」")
+                                break
                         
                         if video_card is None:
                             await self.notify_status("视频丢失", f"❌ 无法找到视频「{video_title}」，可能已被删除")
@@ -1021,20 +1304,28 @@ class DouyinVideoDeleter:
                         # 执行删除操作
                         if await self.delete_single_video(page, video_card, current_index):
                             success_count += 1
+                            succeeded_videos.append(video_info)
+                            # 删除的卡片从列表中移除，后面卡片的索引前移
+                            for indices in title_index.values():
+                                indices[:] = [j - 1 if j > current_index else j for j in indices]
                         else:
                             failed_videos.append(video_title)
                         
                         # 每删除几个视频后刷新页面
-                        if (i + 1) % 3 == 0 and i + 1 < delete_count:
+                        if (i + 1) % 3 == 0 and i + 1 < len(ui_videos):
                             await self.notify_status("页面刷新", f"🔄 已处理 {i+1} 个视频，刷新页面继续...")
                             await page.reload()
                             await page.wait_for_timeout(3000)
+                            title_index = None
                         
                     except Exception as e:
-                        failed_videos.append(target_videos[i]["title"] if i < len(target_videos) else f"第{i+1}个视频")
+                        failed_videos.append(ui_videos[i]["title"] if i < len(ui_videos) else f"第{i+1}个视频")
                         await self.notify_status("处理异常", f"❌ 第 {i + 1} 个视频处理异常: {str(e)}")
                         continue
                 
+                # 同步远程视频清单
+                self._sync_inventory(succeeded_videos)
+                
                 # 生成详细的完成报告
                 failed_count = len(failed_videos)
                 success_rate = round((success_count / delete_count) * 100, 1) if delete_count > 0 else 0
@@ -1066,18 +1357,6 @@ class DouyinVideoDeleter:
                 "deleted_count": success_count,
                 "total_videos": 0
             }
-        
-        finally:
-            if context:
-                try:
-                    await context.close()
-                except:
-                    pass
-            if browser:
-                try:
-                    await browser.close()
-                except:
-                    pass
 
 
 # 便捷函数
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+FFmpeg命令构建模块
+根据视频编辑设置构建FFmpeg命令：有视频滤镜或码率/关键帧修改时重新编码视频，
+否则视频流直接复制，只有音频滤镜时仅重新编码音频，都不需要时整体remux（-c copy）
+"""
+
+import os
+import time
+
+from utils.log import douyin_logger
+
+# 处理方式
+PROCESSING_MODE_COPY = 'copy'  # 音视频流都直接复制
+PROCESSING_MODE_AUDIO = 'audio'  # 视频流复制，只重新编码音频
+PROCESSING_MODE_ENCODE = 'encode'  # 重新编码视频
+
+PROCESSING_MODE_NAMES = {
+    PROCESSING_MODE_COPY: '流复制',
+    PROCESSING_MODE_AUDIO: '仅音频重编码',
+    PROCESSING_MODE_ENCODE: '重新编码',
+}
+
+
+def get_processing_mode(cmd):
+    """根据FFmpeg命令判断处理方式"""
+    def codec(option):
+        return cmd[cmd.index(option) + 1] if option in cmd[:-1] else None
+
+    if codec('-c:v') != 'copy':
+        return PROCESSING_MODE_ENCODE
+    if codec('-c:a') != 'copy':
+        return PROCESSING_MODE_AUDIO
+    return PROCESSING_MODE_COPY
+
+
+def build_ffmpeg_command(input_path, output_path, settings):
+    """构建FFmpeg命令"""
+    # 规范化路径格式，确保FFmpeg能正确处理包含中文的路径
+    input_path = os.path.normpath(input_path)
+    output_path = os.path.normpath(output_path)
+    
+    # 基础命令，稍后会根据AB帧融合添加更多输入
+    cmd = ['ffmpeg']
+    
+    # 强制禁用硬件加速，作为解决顽固崩溃的最终手段，提高稳定性
+    cmd.extend(['-hwaccel', 'none'])
+    
+    # 添加主输入文件
+    cmd.extend(['-i', input_path])
+    
+    # 检查AB帧融合是否需要额外的B视频输入
+    ab_fusion = settings.get('abFusion', {})
+    has_b_video = False
+    b_video_path = None
+    
+    if ab_fusion.get('enabled', False):
+        b_video_source = ab_fusion.get('bVideoSource', 'upload')
+        builtin_material = ab_fusion.get('builtinMaterial', '')
+        b_video_path = ab_fusion.get('bVideoPath')
+        
+        # 处理内置素材的路径
+        if b_video_source == 'builtin' and builtin_material:
+            b_video_path = builtin_material
+        
+        # 规范化B视频路径
+        if b_video_path:
+            b_video_path = os.path.normpath(b_video_path)
+            if os.path.exists(b_video_path):
+                cmd.extend(['-i', b_video_path])
+                has_b_video = True
+                douyin_logger.info(f"✅ 添加B视频输入: {b_video_path}")
+            else:
+                douyin_logger.warning(f"❌ B视频文件不存在: {b_video_path}")
+    
+    # --- 健壮的滤镜链构建 ---
+    video_filters = []
+    audio_filters = []
+    current_stream = "[0:v]"
+    stream_idx = 0
+
+    def get_next_stream_label():
+        nonlocal stream_idx
+        label = f"[v{stream_idx}]"
+        stream_idx += 1
+        return label
+
+    # 1. 抽帧 (已禁用以保持原始帧率)
+    frame_skip = settings.get('frameSkip', {})
+    if False:  # 禁用抽帧功能
+        skip_start = frame_skip.get('start', 25)
+        next_stream = get_next_stream_label()
+        video_filters.append(f"{current_stream}select=not(mod(n\\,{skip_start})){next_stream}")
+        current_stream = next_stream
+
+    # 2. 旋转和翻转
+    transform = settings.get('transform', {})
+    if not transform.get('keep_original', False):
+        rotation = transform.get('rotation', 0)
+        if rotation == 90:
+            next_stream = get_next_stream_label()
+            video_filters.append(f"{current_stream}transpose=1{next_stream}")
+            current_stream = next_stream
+        elif rotation == 180:
+            next_stream = get_next_stream_label()
+            video_filters.append(f"{current_stream}transpose=1,transpose=1{next_stream}")
+            current_stream = next_stream
+        elif rotation == 270:
+            next_stream = get_next_stream_label()
+            video_filters.append(f"{current_stream}transpose=2{next_stream}")
+            current_stream = next_stream
+        
+        if transform.get('flipH', False):
+            next_stream = get_next_stream_label()
+            video_filters.append(f"{current_stream}hflip{next_stream}")
+            current_stream = next_stream
+        
+        if transform.get('flipV', False):
+            next_stream = get_next_stream_label()
+            video_filters.append(f"{current_stream}vflip{next_stream}")
+            current_stream = next_stream
+
+    # 3. 画面调整
+    eq_filters = []
+    if settings.get('brightness', 0) != 0: eq_filters.append(f"brightness={settings.get('brightness', 0) / 100.0}")
+    if settings.get('contrast', 0) != 0: eq_filters.append(f"contrast={1 + settings.get('contrast', 0) / 100.0}")
+    if settings.get('saturation', 0) != 0: eq_filters.append(f"saturation={1 + settings.get('saturation', 0) / 100.0}")
+    if eq_filters:
+        next_stream = get_next_stream_label()
+        video_filters.append(f"{current_stream}eq={'_'.join(eq_filters)}{next_stream}")
+        current_stream = next_stream
+
+    # 4. 锐化
+    if settings.get('sharpen', 0) > 0:
+        sharpen_value = settings.get('sharpen', 0) / 100.0
+        next_stream = get_next_stream_label()
+        video_filters.append(f"{current_stream}unsharp=5:5:{sharpen_value}:5:5:0.0{next_stream}")
+        current_stream = next_stream
+
+    # 5. 降噪
+    if settings.get('denoise', 0) > 0:
+        denoise_value = settings.get('denoise', 0) / 100.0 * 10
+        next_stream = get_next_stream_label()
+        video_filters.append(f"{current_stream}hqdn3d={denoise_value}{next_stream}")
+        current_stream = next_stream
+        
+    # 6. 分辨率
+    resolution = settings.get('resolution', {})
+    if resolution.get('width') and resolution.get('height'):
+        width, height = resolution['width'], resolution['height']
+        if width != 'original' and height != 'original':
+            mode = resolution.get('mode', 'crop')
+            next_stream = get_next_stream_label()
+            if mode == 'stretch':
+                video_filters.append(f"{current_stream}scale={width}:{height}{next_stream}")
+            elif mode == 'crop':
+                video_filters.append(f"{current_stream}scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}{next_stream}")
+            elif mode == 'letterbox':
+                video_filters.append(f"{current_stream}scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black{next_stream}")
+            elif mode == 'pad':
+                 video_filters.append(f"{current_stream}scale={width}:{height}:force_original_aspect_ratio=decrease,gblur=sigma=20,scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}{next_stream}")
+            current_stream = next_stream
+            
+    # 7. 分屏效果
+    split_screen = settings.get('splitScreen', {})
+    if split_screen.get('enabled', False):
+        direction = split_screen.get('direction', 'vertical')
+        ratio = split_screen.get('ratio', 'equal')
+        blur = split_screen.get('blur', False)
+        blur_filter = f",boxblur=3.5:1" if blur else ""
+        next_stream = get_next_stream_label()
+        
+        split_graph = ""
+        if direction == 'vertical':
+            if ratio == 'equal':
+                split_graph = f"split=3[v_top_in][v_middle_in][v_bottom_in];[v_top_in]crop=iw:ih/2:0:0[c_top];[c_top]scale=iw:ih/3{blur_filter}[s_top];[v_middle_in]scale=iw:ih/3[s_middle];[v_bottom_in]crop=iw:ih/2:0:ih/2[c_bottom];[c_bottom]scale=iw:ih/3{blur_filter}[s_bottom];[s_top][s_middle][s_bottom]vstack=inputs=3{next_stream}"
+            elif ratio == 'center-large':
+                split_graph = f"split=3[v_top_in][v_middle_in][v_bottom_in];[v_top_in]crop=iw:ih/2:0:0[c_top];[c_top]scale=iw:ih/4{blur_filter}[s_top];[v_middle_in]scale=iw:ih/2[s_middle];[v_bottom_in]crop=iw:ih/2:0:ih/2[c_bottom];[c_bottom]scale=iw:ih/4{blur_filter}[s_bottom];[s_top][s_middle][s_bottom]vstack=inputs=3{next_stream}"
+            elif ratio == 'edges-large':
+                split_graph = f"split=3[v_top_in][v_middle_in][v_bottom_in];[v_top_in]crop=iw:ih/2:0:0[c_top];[c_top]scale=iw:3*ih/8{blur_filter}[s_top];[v_middle_in]scale=iw:ih/4[s_middle];[v_bottom_in]crop=iw:ih/2:0:ih/2[c_bottom];[c_bottom]scale=iw:3*ih/8{blur_filter}[s_bottom];[s_top][s_middle][s_bottom]vstack=inputs=3{next_stream}"
+        elif direction == 'horizontal':
+            if ratio == 'equal':
+                split_graph = f"split=3[v_left_in][v_middle_in][v_right_in];[v_left_in]crop=iw/2:ih:0:0[c_left];[c_left]scale=iw/3:ih{blur_filter}[s_left];[v_middle_in]scale=iw/3:ih[s_middle];[v_right_in]crop=iw/2:ih:iw/2:0[c_right];[c_right]scale=iw/3:ih{blur_filter}[s_right];[s_left][s_middle][s_right]hstack=inputs=3{next_stream}"
+            elif ratio == 'center-large':
+                split_graph = f"split=3[v_left_in][v_middle_in][v_right_in];[v_left_in]crop=iw/2:ih:0:0[c_left];[c_left]scale=iw/4:ih{blur_filter}[s_left];[v_middle_in]scale=iw/2:ih[s_middle];[v_right_in]crop=iw/2:ih:iw/2:0[c_right];[c_right]scale=iw/4:ih{blur_filter}[s_right];[s_left][s_middle][s_right]hstack=inputs=3{next_stream}"
+            elif ratio == 'edges-large':
+                split_graph = f"split=3[v_left_in][v_middle_in][v_right_in];[v_left_in]crop=iw/2:ih:0:0[c_left];[c_left]scale=3*iw/8:ih{blur_filter}[s_left];[v_middle_in]scale=iw/4:ih[s_middle];[v_right_in]crop=iw/2:ih:iw/2:0[c_right];[c_right]scale=3*iw/8:ih{blur_filter}[s_right];[s_left][s_middle][s_right]hstack=inputs=3{next_stream}"
+        
+        video_filters.append(f"{current_stream}{split_graph}")
+        current_stream = next_stream
+
+    # 8. 动态缩放
+    zoom = settings.get('zoom', {})
+    if zoom.get('enabled', False):
+        zoom_min = zoom.get('min', 0.01)
+        zoom_max = zoom.get('max', 0.10)
+        direction = zoom.get('direction', 'in')
+        next_stream = get_next_stream_label()
+        
+        zoom_expr = ""
+        if direction == 'in':
+            zoom_expr = f"zoompan=z='min(zoom+{zoom_max},1.5)':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)"
+        elif direction == 'out':
+            zoom_expr = f"zoompan=z='max(zoom-{zoom_max},1)':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)"
+        
+        video_filters.append(f"{current_stream}{zoom_expr}{next_stream}")
+        current_stream = next_stream
+
+    # AB帧融合和其他复杂滤镜可以按此模式继续添加...
+    # (为简化，此处暂不重构AB帧融合，因为它需要多路输入)
+
+    # --- 音频滤镜 ---
+    if ab_fusion.get('enabled', False) and ab_fusion.get('audioPhaseAdjust', False):
+        audio_filters.append('aeval=val(0)*0.9+val(1)*0.1:c=same')
+        douyin_logger.info("🎵 音频相位调整已启用")
+    
+    # --- 命令组装 ---
+
+    # 没有视频滤镜且不修改码率、关键帧时，视频流直接复制（remux），不重新编码
+    bitrate = settings.get('bitrate', {})
+    keyframe_modify = ab_fusion.get('enabled', False) and ab_fusion.get('keyframeModify', False)
+    encode_video = bool(video_filters) or not bitrate.get('keep_original', False) or keyframe_modify
+
+    # 应用视频滤镜
+    if video_filters:
+        filter_complex_string = ";".join(video_filters)
+        cmd.extend(['-filter_complex', filter_complex_string])
+        cmd.extend(['-map', current_stream])
+        douyin_logger.info(f"应用视频滤镜链: {filter_complex_string}")
+    else:
+        cmd.extend(['-map', '0:v'])
+    if not encode_video:
+        cmd.extend(['-c:v', 'copy'])
+
+    # 应用音频滤镜或复制音频流
+    if audio_filters:
+        cmd.extend(['-af', ",".join(audio_filters)])
+        cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
+        cmd.extend(['-map', '0:a?'])
+        douyin_logger.info(f"应用音频滤镜: {','.join(audio_filters)}")
+    else:
+        # 如果有视频滤镜，即使不处理音频，也需要显式映射
+        cmd.extend(['-map', '0:a?'])
+        cmd.extend(['-c:a', 'copy'])
+
+    # 元数据伪装和关键帧修改（通常与AB融合相关）
+    if ab_fusion.get('enabled', False):
+        if ab_fusion.get('metadataDisguise', False):
+            timestamp = int(time.time())
+            cmd.extend([
+                '-metadata', f'title=Processed_Video_{timestamp}',
+                '-metadata', f'comment=Generated_at_{timestamp}'
+            ])
+            douyin_logger.info("🏷️  元数据伪装已启用")
+        
+        if ab_fusion.get('keyframeModify', False):
+            cmd.extend(['-g', '25', '-keyint_min', '12'])
+            douyin_logger.info("🔑 关键帧分布修改已启用")
+
+    # 帧率设置 (保持原始帧率)
+    framerate = settings.get('framerate', {})
+    if False:  # 禁用帧率修改
+        target_fps = framerate.get('target', 30)
+        cmd.extend(['-r', str(target_fps)])
+    
+    # 码率设置
+    if not bitrate.get('keep_original', False):
+        if bitrate.get('mode') == 'fixed':
+            fixed_bitrate = bitrate.get('fixed', 3000)
+            cmd.extend(['-b:v', f'{fixed_bitrate}k'])
+        else:
+            multiplier = (bitrate.get('min', 1.05) + bitrate.get('max', 1.95)) / 2
+            cmd.extend(['-q:v', str(int(28 / multiplier))])
+
+    # 输出设置
+    cmd.extend(['-y', output_path])
+    
+    return cmd
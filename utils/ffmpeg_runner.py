@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+FFmpeg执行模块
+使用 -progress pipe:1 -nostats 启动FFmpeg，逐行解析进度（out_time_ms/speed/fps），
+stderr只保留最后若干行用于错误报告，避免长时间编码时在内存和日志中堆积大量输出
+"""
+
+import subprocess
+import threading
+from collections import deque
+
+from utils.log import douyin_logger
+
+# 保留的stderr行数
+STDERR_TAIL_LINES = 40
+
+
+class FFmpegProgress:
+    """FFmpeg进度"""
+
+    def __init__(self, duration=None):
+        self.duration = duration  # 输入时长（秒），未知时无法计算百分比
+        self.out_time = 0.0  # 已输出的时长（秒）
+        self.speed = None  # 处理速度（倍速）
+        self.fps = None
+        self.frame = None
+        self.finished = False
+
+    @property
+    def percent(self):
+        if self.finished:
+            return 100.0
+        if not self.duration:
+            return None
+        return round(min(99.9, self.out_time * 100 / self.duration), 1)
+
+    def update(self, key, value):
+        """解析一行进度输出，返回True表示一个进度块结束"""
+        try:
+            if key in ('out_time_ms', 'out_time_us'):
+                # out_time_ms 实际单位也是微秒
+                if value != 'N/A':
+                    self.out_time = int(value) / 1000000
+            elif key == 'speed':
+                value = value.rstrip('x').strip()
+                self.speed = float(value) if value and value != 'N/A' else None
+            elif key == 'fps':
+                self.fps = float(value)
+            elif key == 'frame':
+                self.frame = int(value)
+            elif key == 'progress':
+                if value == 'end':
+                    self.finished = True
+                return True
+        except ValueError:
+            pass
+        return False
+
+    def to_dict(self):
+        return {
+            'percent': self.percent,
+            'out_time': round(self.out_time, 2),
+            'duration': self.duration,
+            'speed': self.speed,
+            'fps': self.fps,
+            'frame': self.frame,
+            'finished': self.finished
+        }
+
+
+def with_progress_args(cmd):
+    """在FFmpeg命令中加入进度输出参数（全局选项，放在ffmpeg之后）"""
+    return [cmd[0], '-progress', 'pipe:1', '-nostats'] + list(cmd[1:])
+
+
+def run_ffmpeg(cmd, duration=None, on_progress=None, on_start=None, stderr_tail_lines=STDERR_TAIL_LINES):
+    """运行FFmpeg并流式解析进度
+
+    Args:
+        cmd: FFmpeg命令（不含进度参数）
+        duration: 输入时长（秒），用于计算百分比
+        on_progress: 进度回调 on_progress(FFmpegProgress)，每个进度块调用一次
+        on_start: 进程启动回调 on_start(process)，可用于登记进程以便取消
+
+    Returns:
+        (returncode, stderr_tail): 返回码和stderr最后若干行
+    """
+    process = subprocess.Popen(with_progress_args(cmd), stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if on_start:
+        on_start(process)
+
+    # stderr在单独线程中读取，只保留最后若干行，避免管道写满阻塞FFmpeg
+    stderr_tail = deque(maxlen=stderr_tail_lines)
+
+    def read_stderr():
+        for line in process.stderr:
+            stderr_tail.append(line.decode('utf-8', errors='ignore').rstrip())
+
+    stderr_thread = threading.Thread(target=read_stderr, daemon=True)
+    stderr_thread.start()
+
+    progress = FFmpegProgress(duration)
+    for raw_line in process.stdout:
+        key, sep, value = raw_line.decode('utf-8', errors='ignore').strip().partition('=')
+        if not sep:
+            continue
+        if progress.update(key, value) and on_progress:
+            try:
+                on_progress(progress)
+            except Exception as e:
+                douyin_logger.warning(f"FFmpeg进度回调失败: {str(e)}")
+
+    returncode = process.wait()
+    stderr_thread.join(timeout=5)
+    return returncode, '\n'.join(stderr_tail)
@@ -1,36 +1,36 @@
-import sqlite3
 import json
 import random
-import os
+import threading
+import atexit
 from datetime import datetime
+from conf import FINGERPRINT_LAST_USED_FLUSH_INTERVAL
 from utils.log import douyin_logger
+from utils.sqlite_store import get_store
+from utils.versioned_cache import VersionedCache
 
 class FingerprintManager:
     def __init__(self, db_path='database/fingerprint_manager.db'):
         self.db_path = db_path
+        self.db = get_store(db_path)
+        # cookie -> 指纹JSON，由修改指纹的接口失效
+        self._fingerprint_cache = VersionedCache()
+        # 待写回的最后使用时间，定时批量写入
+        self._pending_last_used = {}
+        self._pending_lock = threading.Lock()
+        self._flush_timer = None
         self.init_db()
+        atexit.register(self.flush_last_used)
     
     def init_db(self):
         """初始化指纹数据库"""
-        # 确保数据库目录存在
-        db_dir = os.path.dirname(self.db_path)
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
         # 浏览器指纹表
-        c.execute('''CREATE TABLE IF NOT EXISTS fingerprints (
+        self.db.execute('''CREATE TABLE IF NOT EXISTS fingerprints (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             cookie_name TEXT UNIQUE NOT NULL,
             fingerprint_data TEXT NOT NULL,
             created_time TEXT DEFAULT CURRENT_TIMESTAMP,
             last_used TEXT
         )''')
-        
-        conn.commit()
-        conn.close()
     
     def generate_random_fingerprint(self):
         """生成随机浏览器指纹 - 确保各参数一致性"""
@@ -262,48 +262,69 @@ class FingerprintManager:
     
 
     
+    def _load_fingerprint_json(self, cookie_name):
+        row = self.db.fetchone('SELECT fingerprint_data FROM fingerprints WHERE cookie_name = ?', (cookie_name,))
+        return row[0] if row else None
+    
     def get_or_create_fingerprint(self, cookie_name):
-        """获取或创建Cookie对应的指纹"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
+        """获取或创建Cookie对应的指纹（进程内缓存，最后使用时间定时批量写回）"""
+        return json.loads(self.get_fingerprint_json(cookie_name))
+    
+    def get_fingerprint_json(self, cookie_name):
+        """获取或创建Cookie对应的指纹，返回数据库中保存的JSON文本"""
         # 查询现有指纹
-        c.execute('SELECT fingerprint_data FROM fingerprints WHERE cookie_name = ?', (cookie_name,))
-        row = c.fetchone()
+        fingerprint_json = self._fingerprint_cache.get(cookie_name, lambda: self._load_fingerprint_json(cookie_name))
         
-        if row:
+        if fingerprint_json:
             # 更新最后使用时间
-            c.execute('UPDATE fingerprints SET last_used = ? WHERE cookie_name = ?', 
-                     (datetime.now().isoformat(), cookie_name))
-            conn.commit()
-            conn.close()
+            self._touch(cookie_name)
             
-            douyin_logger.info(f"使用现有浏览器指纹: {cookie_name}")
-            return json.loads(row[0])
+            douyin_logger.debug(f"使用现有浏览器指纹: {cookie_name}")
+            return fingerprint_json
         else:
             # 生成新指纹
-            fingerprint = self.generate_random_fingerprint()
-            fingerprint_json = json.dumps(fingerprint, ensure_ascii=False)
+            fingerprint_json = json.dumps(self.generate_random_fingerprint(), ensure_ascii=False)
             
-            # 保存到数据库
-            c.execute('''INSERT INTO fingerprints (cookie_name, fingerprint_data, last_used) 
+            # 保存到数据库（并发创建时以先写入的为准）
+            created = self.db.execute('''INSERT OR IGNORE INTO fingerprints (cookie_name, fingerprint_data, last_used) 
                         VALUES (?, ?, ?)''',
-                     (cookie_name, fingerprint_json, datetime.now().isoformat()))
-            conn.commit()
-            conn.close()
+                     (cookie_name, fingerprint_json, datetime.now().isoformat())).rowcount
+            if not created:
+                fingerprint_json = self._load_fingerprint_json(cookie_name) or fingerprint_json
+            self._fingerprint_cache.set(cookie_name, fingerprint_json)
             
             douyin_logger.info(f"生成新浏览器指纹: {cookie_name}")
-            return fingerprint
+            return fingerprint_json
+    
+    def _touch(self, cookie_name):
+        """记录最后使用时间，由定时器批量写回"""
+        with self._pending_lock:
+            self._pending_last_used[cookie_name] = datetime.now().isoformat()
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(FINGERPRINT_LAST_USED_FLUSH_INTERVAL, self.flush_last_used)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush_last_used(self):
+        """在一个事务中写回累积的最后使用时间"""
+        with self._pending_lock:
+            pending, self._pending_last_used = self._pending_last_used, {}
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if not pending:
+            return
+        try:
+            self.db.executemany('UPDATE fingerprints SET last_used = ? WHERE cookie_name = ?',
+                                [(last_used, cookie_name) for cookie_name, last_used in pending.items()])
+        except Exception as e:
+            douyin_logger.error(f"写回指纹使用时间失败: {str(e)}")
     
     def delete_fingerprint(self, cookie_name):
         """删除指纹"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            c.execute('DELETE FROM fingerprints WHERE cookie_name = ?', (cookie_name,))
-            conn.commit()
-            conn.close()
+            self.db.execute('DELETE FROM fingerprints WHERE cookie_name = ?', (cookie_name,))
+            self._fingerprint_cache.invalidate(cookie_name)
             
             douyin_logger.info(f"删除浏览器指纹: {cookie_name}")
             return True, "删除成功"
@@ -313,48 +334,35 @@ class FingerprintManager:
     
     def get_all_fingerprints(self):
         """获取所有指纹信息"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''SELECT cookie_name, created_time, last_used 
+        self.flush_last_used()
+        rows = self.db.fetchall('''SELECT cookie_name, created_time, last_used 
                     FROM fingerprints ORDER BY created_time DESC''')
         
         fingerprints = []
-        for row in c.fetchall():
+        for row in rows:
             fingerprints.append({
                 'cookie_name': row[0],
                 'created_time': row[1],
                 'last_used': row[2]
             })
         
-        conn.close()
         return fingerprints
     
     def regenerate_all_fingerprints(self):
         """重新生成所有指纹（修复不一致问题）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
             # 获取所有cookie名称
-            c.execute('SELECT cookie_name FROM fingerprints')
-            cookie_names = [row[0] for row in c.fetchall()]
-            
-            updated_count = 0
-            for cookie_name in cookie_names:
-                # 生成新的一致性指纹
-                new_fingerprint = self.generate_random_fingerprint()
-                fingerprint_json = json.dumps(new_fingerprint, ensure_ascii=False)
-                
-                # 更新数据库
-                c.execute('''UPDATE fingerprints 
+            cookie_names = [row[0] for row in self.db.fetchall('SELECT cookie_name FROM fingerprints')]
+            
+            # 生成新的一致性指纹，一个事务内批量更新
+            now = datetime.now().isoformat()
+            self.db.executemany('''UPDATE fingerprints 
                            SET fingerprint_data = ?, last_used = ? 
                            WHERE cookie_name = ?''',
-                         (fingerprint_json, datetime.now().isoformat(), cookie_name))
-                updated_count += 1
-            
-            conn.commit()
-            conn.close()
+                         [(json.dumps(self.generate_random_fingerprint(), ensure_ascii=False), now, cookie_name)
+                          for cookie_name in cookie_names])
+            updated_count = len(cookie_names)
+            self._fingerprint_cache.invalidate()
             
             douyin_logger.info(f"成功重新生成 {updated_count} 个浏览器指纹")
             return True, f"成功重新生成 {updated_count} 个指纹"
@@ -1,16 +1,36 @@
-import sqlite3
-import os
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import deque
+from datetime import datetime
 
-def init_db():
-    # 确保数据库目录存在
-    db_path = 'database/upload_history.db'
-    db_dir = os.path.dirname(db_path)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
-    
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
+from utils.sqlite_store import get_store
+
+DB_PATH = 'database/upload_history.db'
+
+# 频率限制的统计窗口（秒）
+RATE_WINDOW_SECONDS = 3600
+
+
+_migrate_lock = threading.Lock()
+_migrated = False
+
+
+def _store():
+    """返回历史数据库的共享连接池"""
+    global _migrated
+    store = get_store(DB_PATH)
+    # 每个进程第一次使用时执行迁移，保证未调用init_db的入口也使用最新的表结构
+    if not _migrated:
+        with _migrate_lock:
+            if not _migrated:
+                run_migrations(store)
+                _migrated = True
+    return store
+
+
+# ---------- 数据库迁移 ----------
+
+def _migration_create_table(c):
     c.execute('''CREATE TABLE IF NOT EXISTS upload_history (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         cookie_name TEXT,
@@ -20,53 +40,381 @@ def init_db():
         reason TEXT,
         url TEXT
     )''')
-    conn.commit()
-    conn.close()
-
-def log_upload_history(cookie_name, filename, status, reason=None, url=None):
-    # 确保数据库目录存在
-    db_path = 'database/upload_history.db'
-    db_dir = os.path.dirname(db_path)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
+
+
+def _migration_add_epoch_ts(c):
+    """增加整数时间戳列（Unix秒）并为 (cookie_name, ts) 建立复合索引"""
+    columns = [row[1] for row in c.execute('PRAGMA table_info(upload_history)').fetchall()]
+    if 'ts' not in columns:
+        c.execute('ALTER TABLE upload_history ADD COLUMN ts INTEGER')
+    rows = c.execute('SELECT id, upload_time FROM upload_history WHERE ts IS NULL').fetchall()
+    updates = []
+    for record_id, upload_time in rows:
+        try:
+            updates.append((int(datetime.strptime(upload_time, '%Y-%m-%d %H:%M:%S').timestamp()), record_id))
+        except (TypeError, ValueError):
+            updates.append((0, record_id))
+    c.executemany('UPDATE upload_history SET ts = ? WHERE id = ?', updates)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_upload_history_cookie_ts ON upload_history (cookie_name, ts)')
+
+
+def _migration_add_ts_index(c):
+    """全部账号的历史记录按 (ts, id) 分页"""
+    c.execute('CREATE INDEX IF NOT EXISTS idx_upload_history_ts ON upload_history (ts)')
+
+
+def _migration_add_stats_rollup(c):
+    """增加上传耗时列和按账号×小时/天汇总的统计表，并从已有历史回填"""
+    columns = [row[1] for row in c.execute('PRAGMA table_info(upload_history)').fetchall()]
+    if 'duration' not in columns:
+        c.execute('ALTER TABLE upload_history ADD COLUMN duration REAL')
+    c.execute('''CREATE TABLE IF NOT EXISTS upload_stats (
+        granularity TEXT NOT NULL,
+        period TEXT NOT NULL,
+        cookie_name TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        success INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        duration_total REAL NOT NULL DEFAULT 0,
+        duration_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, period, cookie_name)
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_upload_stats_cookie ON upload_stats (granularity, cookie_name, period)')
+    _backfill_stats(c)
+
+
+# 按版本号顺序执行，已执行的版本记录在 PRAGMA user_version 中；新增迁移只能追加到末尾
+MIGRATIONS = [
+    (1, _migration_create_table),
+    (2, _migration_add_epoch_ts),
+    (3, _migration_add_ts_index),
+    (4, _migration_add_stats_rollup),
+]
+
+# 历史记录状态，旧版本写入的 'fail' 与 'failed' 等同
+STATUS_ALIASES = {
+    'failed': ('failed', 'fail'),
+}
+
+
+def run_migrations(store):
+    """执行尚未执行的迁移，返回迁移后的版本号"""
+    version = store.fetchone('PRAGMA user_version')[0]
+    for target, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        # 每个迁移连同版本号在同一个事务中提交
+        with store.transaction() as conn:
+            migrate(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {int(target)}')
+        version = target
+    return version
+
+
+# ---------- 统计汇总 ----------
+
+# 汇总粒度 -> 本地时间的时段格式（SQLite strftime 与 Python strftime 通用）
+STATS_GRANULARITIES = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+}
+
+_STATS_UPSERT = '''INSERT INTO upload_stats
+    (granularity, period, cookie_name, total, success, failed, skipped, duration_total, duration_count)
+    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+    ON CONFLICT (granularity, period, cookie_name) DO UPDATE SET
+        total = total + 1,
+        success = success + excluded.success,
+        failed = failed + excluded.failed,
+        skipped = skipped + excluded.skipped,
+        duration_total = duration_total + excluded.duration_total,
+        duration_count = duration_count + excluded.duration_count'''
+
+
+def _update_stats(c, cookie_name, status, ts, duration=None):
+    """把一条历史记录累加到各粒度的统计中"""
+    moment = datetime.fromtimestamp(ts)
+    success = int(status == 'success')
+    failed = int(status in STATUS_ALIASES['failed'])
+    skipped = int(status == 'skipped')
+    c.executemany(_STATS_UPSERT, [
+        (granularity, moment.strftime(fmt), cookie_name or '', success, failed, skipped,
+         duration or 0, int(duration is not None))
+        for granularity, fmt in STATS_GRANULARITIES.items()
+    ])
+
+
+def _backfill_stats(c):
+    """根据全部历史记录重新计算统计表"""
+    c.execute('DELETE FROM upload_stats')
+    failed = ','.join("'%s'" % s for s in STATUS_ALIASES['failed'])
+    for granularity, fmt in STATS_GRANULARITIES.items():
+        c.execute(f'''INSERT INTO upload_stats
+            (granularity, period, cookie_name, total, success, failed, skipped, duration_total, duration_count)
+            SELECT ?, strftime(?, ts, 'unixepoch', 'localtime'), IFNULL(cookie_name, ''), COUNT(*),
+                   SUM(status = 'success'), SUM(status IN ({failed})), SUM(status = 'skipped'),
+                   IFNULL(SUM(duration), 0), COUNT(duration)
+            FROM upload_history WHERE ts IS NOT NULL
+            GROUP BY 2, 3''', (granularity, fmt))
+
+
+def backfill_stats():
+    """重新计算统计表（命令: python -m utils.history_db backfill-stats）
     
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute('''INSERT INTO upload_history (cookie_name, filename, upload_time, status, reason, url)
-                 VALUES (?, ?, ?, ?, ?, ?)''',
-              (cookie_name, filename, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), status, reason, url))
-    conn.commit()
-    conn.close()
+    Returns:
+        int: 统计表的记录数
+    """
+    store = _store()
+    with store.transaction() as conn:
+        _backfill_stats(conn.cursor())
+    return store.fetchone('SELECT COUNT(*) FROM upload_stats')[0]
 
-def get_history(cookie=None):
-    # 确保数据库目录存在
-    db_path = 'database/upload_history.db'
-    db_dir = os.path.dirname(db_path)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
+
+def get_stats_series(granularity='day', cookie=None, start=None, end=None):
+    """获取统计时间序列
+    
+    Args:
+        granularity: 'hour' 或 'day'
+        cookie: 账号，为空时汇总所有账号
+        start/end: 时段范围（与时段格式相同的字符串，包含两端），为空表示不限
     
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
+    Returns:
+        list: [{period, total, success, failed, skipped, failure_rate, avg_duration}]，按时段升序
+    """
+    if granularity not in STATS_GRANULARITIES:
+        raise ValueError(f"不支持的统计粒度: {granularity}")
+    clauses, params = ['granularity = ?'], [granularity]
+    if cookie:
+        clauses.append('cookie_name = ?')
+        params.append(cookie)
+    if start:
+        clauses.append('period >= ?')
+        params.append(start)
+    if end:
+        # 按小时统计时，只给日期的结束时间包含当天全部时段
+        if granularity == 'hour' and len(end) == 10:
+            end += ' 23:59'
+        clauses.append('period <= ?')
+        params.append(end)
+    rows = _store().fetchall(f'''SELECT period, SUM(total), SUM(success), SUM(failed), SUM(skipped),
+                                      SUM(duration_total), SUM(duration_count)
+                               FROM upload_stats WHERE {' AND '.join(clauses)}
+                               GROUP BY period ORDER BY period''', params)
+    series = []
+    for period, total, success, failed, skipped, duration_total, duration_count in rows:
+        attempted = success + failed
+        series.append({
+            'period': period,
+            'total': total,
+            'success': success,
+            'failed': failed,
+            'skipped': skipped,
+            'failure_rate': round(failed / attempted, 4) if attempted else 0,
+            'avg_duration': round(duration_total / duration_count, 1) if duration_count else None
+        })
+    return series
+
+
+# ---------- 频率限制窗口 ----------
+
+class UploadRateWindow:
+    """每个账号最近一小时上传记录的内存滑动窗口，频率检查不再查询数据库"""
+
+    def __init__(self, window_seconds=RATE_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._times = {}  # cookie_name -> deque[ts]，按时间升序
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def rebuild(self):
+        """从数据库重建窗口（启动时调用）"""
+        # 持有锁读取数据库，避免重建期间写入的记录丢失
+        with self._lock:
+            since = int(time.time()) - self.window_seconds
+            rows = _store().fetchall('SELECT cookie_name, ts FROM upload_history WHERE ts > ? ORDER BY ts',
+                                     (since,))
+            times = {}
+            for cookie_name, ts in rows:
+                times.setdefault(cookie_name, deque()).append(ts)
+            self._times = times
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.rebuild()
+
+    def _prune(self, cookie_name, now):
+        """移除滑出窗口的记录（需持有锁）"""
+        times = self._times.get(cookie_name)
+        if times is None:
+            return None
+        while times and times[0] <= now - self.window_seconds:
+            times.popleft()
+        return times
+
+    def add(self, cookie_name, ts):
+        with self._lock:
+            if not self._loaded:
+                return  # 尚未加载，之后从数据库重建时会包含该记录
+            times = self._times.setdefault(cookie_name, deque())
+            # 时间戳基本按顺序到达，时钟回拨时插入到正确位置
+            if not times or times[-1] <= ts:
+                times.append(ts)
+            else:
+                times.insert(next(i for i, t in enumerate(times) if t > ts), ts)
+
+    def count(self, cookie_name, now=None):
+        self._ensure_loaded()
+        now = time.time() if now is None else now
+        with self._lock:
+            times = self._prune(cookie_name, now)
+            return len(times) if times else 0
+
+    def wait_seconds(self, cookie_name, risk_limit, now=None):
+        self._ensure_loaded()
+        now = time.time() if now is None else now
+        with self._lock:
+            times = self._prune(cookie_name, now)
+            if not times or len(times) < risk_limit:
+                return 0
+            # 需要等到窗口内第 (len - risk_limit + 1) 条记录滑出一小时窗口
+            return max(0, times[len(times) - risk_limit] + self.window_seconds - now)
+
+
+# 全局上传频率窗口实例
+upload_rate_window = UploadRateWindow()
+
+
+def init_db():
+    _store()
+    upload_rate_window.rebuild()
+
+def log_upload_history(cookie_name, filename, status, reason=None, url=None, duration=None):
+    """写入上传历史并累加统计，duration为上传耗时（秒）"""
+    now = datetime.now()
+    ts = int(now.timestamp())
+    # 历史记录和统计累加在同一个事务中写入
+    with _store().transaction() as conn:
+        c = conn.cursor()
+        c.execute('''INSERT INTO upload_history (cookie_name, filename, upload_time, status, reason, url, ts, duration)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                  (cookie_name, filename, now.strftime('%Y-%m-%d %H:%M:%S'), status, reason, url, ts, duration))
+        _update_stats(c, cookie_name, status, ts, duration)
+    upload_rate_window.add(cookie_name, ts)
+
+def get_history(cookie=None):
+    store = _store()
     if cookie:
-        c.execute('SELECT filename, upload_time, status, reason, url FROM upload_history WHERE cookie_name=? ORDER BY upload_time DESC', (cookie,))
+        rows = store.fetchall('SELECT filename, upload_time, status, reason, url FROM upload_history WHERE cookie_name=? ORDER BY ts DESC, id DESC', (cookie,))
     else:
-        c.execute('SELECT filename, upload_time, status, reason, url, cookie_name FROM upload_history ORDER BY upload_time DESC')
-    rows = c.fetchall()
-    conn.close()
-    return rows
+        rows = store.fetchall('SELECT filename, upload_time, status, reason, url, cookie_name FROM upload_history ORDER BY ts DESC, id DESC')
+    return [tuple(row) for row in rows]
 
-def get_upload_count_last_hour(cookie_name):
-    # 确保数据库目录存在
-    db_path = 'database/upload_history.db'
-    db_dir = os.path.dirname(db_path)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
+def _history_filters(cookie=None, status=None, start_ts=None, end_ts=None):
+    """构造历史记录查询条件，返回 (where子句, 参数)"""
+    clauses, params = [], []
+    if cookie:
+        clauses.append('cookie_name = ?')
+        params.append(cookie)
+    if status:
+        statuses = STATUS_ALIASES.get(status, (status,))
+        clauses.append(f'status IN ({",".join("?" * len(statuses))})')
+        params.extend(statuses)
+    if start_ts is not None:
+        clauses.append('ts >= ?')
+        params.append(int(start_ts))
+    if end_ts is not None:
+        clauses.append('ts < ?')
+        params.append(int(end_ts))
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+def encode_history_cursor(ts, record_id):
+    return f"{ts}:{record_id}"
+
+def decode_history_cursor(cursor):
+    """解析分页游标，格式错误时抛出ValueError"""
+    ts, record_id = cursor.split(':', 1)
+    return int(ts), int(record_id)
+
+def get_history_page(cookie=None, status=None, start_ts=None, end_ts=None, cursor=None, limit=20):
+    """按 (ts, id) 倒序分页获取历史记录
     
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    now = datetime.now()
-    one_hour_ago = (now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
-    c.execute('SELECT COUNT(*) FROM upload_history WHERE cookie_name=? AND upload_time>?', (cookie_name, one_hour_ago))
-    count = c.fetchone()[0]
-    conn.close()
-    return count 
\ No newline at end of file
+    Args:
+        cursor: 上一页返回的游标，为空时获取第一页
+    
+    Returns:
+        (records, next_cursor): 记录字典列表和下一页游标（没有更多记录时为None）
+    """
+    where, params = _history_filters(cookie, status, start_ts, end_ts)
+    if cursor:
+        ts, record_id = decode_history_cursor(cursor)
+        where += (' AND ' if where else ' WHERE ') + '(ts < ? OR (ts = ? AND id < ?))'
+        params.extend([ts, ts, record_id])
+    rows = _store().fetchall(f'''SELECT id, ts, cookie_name, filename, upload_time, status, reason, url FROM upload_history{where}
+                  ORDER BY ts DESC, id DESC LIMIT ?''', params + [limit + 1])
+    
+    records = [dict(zip(['id', 'ts', 'cookie_name', 'filename', 'upload_time', 'status', 'reason', 'url'], row))
+               for row in rows[:limit]]
+    next_cursor = encode_history_cursor(records[-1]['ts'], records[-1]['id']) if len(rows) > limit else None
+    return records, next_cursor
+
+def get_history_summary(cookie=None, status=None, start_ts=None, end_ts=None):
+    """按状态统计历史记录数量（读取按天汇总的统计表，时间范围按整天计算）
+
+    status 与历史记录查询的状态筛选一致，只统计该状态；统计表中没有对应列的状态直接统计历史记录表
+    """
+    where, ts_params = _history_filters(cookie, status, start_ts, end_ts)
+    store = _store()
+    # 最近一条记录的时间走 (cookie_name, ts) 或 ts 索引
+    last_ts = store.fetchone(f'SELECT MAX(ts) FROM upload_history{where}', ts_params)[0]
+    last_upload_time = datetime.fromtimestamp(last_ts).strftime('%Y-%m-%d %H:%M:%S') if last_ts else None
+
+    status_column = None
+    if status in ('success', 'skipped'):
+        status_column = status
+    elif status in STATUS_ALIASES['failed']:
+        status_column = 'failed'
+    elif status:
+        total = store.fetchone(f'SELECT COUNT(*) FROM upload_history{where}', ts_params)[0]
+        return {'total': total, 'counts': {status: total}, 'last_upload_time': last_upload_time}
+
+    clauses, params = ["granularity = 'day'"], []
+    if cookie:
+        clauses.append('cookie_name = ?')
+        params.append(cookie)
+    if start_ts is not None:
+        clauses.append('period >= ?')
+        params.append(datetime.fromtimestamp(start_ts).strftime(STATS_GRANULARITIES['day']))
+    if end_ts is not None:
+        clauses.append('period <= ?')
+        params.append(datetime.fromtimestamp(end_ts - 1).strftime(STATS_GRANULARITIES['day']))
+    total, success, failed, skipped = store.fetchone(
+        f'''SELECT IFNULL(SUM(total), 0), IFNULL(SUM(success), 0), IFNULL(SUM(failed), 0), IFNULL(SUM(skipped), 0)
+              FROM upload_stats WHERE {' AND '.join(clauses)}''', params)
+    counts = {'success': success, 'failed': failed, 'skipped': skipped}
+    if status_column:
+        counts = {column: (count if column == status_column else 0) for column, count in counts.items()}
+        total = counts[status_column]
+    
+    return {
+        'total': total,
+        'counts': counts,
+        'last_upload_time': last_upload_time
+    }
+
+def get_upload_count_last_hour(cookie_name):
+    """账号最近一小时的上传记录数（内存窗口，不查询数据库）"""
+    return upload_rate_window.count(cookie_name)
+
+def get_rate_limit_wait_seconds(cookie_name, risk_limit):
+    """计算账号需要等待多少秒才能再次上传（最近一小时上传数低于risk_limit），0表示可立即上传"""
+    return upload_rate_window.wait_seconds(cookie_name, risk_limit)
+
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['backfill-stats']:
+        print(f"统计表已重新计算，共 {backfill_stats()} 条汇总记录")
+    else:
+        print('用法: python -m utils.history_db backfill-stats')
@@ -3,6 +3,133 @@ import random
 import math
 from typing import Optional
 
+# 浏览器端的人类行为模拟脚本（通过 add_init_script 注入）
+BEHAVIOR_SCRIPT = """
+        // 人类行为模拟脚本
+        (function() {
+            'use strict';
+            
+            // === 1. 鼠标移动轨迹伪装 ===
+            let lastMouseMove = Date.now();
+            const mouseHistory = [];
+            
+            // 记录真实鼠标移动
+            document.addEventListener('mousemove', function(e) {
+                const now = Date.now();
+                mouseHistory.push({
+                    x: e.clientX,
+                    y: e.clientY,
+                    time: now,
+                    timeDiff: now - lastMouseMove
+                });
+                lastMouseMove = now;
+                
+                // 保持最近100个移动记录
+                if (mouseHistory.length > 100) {
+                    mouseHistory.shift();
+                }
+            });
+            
+            // === 2. 键盘输入行为伪装 ===
+            const keyTimings = [];
+            let lastKeyTime = 0;
+            
+            document.addEventListener('keydown', function(e) {
+                const now = Date.now();
+                keyTimings.push({
+                    key: e.key,
+                    time: now,
+                    interval: now - lastKeyTime
+                });
+                lastKeyTime = now;
+                
+                if (keyTimings.length > 50) {
+                    keyTimings.shift();
+                }
+            });
+            
+            // === 3. 滚动行为伪装 ===
+            let scrollHistory = [];
+            let lastScrollTime = 0;
+            
+            window.addEventListener('scroll', function(e) {
+                const now = Date.now();
+                scrollHistory.push({
+                    scrollY: window.scrollY,
+                    time: now,
+                    interval: now - lastScrollTime
+                });
+                lastScrollTime = now;
+                
+                if (scrollHistory.length > 30) {
+                    scrollHistory.shift();
+                }
+            });
+            
+            // === 4. 焦点变化行为 ===
+            let focusHistory = [];
+            
+            ['focus', 'blur', 'click'].forEach(eventType => {
+                document.addEventListener(eventType, function(e) {
+                    focusHistory.push({
+                        type: eventType,
+                        target: e.target.tagName,
+                        time: Date.now()
+                    });
+                    
+                    if (focusHistory.length > 20) {
+                        focusHistory.shift();
+                    }
+                });
+            });
+            
+            // === 5. 页面可见性变化 ===
+            let visibilityChanges = [];
+            
+            document.addEventListener('visibilitychange', function() {
+                visibilityChanges.push({
+                    hidden: document.hidden,
+                    time: Date.now()
+                });
+            });
+            
+            // === 6. 模拟人类行为统计 ===
+            window.getHumanBehaviorStats = function() {
+                return {
+                    mouseMovements: mouseHistory.length,
+                    averageMouseSpeed: mouseHistory.length > 1 ? 
+                        mouseHistory.reduce((acc, curr, idx) => {
+                            if (idx === 0) return acc;
+                            const prev = mouseHistory[idx - 1];
+                            const distance = Math.sqrt(Math.pow(curr.x - prev.x, 2) + Math.pow(curr.y - prev.y, 2));
+                            const time = curr.time - prev.time;
+                            return acc + (distance / time);
+                        }, 0) / (mouseHistory.length - 1) : 0,
+                    keystrokes: keyTimings.length,
+                    scrollEvents: scrollHistory.length,
+                    focusChanges: focusHistory.length,
+                    visibilityChanges: visibilityChanges.length,
+                    totalInteractionTime: Date.now() - (mouseHistory[0]?.time || Date.now())
+                };
+            };
+            
+            // === 7. 随机微动作 ===
+            setInterval(function() {
+                if (Math.random() < 0.1) { // 10%概率
+                    // 模拟轻微鼠标抖动
+                    const event = new MouseEvent('mousemove', {
+                        clientX: Math.random() * window.innerWidth,
+                        clientY: Math.random() * window.innerHeight,
+                        bubbles: true
+                    });
+                    document.dispatchEvent(event);
+                }
+            }, Math.random() * 5000 + 2000);
+            
+            console.log('🤖 人类行为模拟脚本已激活');
+        })();
+        """
+
 class HumanBehaviorSimulator:
     """人类行为模拟器，用于模拟真实用户行为避免被检测"""
     
@@ -185,133 +312,7 @@ class HumanBehaviorSimulator:
     
     async def add_behavior_script(self, context):
         """添加浏览器行为脚本"""
-        behavior_script = """
-        // 人类行为模拟脚本
-        (function() {
-            'use strict';
-            
-            // === 1. 鼠标移动轨迹伪装 ===
-            let lastMouseMove = Date.now();
-            const mouseHistory = [];
-            
-            // 记录真实鼠标移动
-            document.addEventListener('mousemove', function(e) {
-                const now = Date.now();
-                mouseHistory.push({
-                    x: e.clientX,
-                    y: e.clientY,
-                    time: now,
-                    timeDiff: now - lastMouseMove
-                });
-                lastMouseMove = now;
-                
-                // 保持最近100个移动记录
-                if (mouseHistory.length > 100) {
-                    mouseHistory.shift();
-                }
-            });
-            
-            // === 2. 键盘输入行为伪装 ===
-            const keyTimings = [];
-            let lastKeyTime = 0;
-            
-            document.addEventListener('keydown', function(e) {
-                const now = Date.now();
-                keyTimings.push({
-                    key: e.key,
-                    time: now,
-                    interval: now - lastKeyTime
-                });
-                lastKeyTime = now;
-                
-                if (keyTimings.length > 50) {
-                    keyTimings.shift();
-                }
-            });
-            
-            // === 3. 滚动行为伪装 ===
-            let scrollHistory = [];
-            let lastScrollTime = 0;
-            
-            window.addEventListener('scroll', function(e) {
-                const now = Date.now();
-                scrollHistory.push({
-                    scrollY: window.scrollY,
-                    time: now,
-                    interval: now - lastScrollTime
-                });
-                lastScrollTime = now;
-                
-                if (scrollHistory.length > 30) {
-                    scrollHistory.shift();
-                }
-            });
-            
-            // === 4. 焦点变化行为 ===
-            let focusHistory = [];
-            
-            ['focus', 'blur', 'click'].forEach(eventType => {
-                document.addEventListener(eventType, function(e) {
-                    focusHistory.push({
-                        type: eventType,
-                        target: e.target.tagName,
-                        time: Date.now()
-                    });
-                    
-                    if (focusHistory.length > 20) {
-                        focusHistory.shift();
-                    }
-                });
-            });
-            
-            // === 5. 页面可见性变化 ===
-            let visibilityChanges = [];
-            
-            document.addEventListener('visibilitychange', function() {
-                visibilityChanges.push({
-                    hidden: document.hidden,
-                    time: Date.now()
-                });
-            });
-            
-            // === 6. 模拟人类行为统计 ===
-            window.getHumanBehaviorStats = function() {
-                return {
-                    mouseMovements: mouseHistory.length,
-                    averageMouseSpeed: mouseHistory.length > 1 ? 
-                        mouseHistory.reduce((acc, curr, idx) => {
-                            if (idx === 0) return acc;
-                            const prev = mouseHistory[idx - 1];
-                            const distance = Math.sqrt(Math.pow(curr.x - prev.x, 2) + Math.pow(curr.y - prev.y, 2));
-                            const time = curr.time - prev.time;
-                            return acc + (distance / time);
-                        }, 0) / (mouseHistory.length - 1) : 0,
-                    keystrokes: keyTimings.length,
-                    scrollEvents: scrollHistory.length,
-                    focusChanges: focusHistory.length,
-                    visibilityChanges: visibilityChanges.length,
-                    totalInteractionTime: Date.now() - (mouseHistory[0]?.time || Date.now())
-                };
-            };
-            
-            // === 7. 随机微动作 ===
-            setInterval(function() {
-                if (Math.random() < 0.1) { // 10%概率
-                    // 模拟轻微鼠标抖动
-                    const event = new MouseEvent('mousemove', {
-                        clientX: Math.random() * window.innerWidth,
-                        clientY: Math.random() * window.innerHeight,
-                        bubbles: true
-                    });
-                    document.dispatchEvent(event);
-                }
-            }, Math.random() * 5000 + 2000);
-            
-            console.log('🤖 人类行为模拟脚本已激活');
-        })();
-        """
-        
-        await context.add_init_script(behavior_script)
+        await context.add_init_script(BEHAVIOR_SCRIPT)
 
 # 创建全局实例
 human_behavior = HumanBehaviorSimulator() 
\ No newline at end of file
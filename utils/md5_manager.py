@@ -3,22 +3,66 @@ import hashlib
 import sqlite3
 from datetime import datetime
 from utils.log import douyin_logger
+from utils.sqlite_store import get_store
+
+# 计算MD5时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 抽样指纹在文件头、中、尾各读取的字节数
+SAMPLE_SIZE = 1024 * 1024
+
+# 预热缓存时扫描的视频扩展名
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.flv', '.webm', '.wmv', '.3gp', '.m4v')
+
+
+def file_identity(stat_result):
+    """文件标识：(设备号, inode, 大小, 修改时间ns)，文件内容变化后标识随之改变"""
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def hash_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """计算文件MD5，返回 (计算前的文件标识, MD5)，计算期间文件被修改时标识为None
+
+    模块级函数，可在进程池中执行
+    """
+    identity = file_identity(os.stat(file_path))
+    md5_hash = hashlib.md5()
+    with open(file_path, "rb") as f:
+        # 对于大文件，分块读取
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5_hash.update(chunk)
+    if file_identity(os.stat(file_path)) != identity:
+        identity = None
+    return identity, md5_hash.hexdigest()
+
+
+def sample_hash(file_path, sample_size=SAMPLE_SIZE):
+    """计算文件的抽样指纹：文件大小 + 头、中、尾各1MB的MD5
+
+    只用于快速排除不重复的文件，指纹相同的文件仍需比较完整MD5
+    """
+    size = os.path.getsize(file_path)
+    md5_hash = hashlib.md5()
+    with open(file_path, "rb") as f:
+        if size <= sample_size * 3:
+            md5_hash.update(f.read())
+        else:
+            for offset in (0, (size - sample_size) // 2, size - sample_size):
+                f.seek(offset)
+                md5_hash.update(f.read(sample_size))
+    return f"{size}:{md5_hash.hexdigest()}"
+
 
 class MD5Manager:
     def __init__(self, db_path='database/video_md5.db'):
         """初始化MD5管理器"""
         self.db_path = db_path
+        self.db = get_store(db_path)
         self.init_db()
         
     def init_db(self):
         """初始化视频MD5数据库"""
-        # 确保数据库目录存在
-        db_dir = os.path.dirname(self.db_path)
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.db.connection()
         
         # 创建视频MD5记录表
         c.execute('''CREATE TABLE IF NOT EXISTS video_md5 (
@@ -33,40 +77,178 @@ class MD5Manager:
             tags TEXT
         )''')
         
-        conn.commit()
-        conn.close()
+        # 抽样指纹列（旧数据库没有该列时补充），与文件大小一起建立索引用于预筛选
+        columns = [row[1] for row in c.execute('PRAGMA table_info(video_md5)').fetchall()]
+        if 'sample_hash' not in columns:
+            c.execute('ALTER TABLE video_md5 ADD COLUMN sample_hash TEXT')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_video_md5_prefilter ON video_md5 (filesize, sample_hash)')
+        
+        # 文件摘要缓存表，按(设备号, inode)定位文件，大小和修改时间不一致时视为失效
+        c.execute('''CREATE TABLE IF NOT EXISTS file_digest_cache (
+            dev INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            filepath TEXT NOT NULL,
+            md5 TEXT NOT NULL,
+            hashed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (dev, inode)
+        )''')
+    
+    def _backfill_sample_hashes(self, rows):
+        """为旧记录补充抽样指纹（在预筛选命中没有抽样指纹的候选记录时按需执行，不在启动时遍历全部记录）
+        
+        只处理原文件仍存在且摘要缓存证明内容未变的记录，其余记录保持为空，预筛选时始终作为候选
+        
+        Args:
+            rows: [(id, filepath, md5)]
+        
+        Returns:
+            dict: {记录ID: 补充的抽样指纹}
+        """
+        backfilled = {}
+        try:
+            for record_id, file_path, md5_value in rows:
+                try:
+                    if self.get_cached_md5(file_identity(os.stat(file_path))) == md5_value:
+                        backfilled[record_id] = sample_hash(file_path)
+                except OSError:
+                    pass  # 原文件已删除
+            if backfilled:
+                self.db.executemany('UPDATE video_md5 SET sample_hash = ? WHERE id = ?',
+                                    [(value, record_id) for record_id, value in backfilled.items()])
+                douyin_logger.info(f"已为 {len(backfilled)} 条MD5记录补充抽样指纹")
+        except Exception as e:
+            douyin_logger.error(f"补充抽样指纹时出错: {str(e)}")
+        return backfilled
     
     def calculate_md5(self, file_path):
-        """计算文件的MD5值"""
+        """计算文件的MD5值，文件未变化时直接返回缓存的结果"""
         if not os.path.exists(file_path):
             douyin_logger.error(f"文件不存在: {file_path}")
             return None
             
         try:
-            md5_hash = hashlib.md5()
-            with open(file_path, "rb") as f:
-                # 对于大文件，分块读取
-                for chunk in iter(lambda: f.read(4096), b""):
-                    md5_hash.update(chunk)
-            return md5_hash.hexdigest()
+            cached = self.get_cached_md5(file_identity(os.stat(file_path)))
+            if cached:
+                return cached
+            
+            identity, md5_value = hash_file(file_path)
+            # 计算期间文件被修改时不写入缓存
+            if identity:
+                self.store_cached_md5(identity, file_path, md5_value)
+            return md5_value
         except Exception as e:
             douyin_logger.error(f"计算MD5时出错: {str(e)}")
             return None
     
+    def get_cached_md5(self, identity):
+        """根据文件标识获取缓存的MD5值，未命中或文件已变化时返回None"""
+        dev, inode, size, mtime_ns = identity
+        try:
+            result = self.db.fetchone('''SELECT md5 FROM file_digest_cache
+                         WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ?''',
+                      (dev, inode, size, mtime_ns))
+            return result[0] if result else None
+        except Exception as e:
+            douyin_logger.error(f"读取MD5缓存时出错: {str(e)}")
+            return None
+    
+    def store_cached_md5(self, identity, file_path, md5_value):
+        """写入文件摘要缓存"""
+        dev, inode, size, mtime_ns = identity
+        try:
+            # 同一文件（设备号+inode）只保留最新的一条，旧的摘要随之失效
+            self.db.execute('''INSERT OR REPLACE INTO file_digest_cache
+                         (dev, inode, size, mtime_ns, filepath, md5, hashed_at)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      (dev, inode, size, mtime_ns, file_path, md5_value,
+                       datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        except Exception as e:
+            douyin_logger.error(f"写入MD5缓存时出错: {str(e)}")
+    
+    def warm_cache(self, folder, recursive=True, extensions=VIDEO_EXTENSIONS):
+        """预先计算文件夹内所有视频的MD5并写入缓存
+        
+        Returns:
+            dict: total/cached/hashed/failed 数量
+        """
+        stats = {'total': 0, 'cached': 0, 'hashed': 0, 'failed': 0}
+        if not os.path.isdir(folder):
+            douyin_logger.error(f"文件夹不存在: {folder}")
+            return stats
+        
+        for root, dirs, files in os.walk(folder):
+            if not recursive:
+                dirs.clear()
+            for name in files:
+                if not name.lower().endswith(extensions):
+                    continue
+                file_path = os.path.join(root, name)
+                stats['total'] += 1
+                try:
+                    if self.get_cached_md5(file_identity(os.stat(file_path))):
+                        stats['cached'] += 1
+                    elif self.calculate_md5(file_path):
+                        stats['hashed'] += 1
+                    else:
+                        stats['failed'] += 1
+                except OSError as e:
+                    douyin_logger.error(f"读取文件信息失败 {file_path}: {str(e)}")
+                    stats['failed'] += 1
+        
+        douyin_logger.info(f"MD5缓存预热完成 {folder}: 共 {stats['total']} 个视频，"
+                           f"已缓存 {stats['cached']}，新计算 {stats['hashed']}，失败 {stats['failed']}")
+        return stats
+    
+    def prune_cache(self):
+        """清理已删除或已变化文件的缓存记录
+        
+        Returns:
+            int: 清理的记录数
+        """
+        try:
+            rows = self.db.fetchall('SELECT dev, inode, size, mtime_ns, filepath FROM file_digest_cache')
+            stale = []
+            for dev, inode, size, mtime_ns, file_path in rows:
+                try:
+                    if file_identity(os.stat(file_path)) != (dev, inode, size, mtime_ns):
+                        stale.append((dev, inode))
+                except OSError:
+                    stale.append((dev, inode))
+            self.db.executemany('DELETE FROM file_digest_cache WHERE dev = ? AND inode = ?', stale)
+            return len(stale)
+        except Exception as e:
+            douyin_logger.error(f"清理MD5缓存时出错: {str(e)}")
+            return 0
+    
     def is_duplicate(self, file_path):
-        """检查视频是否已经上传过（根据MD5值）"""
-        md5_value = self.calculate_md5(file_path)
-        if not md5_value:
+        """检查视频是否已经上传过（根据MD5值）
+        
+        先按文件大小和抽样指纹查找候选记录，没有候选时无需读取整个文件；
+        有候选时再计算完整MD5比较
+        """
+        if not os.path.exists(file_path):
+            douyin_logger.error(f"文件不存在: {file_path}")
             return False
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
+            filesize = os.path.getsize(file_path)
+            sample_value = sample_hash(file_path)
             
-            c.execute('SELECT filename, upload_time, cookie_name, title FROM video_md5 WHERE md5 = ?', (md5_value,))
-            result = c.fetchone()
-            conn.close()
+            # 没有抽样指纹的旧记录也作为候选，并尝试按需补充抽样指纹，补充后不一致的排除
+            rows = self.db.fetchall('''SELECT id, filepath, sample_hash, md5, filename, upload_time, cookie_name, title
+                         FROM video_md5 WHERE filesize = ? AND (sample_hash = ? OR sample_hash IS NULL)''',
+                      (filesize, sample_value))
+            legacy = [(row[0], row[1], row[3]) for row in rows if row[2] is None]
+            backfilled = self._backfill_sample_hashes(legacy) if legacy else {}
+            candidates = {row[3]: row[4:] for row in rows if backfilled.get(row[0], sample_value) == sample_value}
             
+            if not candidates:
+                return False
+            
+            md5_value = self.calculate_md5(file_path)
+            result = candidates.get(md5_value)
             if result:
                 douyin_logger.warning(f"检测到重复视频: {os.path.basename(file_path)}")
                 douyin_logger.warning(f"该视频已于 {result[1]} 使用账号 {result[2] or '未知'} 上传，标题为: {result[3] or '未知'}")
@@ -84,47 +266,83 @@ class MD5Manager:
             return False
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
             filename = os.path.basename(file_path)
             filesize = os.path.getsize(file_path)
+            sample_value = sample_hash(file_path)
             
             # 尝试插入记录
             try:
-                c.execute('''INSERT INTO video_md5 
-                          (filename, filepath, md5, filesize, cookie_name, upload_time, title, tags)
-                          VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                         (filename, file_path, md5_value, filesize, cookie_name, 
+                self.db.execute('''INSERT INTO video_md5 
+                          (filename, filepath, md5, filesize, sample_hash, cookie_name, upload_time, title, tags)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         (filename, file_path, md5_value, filesize, sample_value, cookie_name, 
                           datetime.now().strftime('%Y-%m-%d %H:%M:%S'), title, 
                           ','.join(tags) if tags else None))
-                          
-                conn.commit()
                 douyin_logger.success(f"视频MD5记录成功: {filename} -> {md5_value}")
                 success = True
             except sqlite3.IntegrityError:
                 # MD5已存在
                 douyin_logger.warning(f"视频MD5已存在: {filename} -> {md5_value}")
-                conn.rollback()
                 success = False
             
-            conn.close()
             return success
             
         except Exception as e:
             douyin_logger.error(f"记录视频MD5时出错: {str(e)}")
             return False
     
+    def get_uploaded_md5s(self, md5_values):
+        """返回给定MD5中已有上传记录的集合"""
+        md5_values = list(set(md5_values))
+        uploaded = set()
+        try:
+            # 分批查询，避免超过SQLite参数数量上限
+            for i in range(0, len(md5_values), 500):
+                batch = md5_values[i:i + 500]
+                rows = self.db.fetchall(f'SELECT md5 FROM video_md5 WHERE md5 IN ({",".join("?" * len(batch))})', batch)
+                uploaded.update(row[0] for row in rows)
+        except Exception as e:
+            douyin_logger.error(f"查询MD5上传记录时出错: {str(e)}")
+        return uploaded
+    
+    def find_duplicates(self, file_paths):
+        """根据已缓存的MD5找出列表中的重复视频（不会读取文件内容）
+        
+        已上传过的视频，以及与列表中前面的视频内容相同的视频都视为重复；
+        没有缓存或文件已变化的视频不做判断，留给上传时检查
+        
+        Returns:
+            dict: {file_path: 重复原因}
+        """
+        digests = {}
+        for file_path in file_paths:
+            try:
+                md5_value = self.get_cached_md5(file_identity(os.stat(file_path)))
+            except OSError:
+                continue
+            if md5_value:
+                digests[file_path] = md5_value
+        
+        uploaded = self.get_uploaded_md5s(digests.values())
+        duplicates = {}
+        first_seen = {}
+        for file_path in file_paths:
+            md5_value = digests.get(file_path)
+            if not md5_value or file_path in duplicates:
+                continue
+            if md5_value in uploaded:
+                duplicates[file_path] = "视频重复"
+            elif md5_value in first_seen and first_seen[md5_value] != file_path:
+                duplicates[file_path] = f"与 {os.path.basename(first_seen[md5_value])} 内容相同"
+            else:
+                first_seen.setdefault(md5_value, file_path)
+        return duplicates
+    
     def get_md5_record(self, md5_value):
         """根据MD5值获取视频记录"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            c.execute('''SELECT id, filename, filepath, md5, filesize, cookie_name, upload_time, title, tags 
+            result = self.db.fetchone('''SELECT id, filename, filepath, md5, filesize, cookie_name, upload_time, title, tags 
                          FROM video_md5 WHERE md5 = ?''', (md5_value,))
-            result = c.fetchone()
-            conn.close()
             
             if result:
                 return {
@@ -147,13 +365,10 @@ class MD5Manager:
     def get_all_records(self, limit=100, offset=0):
         """获取所有视频MD5记录"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            c.execute('''SELECT id, filename, md5, filesize, cookie_name, upload_time, title
+            rows = self.db.fetchall('''SELECT id, filename, md5, filesize, cookie_name, upload_time, title
                          FROM video_md5 ORDER BY upload_time DESC LIMIT ? OFFSET ?''', (limit, offset))
             records = []
-            for row in c.fetchall():
+            for row in rows:
                 records.append({
                     'id': row[0],
                     'filename': row[1],
@@ -164,7 +379,6 @@ class MD5Manager:
                     'title': row[6]
                 })
             
-            conn.close()
             return records
             
         except Exception as e:
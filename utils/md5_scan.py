@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+视频去重扫描模块
+遍历视频文件夹，在进程池中以较大的读取块并行计算MD5并写入摘要缓存，
+报告与已上传记录重复以及同一批次内内容相同的视频，上传队列据此在调度前剔除重复视频
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from conf import MD5_SCAN_WORKERS, MD5_SCAN_CHUNK_SIZE_MB
+from utils.log import douyin_logger
+from utils.md5_manager import md5_manager, hash_file, file_identity, VIDEO_EXTENSIONS
+
+# 进度推送的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+
+class MD5ScanJob:
+    """一次文件夹扫描"""
+
+    def __init__(self, folder, base_dir, recursive=True, prune_cache=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.folder = folder  # 相对base_dir的路径
+        self.base_dir = base_dir
+        self.recursive = recursive
+        self.prune_cache = prune_cache  # 结束后清理已删除或已变化文件的缓存记录（MD5缓存预热）
+        self.pruned = 0
+        self.status = 'running'
+        self.total = 0
+        self.processed = 0
+        self.cached = 0
+        self.hashed = 0
+        self.failed = 0
+        self.digests = {}  # 相对路径 -> MD5
+        self.duplicates = []  # [{path, md5, reason, duplicate_of}]
+        self.error = None
+        self.cancelled = False
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status != 'running'
+
+    def to_dict(self, include_results=False):
+        data = {
+            'scan_id': self.id,
+            'folder': self.folder,
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'cached': self.cached,
+            'hashed': self.hashed,
+            'failed': self.failed,
+            'progress': round(self.processed * 100 / self.total, 1) if self.total else (100 if self.finished else 0),
+            'duplicate_count': len(self.duplicates),
+            'pruned': self.pruned,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if include_results:
+            data['duplicates'] = list(self.duplicates)
+        return data
+
+
+class MD5ScanManager:
+    """视频去重扫描管理器"""
+
+    def __init__(self, max_workers=MD5_SCAN_WORKERS, chunk_size_mb=MD5_SCAN_CHUNK_SIZE_MB, max_finished_scans=20):
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 4)
+        self.chunk_size = chunk_size_mb * 1024 * 1024
+        self.max_finished_scans = max_finished_scans
+        self._scans = OrderedDict()  # scan_id -> MD5ScanJob
+        self._lock = threading.Lock()
+
+    def start(self, folder='', base_dir='videos', on_progress=None, recursive=True, prune_cache=False):
+        """开始扫描，立即返回扫描任务
+
+        Args:
+            folder: 相对base_dir的子文件夹，空字符串表示扫描整个base_dir
+            on_progress: 进度回调 on_progress(MD5ScanJob)，在扫描线程中调用
+            recursive: 是否包含子文件夹
+            prune_cache: 扫描结束后清理失效的缓存记录
+        """
+        job = MD5ScanJob(folder, base_dir, recursive, prune_cache)
+        with self._lock:
+            self._scans[job.id] = job
+            self._trim_finished()
+        threading.Thread(target=self._run, args=(job, on_progress), daemon=True,
+                         name=f'md5-scan-{job.id}').start()
+        douyin_logger.info(f"开始扫描重复视频: {os.path.join(base_dir, folder)}")
+        return job
+
+    def _trim_finished(self):
+        """只保留最近的若干个已结束扫描"""
+        finished = [scan_id for scan_id, job in self._scans.items() if job.finished]
+        for scan_id in finished[:max(0, len(finished) - self.max_finished_scans)]:
+            del self._scans[scan_id]
+
+    def get_scan(self, scan_id):
+        with self._lock:
+            return self._scans.get(scan_id)
+
+    def cancel(self, scan_id):
+        """取消扫描，已提交给进程池的文件会继续算完
+
+        Returns:
+            bool: 扫描是否存在
+        """
+        job = self.get_scan(scan_id)
+        if not job:
+            return False
+        job.cancelled = True
+        return True
+
+    def _collect_files(self, job):
+        root = os.path.join(job.base_dir, job.folder)
+        files = []
+        for dir_path, dirs, names in os.walk(root):
+            if not job.recursive:
+                dirs.clear()
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    full_path = os.path.join(dir_path, name)
+                    files.append(os.path.relpath(full_path, job.base_dir))
+        return files
+
+    def _run(self, job, on_progress):
+        last_report = 0
+
+        def report(force=False):
+            nonlocal last_report
+            now = time.time()
+            if on_progress and (force or now - last_report >= PROGRESS_INTERVAL):
+                last_report = now
+                try:
+                    on_progress(job)
+                except Exception as e:
+                    douyin_logger.warning(f"推送扫描进度失败: {str(e)}")
+
+        try:
+            files = self._collect_files(job)
+            job.total = len(files)
+            report(force=True)
+
+            # 先用缓存，只有缓存未命中的文件才交给进程池
+            pending = []
+            for rel_path in files:
+                full_path = os.path.join(job.base_dir, rel_path)
+                try:
+                    md5_value = md5_manager.get_cached_md5(file_identity(os.stat(full_path)))
+                except OSError:
+                    job.failed += 1
+                    job.processed += 1
+                    continue
+                if md5_value:
+                    job.digests[rel_path] = md5_value
+                    job.cached += 1
+                    job.processed += 1
+                else:
+                    pending.append(rel_path)
+            report()
+
+            if pending and not job.cancelled:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                    futures = {executor.submit(hash_file, os.path.join(job.base_dir, rel_path), self.chunk_size): rel_path
+                               for rel_path in pending}
+                    for future in as_completed(futures):
+                        rel_path = futures[future]
+                        try:
+                            identity, md5_value = future.result()
+                            if identity:
+                                md5_manager.store_cached_md5(identity, os.path.join(job.base_dir, rel_path), md5_value)
+                            job.digests[rel_path] = md5_value
+                            job.hashed += 1
+                        except Exception as e:
+                            douyin_logger.error(f"计算MD5失败 {rel_path}: {str(e)}")
+                            job.failed += 1
+                        job.processed += 1
+                        report()
+                        if job.cancelled:
+                            for f in futures:
+                                f.cancel()
+                            break
+
+            job.duplicates = self._find_duplicates(files, job.digests)
+            if job.prune_cache and not job.cancelled:
+                job.pruned = md5_manager.prune_cache()
+            job.status = 'cancelled' if job.cancelled else 'completed'
+            douyin_logger.info(f"重复视频扫描完成 {job.id}: 共 {job.total} 个视频，新计算 {job.hashed}，"
+                               f"发现 {len(job.duplicates)} 个重复")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            douyin_logger.error(f"重复视频扫描失败 {job.id}: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            report(force=True)
+
+    @staticmethod
+    def _find_duplicates(files, digests):
+        """与已上传记录重复，或与本批次前面的视频内容相同的视频"""
+        uploaded = md5_manager.get_uploaded_md5s(digests.values())
+        first_seen = {}
+        duplicates = []
+        for rel_path in files:
+            md5_value = digests.get(rel_path)
+            if not md5_value:
+                continue
+            if md5_value in uploaded:
+                record = md5_manager.get_md5_record(md5_value) or {}
+                duplicates.append({'path': rel_path, 'md5': md5_value, 'reason': 'uploaded',
+                                   'duplicate_of': record.get('filename')})
+            elif md5_value in first_seen:
+                duplicates.append({'path': rel_path, 'md5': md5_value, 'reason': 'batch',
+                                   'duplicate_of': first_seen[md5_value]})
+            else:
+                first_seen[md5_value] = rel_path
+        return duplicates
+
+
+# 全局去重扫描管理器实例
+md5_scan_manager = MD5ScanManager()
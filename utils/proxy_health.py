@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+代理健康检查模块
+后台线程定时检测所有代理：每轮共用一个 aiohttp 会话，用信号量限制并发，
+检测结果在一个事务中批量写入（延迟和成功率为EWMA，连续失败N次标记为不可用）
+"""
+
+import asyncio
+import threading
+import time
+
+import aiohttp
+
+from conf import (PROXY_HEALTH_CHECK_INTERVAL, PROXY_HEALTH_CHECK_URL, PROXY_HEALTH_CHECK_TIMEOUT,
+                  PROXY_HEALTH_CHECK_CONCURRENCY)
+from utils.log import douyin_logger
+from utils.proxy_manager import proxy_manager
+
+
+class ProxyHealthChecker:
+    """代理健康检查器"""
+
+    def __init__(self, manager=proxy_manager, interval=PROXY_HEALTH_CHECK_INTERVAL, url=PROXY_HEALTH_CHECK_URL,
+                 timeout=PROXY_HEALTH_CHECK_TIMEOUT, concurrency=PROXY_HEALTH_CHECK_CONCURRENCY):
+        self.manager = manager
+        self.interval = interval
+        self.url = url
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._run_lock = threading.Lock()
+        self.last_run = None  # 最近一轮检测的结果摘要
+
+    async def _check_all(self, proxies):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        # 不限制连接池大小，并发由信号量控制
+        connector = aiohttp.TCPConnector(limit=0)
+
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            async def check(proxy):
+                async with semaphore:
+                    success, speed_ms, _ = await self.manager.test_proxy(proxy, session, self.url)
+                    return proxy['id'], success, speed_ms
+
+            return await asyncio.gather(*(check(proxy) for proxy in proxies))
+
+    def run_once(self):
+        """检测所有代理一轮（阻塞），返回结果摘要"""
+        with self._run_lock:
+            proxies = self.manager.get_all_proxies()
+            start = time.time()
+            results = asyncio.run(self._check_all(proxies)) if proxies else []
+            changed = self.manager.record_check_results(results)
+            for proxy_id, status in changed:
+                douyin_logger.warning(f"代理 ID:{proxy_id} 状态变为 {status}")
+
+            healthy = sum(1 for _, success, _ in results if success)
+            self.last_run = {
+                'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start)),
+                'duration': round(time.time() - start, 2),
+                'checked': len(results),
+                'healthy': healthy,
+                'failed': len(results) - healthy,
+                'changed': len(changed)
+            }
+            douyin_logger.info(f"代理健康检查完成: {len(results)} 个代理，可用 {healthy}，"
+                               f"耗时 {self.last_run['duration']}s")
+            return self.last_run
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                douyin_logger.error(f"代理健康检查失败: {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        """启动后台检测线程（已启动时忽略）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='proxy-health-checker', daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """立即开始下一轮检测，返回后台线程是否在运行"""
+        if not self._thread or not self._thread.is_alive():
+            return False
+        self._wake.set()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def get_status(self):
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'checking': self._run_lock.locked(),
+            'interval': self.interval,
+            'url': self.url,
+            'concurrency': self.concurrency,
+            'last_run': self.last_run
+        }
+
+
+# 全局代理健康检查器实例
+proxy_health_checker = ProxyHealthChecker()
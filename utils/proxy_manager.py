@@ -3,24 +3,23 @@ import json
 import random
 import asyncio
 import aiohttp
-import os
 from datetime import datetime, timedelta
+from conf import PROXY_HEALTH_CHECK_URL, PROXY_HEALTH_CHECK_TIMEOUT, PROXY_HEALTH_EWMA_ALPHA, PROXY_UNHEALTHY_AFTER
 from utils.log import douyin_logger
+from utils.sqlite_store import get_store
+from utils.versioned_cache import VersionedCache
 
 class ProxyManager:
     def __init__(self, db_path='database/proxy_manager.db'):
         self.db_path = db_path
+        self.db = get_store(db_path)
+        # cookie -> playwright代理配置（无代理时为None），由修改代理/映射的接口失效
+        self._cookie_proxy_cache = VersionedCache()
         self.init_db()
     
     def init_db(self):
         """初始化代理数据库"""
-        # 确保数据库目录存在
-        db_dir = os.path.dirname(self.db_path)
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.db.connection()
         
         # 代理表
         c.execute('''CREATE TABLE IF NOT EXISTS proxies (
@@ -47,23 +46,19 @@ class ProxyManager:
             FOREIGN KEY (proxy_id) REFERENCES proxies (id)
         )''')
         
-        conn.commit()
-        conn.close()
+        # 连续检测失败次数（旧数据库没有该列时补充）
+        columns = [row[1] for row in c.execute('PRAGMA table_info(proxies)').fetchall()]
+        if 'consecutive_failures' not in columns:
+            c.execute('ALTER TABLE proxies ADD COLUMN consecutive_failures INTEGER DEFAULT 0')
     
     def add_proxy(self, name, host, port, username=None, password=None, protocol='http'):
         """添加代理"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            c.execute('''INSERT INTO proxies 
+            c = self.db.execute('''INSERT INTO proxies 
                         (name, host, port, username, password, protocol) 
                         VALUES (?, ?, ?, ?, ?, ?)''',
                      (name, host, port, username, password, protocol))
-            
-            conn.commit()
             proxy_id = c.lastrowid
-            conn.close()
             
             douyin_logger.info(f"添加代理成功: {name} ({host}:{port})")
             return True, proxy_id
@@ -76,15 +71,12 @@ class ProxyManager:
     
     def get_all_proxies(self):
         """获取所有代理"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''SELECT id, name, host, port, username, password, protocol, 
-                           status, last_check, speed_ms, success_rate, created_time 
+        rows = self.db.fetchall('''SELECT id, name, host, port, username, password, protocol, 
+                           status, last_check, speed_ms, success_rate, created_time, consecutive_failures 
                     FROM proxies ORDER BY created_time DESC''')
         
         proxies = []
-        for row in c.fetchall():
+        for row in rows:
             proxies.append({
                 'id': row[0],
                 'name': row[1],
@@ -97,26 +89,22 @@ class ProxyManager:
                 'last_check': row[8],
                 'speed_ms': row[9],
                 'success_rate': row[10],
-                'created_time': row[11]
+                'created_time': row[11],
+                'consecutive_failures': row[12] or 0
             })
         
-        conn.close()
         return proxies
     
     def delete_proxy(self, proxy_id):
         """删除代理"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            # 先删除映射关系
-            c.execute('DELETE FROM cookie_proxy_mapping WHERE proxy_id = ?', (proxy_id,))
-            
-            # 删除代理
-            c.execute('DELETE FROM proxies WHERE id = ?', (proxy_id,))
-            
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as c:
+                # 先删除映射关系
+                c.execute('DELETE FROM cookie_proxy_mapping WHERE proxy_id = ?', (proxy_id,))
+                
+                # 删除代理
+                c.execute('DELETE FROM proxies WHERE id = ?', (proxy_id,))
+            self._cookie_proxy_cache.invalidate()
             
             douyin_logger.info(f"删除代理成功: ID {proxy_id}")
             return True, "删除成功"
@@ -125,30 +113,95 @@ class ProxyManager:
             douyin_logger.error(f"删除代理失败: {str(e)}")
             return False, str(e)
     
-    async def test_proxy(self, proxy_info):
-        """测试代理连接"""
+    async def test_proxy(self, proxy_info, session=None, url=PROXY_HEALTH_CHECK_URL):
+        """测试代理连接
+        
+        Args:
+            session: 共用的 aiohttp.ClientSession，为空时临时创建
+            url: 检测目标地址
+        """
+        if session is None:
+            timeout = aiohttp.ClientTimeout(total=PROXY_HEALTH_CHECK_TIMEOUT)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                return await self.test_proxy(proxy_info, session, url)
+        
         try:
             proxy_url = self._build_proxy_url(proxy_info)
             
             start_time = datetime.now()
             
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(
-                    'http://httpbin.org/ip', 
-                    proxy=proxy_url
-                ) as response:
-                    if response.status == 200:
-                        end_time = datetime.now()
-                        speed_ms = int((end_time - start_time).total_seconds() * 1000)
-                        
-                        result = await response.json()
-                        return True, speed_ms, result.get('origin', 'Unknown')
-                    else:
-                        return False, 0, f"HTTP {response.status}"
-                        
+            async with session.get(url, proxy=proxy_url) as response:
+                if response.status == 200:
+                    end_time = datetime.now()
+                    speed_ms = int((end_time - start_time).total_seconds() * 1000)
+                    
+                    # 目标地址不一定返回JSON（如本地检测地址）
+                    try:
+                        result = await response.json(content_type=None)
+                        ip_info = result.get('origin', 'Unknown') if isinstance(result, dict) else 'Unknown'
+                    except ValueError:
+                        ip_info = 'Unknown'
+                    return True, speed_ms, ip_info
+                else:
+                    return False, 0, f"HTTP {response.status}"
+                    
         except Exception as e:
-            return False, 0, str(e)
+            return False, 0, str(e) or type(e).__name__
+    
+    def record_check_results(self, results, alpha=PROXY_HEALTH_EWMA_ALPHA, unhealthy_after=PROXY_UNHEALTHY_AFTER):
+        """在一个事务中批量写入检测结果
+        
+        延迟和成功率按指数加权移动平均（EWMA）累计；连续失败达到 unhealthy_after 次的代理标记为不可用，
+        之后检测成功即恢复
+        
+        Args:
+            results: [(proxy_id, success, speed_ms)]
+        
+        Returns:
+            list: 状态发生变化的 [(proxy_id, 新状态)]
+        """
+        if not results:
+            return []
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        changed = []
+        with self.db.transaction() as c:
+            current, checked = {}, set()
+            ids = list({proxy_id for proxy_id, _, _ in results})
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                for row in c.execute(f'''SELECT id, status, last_check, speed_ms, success_rate, consecutive_failures
+                                         FROM proxies WHERE id IN ({",".join("?" * len(batch))})''', batch):
+                    current[row[0]] = list(row[1:])
+            
+            for proxy_id, success, speed_ms in results:
+                state = current.get(proxy_id)
+                if state is None:
+                    continue  # 检测期间已被删除
+                status, last_check, ewma_ms, rate, failures = state
+                sample = 1.0 if success else 0.0
+                # 第一次检测直接使用样本值
+                rate = sample if last_check is None else alpha * sample + (1 - alpha) * (rate or 0.0)
+                if success:
+                    ewma_ms = speed_ms if not ewma_ms else round(alpha * speed_ms + (1 - alpha) * ewma_ms)
+                    failures = 0
+                    new_status = 'active'
+                else:
+                    failures = (failures or 0) + 1
+                    new_status = 'inactive' if failures >= unhealthy_after else status
+                if new_status != status:
+                    changed.append((proxy_id, new_status))
+                current[proxy_id] = [new_status, now, ewma_ms, rate, failures]
+                checked.add(proxy_id)
+            
+            updates = [(status, last_check, ewma_ms, round(rate, 4), failures, proxy_id)
+                       for proxy_id, (status, last_check, ewma_ms, rate, failures) in current.items()
+                       if proxy_id in checked]
+            c.executemany('''UPDATE proxies SET status = ?, last_check = ?, speed_ms = ?, success_rate = ?,
+                                  consecutive_failures = ? WHERE id = ?''', updates)
+        # 状态变化后重新解析，使已映射账号的不可用警告及时生效
+        if changed:
+            self._cookie_proxy_cache.invalidate()
+        return changed
     
     def _build_proxy_url(self, proxy_info):
         """构建代理URL"""
@@ -165,14 +218,9 @@ class ProxyManager:
     
     async def check_proxy_status(self, proxy_id):
         """检查单个代理状态"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('SELECT * FROM proxies WHERE id = ?', (proxy_id,))
-        row = c.fetchone()
+        row = self.db.fetchone('SELECT * FROM proxies WHERE id = ?', (proxy_id,))
         
         if not row:
-            conn.close()
             return False, "代理不存在"
         
         proxy_info = {
@@ -185,63 +233,45 @@ class ProxyManager:
         
         success, speed_ms, ip_info = await self.test_proxy(proxy_info)
         
-        # 更新状态
-        status = 'active' if success else 'inactive'
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        c.execute('''UPDATE proxies 
-                    SET status = ?, last_check = ?, speed_ms = ?
-                    WHERE id = ?''',
-                 (status, now, speed_ms, proxy_id))
-        
-        conn.commit()
-        conn.close()
+        # 更新状态和统计
+        self.record_check_results([(proxy_id, success, speed_ms)])
         
         return success, ip_info if success else "连接失败"
     
     def assign_proxy_to_cookie(self, cookie_name, proxy_id=None):
         """为cookie分配代理"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            if proxy_id is None:
-                # 自动分配：选择活跃且负载最少的代理
-                c.execute('''SELECT p.id, COUNT(cpm.cookie_name) as usage_count
-                           FROM proxies p
-                           LEFT JOIN cookie_proxy_mapping cpm ON p.id = cpm.proxy_id
-                           WHERE p.status = 'active'
-                           GROUP BY p.id
-                           ORDER BY usage_count ASC, p.speed_ms ASC
-                           LIMIT 1''')
+            with self.db.transaction() as c:
+                if proxy_id is None:
+                    # 自动分配：选择活跃且负载最少的代理
+                    result = c.execute('''SELECT p.id, COUNT(cpm.cookie_name) as usage_count
+                               FROM proxies p
+                               LEFT JOIN cookie_proxy_mapping cpm ON p.id = cpm.proxy_id
+                               WHERE p.status = 'active'
+                               GROUP BY p.id
+                               ORDER BY usage_count ASC, p.speed_ms ASC
+                               LIMIT 1''').fetchone()
+                    
+                    if not result:
+                        return False, "没有可用的活跃代理"
+                    
+                    proxy_id = result[0]
                 
-                result = c.fetchone()
-                if not result:
-                    conn.close()
-                    return False, "没有可用的活跃代理"
+                # 检查代理是否存在且活跃
+                proxy_status = c.execute('SELECT status FROM proxies WHERE id = ?', (proxy_id,)).fetchone()
                 
-                proxy_id = result[0]
-            
-            # 检查代理是否存在且活跃
-            c.execute('SELECT status FROM proxies WHERE id = ?', (proxy_id,))
-            proxy_status = c.fetchone()
-            
-            if not proxy_status:
-                conn.close()
-                return False, "代理不存在"
-            
-            if proxy_status[0] != 'active':
-                conn.close()
-                return False, "代理不可用"
-            
-            # 更新或插入映射
-            c.execute('''INSERT OR REPLACE INTO cookie_proxy_mapping 
-                        (cookie_name, proxy_id, assigned_time)
-                        VALUES (?, ?, ?)''',
-                     (cookie_name, proxy_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-            
-            conn.commit()
-            conn.close()
+                if not proxy_status:
+                    return False, "代理不存在"
+                
+                if proxy_status[0] != 'active':
+                    return False, "代理不可用"
+                
+                # 更新或插入映射
+                c.execute('''INSERT OR REPLACE INTO cookie_proxy_mapping 
+                            (cookie_name, proxy_id, assigned_time)
+                            VALUES (?, ?, ?)''',
+                         (cookie_name, proxy_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            self._cookie_proxy_cache.invalidate(cookie_name)
             
             douyin_logger.info(f"为Cookie {cookie_name} 分配代理 ID:{proxy_id}")
             return True, "分配成功"
@@ -251,18 +281,16 @@ class ProxyManager:
             return False, str(e)
     
     def get_cookie_proxy(self, cookie_name):
-        """获取cookie对应的代理"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        """获取cookie对应的代理
         
-        c.execute('''SELECT p.* FROM proxies p
+        不按健康状态过滤：已映射代理的账号必须始终通过该代理连接，健康检测只用于新分配时选择代理，
+        否则代理被标记为不可用后账号会静默回退为直连，暴露本机IP
+        """
+        row = self.db.fetchone('''SELECT p.* FROM proxies p
                     JOIN cookie_proxy_mapping cpm ON p.id = cpm.proxy_id
-                    WHERE cpm.cookie_name = ? AND p.status = 'active' ''',
+                    WHERE cpm.cookie_name = ?''',
                  (cookie_name,))
         
-        row = c.fetchone()
-        conn.close()
-        
         if not row:
             return None
         
@@ -273,16 +301,25 @@ class ProxyManager:
             'port': row[3],
             'username': row[4],
             'password': row[5],
-            'protocol': row[6]
+            'protocol': row[6],
+            'status': row[7]
         }
     
     def get_proxy_for_playwright(self, cookie_name):
-        """获取适用于playwright的代理配置"""
+        """获取适用于playwright的代理配置（进程内缓存，每次启动浏览器都会调用）"""
+        config = self._cookie_proxy_cache.get(cookie_name, lambda: self._load_proxy_for_playwright(cookie_name))
+        return dict(config) if config else None
+    
+    def _load_proxy_for_playwright(self, cookie_name):
         proxy_info = self.get_cookie_proxy(cookie_name)
         
         if not proxy_info:
             return None
         
+        if proxy_info['status'] != 'active':
+            douyin_logger.error(f"Cookie {cookie_name} 映射的代理 {proxy_info['name']} 健康检测失败，"
+                                f"仍通过该代理连接（不会回退为直连），如持续失败请更换代理")
+        
         config = {
             'server': f"{proxy_info['protocol']}://{proxy_info['host']}:{proxy_info['port']}"
         }
@@ -295,12 +332,7 @@ class ProxyManager:
     
     def get_proxy_by_id(self, proxy_id):
         """根据代理ID获取代理信息"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('SELECT * FROM proxies WHERE id = ?', (proxy_id,))
-        row = c.fetchone()
-        conn.close()
+        row = self.db.fetchone('SELECT * FROM proxies WHERE id = ?', (proxy_id,))
         
         if not row:
             return None
@@ -335,17 +367,14 @@ class ProxyManager:
     
     def get_cookie_proxy_mappings(self):
         """获取所有cookie-代理映射"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''SELECT cpm.cookie_name, p.name as proxy_name, p.host, p.port, 
+        rows = self.db.fetchall('''SELECT cpm.cookie_name, p.name as proxy_name, p.host, p.port, 
                            p.status, cpm.assigned_time
                     FROM cookie_proxy_mapping cpm
                     LEFT JOIN proxies p ON cpm.proxy_id = p.id
                     ORDER BY cpm.assigned_time DESC''')
         
         mappings = []
-        for row in c.fetchall():
+        for row in rows:
             mappings.append({
                 'cookie_name': row[0],
                 'proxy_name': row[1],
@@ -355,19 +384,13 @@ class ProxyManager:
                 'assigned_time': row[5]
             })
         
-        conn.close()
         return mappings
     
     def remove_cookie_proxy(self, cookie_name):
         """移除cookie的代理分配"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            
-            c.execute('DELETE FROM cookie_proxy_mapping WHERE cookie_name = ?', (cookie_name,))
-            
-            conn.commit()
-            conn.close()
+            self.db.execute('DELETE FROM cookie_proxy_mapping WHERE cookie_name = ?', (cookie_name,))
+            self._cookie_proxy_cache.invalidate(cookie_name)
             
             douyin_logger.info(f"移除Cookie {cookie_name} 的代理分配")
             return True, "移除成功"
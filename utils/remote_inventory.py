@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+远程视频清单缓存模块
+按账号保存创作者中心的作品列表（作品ID、标题、状态、发布时间、数据指标、获取时间），
+TTL内的列表请求直接读取缓存；过期后只增量抓取比已知最新作品更新的分页，
+增量抓取不会更新旧作品，因此超过完整刷新间隔后重新完整抓取；
+删除/设置权限成功后按作品ID同步更新清单
+"""
+
+import json
+import time
+
+from conf import REMOTE_INVENTORY_TTL, REMOTE_INVENTORY_FULL_REFRESH_INTERVAL
+from utils.log import douyin_logger
+from utils.sqlite_store import get_store
+
+
+class RemoteInventory:
+    """远程视频清单"""
+
+    def __init__(self, db_path='database/remote_inventory.db', ttl=REMOTE_INVENTORY_TTL,
+                 full_refresh_interval=REMOTE_INVENTORY_FULL_REFRESH_INTERVAL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.full_refresh_interval = full_refresh_interval
+        self.db = get_store(db_path)
+        self.init_db()
+
+    def init_db(self):
+        """初始化清单数据库"""
+        c = self.db.connection()
+
+        # 作品表：seq 为列表中的顺序（越小越新），增量抓取到的新作品排在最前
+        c.execute('''CREATE TABLE IF NOT EXISTS remote_videos (
+            account TEXT NOT NULL,
+            aweme_id TEXT NOT NULL,
+            title TEXT,
+            status TEXT,
+            in_review INTEGER,
+            publish_time TEXT,
+            metrics TEXT,
+            seq INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (account, aweme_id)
+        )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_remote_videos_title ON remote_videos (account, title)')
+
+        # 每个账号最近一次抓取（含增量）和最近一次完整抓取的时间
+        c.execute('''CREATE TABLE IF NOT EXISTS remote_inventory_state (
+            account TEXT PRIMARY KEY,
+            fetched_at REAL NOT NULL,
+            full_fetched_at REAL
+        )''')
+        columns = [row[1] for row in c.execute('PRAGMA table_info(remote_inventory_state)').fetchall()]
+        if 'full_fetched_at' not in columns:
+            c.execute('ALTER TABLE remote_inventory_state ADD COLUMN full_fetched_at REAL')
+
+    def age(self, account):
+        """距最近一次抓取的秒数，从未抓取时返回None"""
+        row = self.db.fetchone('SELECT fetched_at FROM remote_inventory_state WHERE account = ?', (account,))
+        return time.time() - row["fetched_at"] if row else None
+
+    def is_fresh(self, account):
+        age = self.age(account)
+        return age is not None and age < self.ttl
+
+    def needs_full_refresh(self, account):
+        """超过完整刷新间隔（或从未完整抓取）时需要完整抓取，以更新旧作品并移除在其他地方删除的作品"""
+        row = self.db.fetchone('SELECT full_fetched_at FROM remote_inventory_state WHERE account = ?', (account,))
+        return not row or row["full_fetched_at"] is None or time.time() - row["full_fetched_at"] >= self.full_refresh_interval
+
+    def get_videos(self, account):
+        """按列表顺序返回缓存的作品，从未抓取时返回None"""
+        if self.age(account) is None:
+            return None
+        rows = self.db.fetchall('''SELECT aweme_id, title, status, in_review, publish_time, metrics FROM remote_videos
+                                   WHERE account = ? ORDER BY seq''', (account,))
+        videos = []
+        for i, row in enumerate(rows):
+            video = dict(row)
+            video["index"] = i
+            video["in_review"] = None if video["in_review"] is None else bool(video["in_review"])
+            video["metrics"] = json.loads(video["metrics"]) if video["metrics"] else {}
+            videos.append(video)
+        return videos
+
+    def known_ids(self, account):
+        """已缓存的作品ID集合，用于增量抓取时判断是否已到达已知作品"""
+        rows = self.db.fetchall('SELECT aweme_id FROM remote_videos WHERE account = ?', (account,))
+        return {row["aweme_id"] for row in rows}
+
+    def save(self, account, videos, full=True):
+        """保存抓取到的作品（按列表顺序），没有作品ID的视频不缓存
+
+        Args:
+            full: True 时替换该账号的全部作品；False 时为增量抓取，已有作品更新字段，新作品插入到最前
+
+        Returns:
+            int: 保存的作品数量
+        """
+        videos = [video for video in videos if video.get("aweme_id")]
+        now = time.time()
+        with self.db.transaction() as conn:
+            if full:
+                conn.execute('DELETE FROM remote_videos WHERE account = ?', (account,))
+                first_seq = 0
+            else:
+                known = {row["aweme_id"]: row["seq"] for row in conn.execute(
+                    'SELECT aweme_id, seq FROM remote_videos WHERE account = ?', (account,))}
+                new_count = sum(1 for video in videos if video["aweme_id"] not in known)
+                min_seq = min(known.values()) if known else 0
+                first_seq = min_seq - new_count
+
+            rows = []
+            seq = first_seq
+            for video in videos:
+                if full or video["aweme_id"] not in known:
+                    item_seq, seq = seq, seq + 1
+                else:
+                    item_seq = known[video["aweme_id"]]
+                in_review = video.get("in_review")
+                rows.append((account, video["aweme_id"], video.get("title"), video.get("status"),
+                             None if in_review is None else int(in_review), video.get("publish_time"),
+                             json.dumps(video.get("metrics") or {}, ensure_ascii=False), item_seq, now))
+            conn.executemany('''INSERT OR REPLACE INTO remote_videos
+                                (account, aweme_id, title, status, in_review, publish_time, metrics, seq, fetched_at)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+            if full:
+                conn.execute('''INSERT OR REPLACE INTO remote_inventory_state (account, fetched_at, full_fetched_at)
+                                VALUES (?, ?, ?)''', (account, now, now))
+            else:
+                conn.execute('UPDATE remote_inventory_state SET fetched_at = ? WHERE account = ?', (now, account))
+        douyin_logger.info(f"远程视频清单已{'更新' if full else '增量更新'}: {account} {len(rows)} 个作品")
+        return len(rows)
+
+    def ids_by_title(self, account, titles):
+        """按标题查找作品ID（走 (account, title) 索引），存在同名作品的标题无法确定作品，不返回
+
+        Returns:
+            dict: {标题: 作品ID}
+        """
+        titles = list(set(titles))
+        result = {}
+        for start in range(0, len(titles), 500):
+            chunk = titles[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db.fetchall(f'''SELECT title, MIN(aweme_id) AS aweme_id FROM remote_videos
+                                        WHERE account = ? AND title IN ({placeholders})
+                                        GROUP BY title HAVING COUNT(*) = 1''',
+                                    (account, *chunk))
+            for row in rows:
+                result[row["title"]] = row["aweme_id"]
+        return result
+
+    def remove_videos(self, account, aweme_ids):
+        """删除成功后按作品ID从清单中移除"""
+        with self.db.transaction() as conn:
+            conn.executemany('DELETE FROM remote_videos WHERE account = ? AND aweme_id = ?',
+                             [(account, aweme_id) for aweme_id in aweme_ids])
+
+    def set_status(self, account, aweme_ids, status):
+        """设置权限成功后按作品ID更新作品状态"""
+        with self.db.transaction() as conn:
+            conn.executemany('UPDATE remote_videos SET status = ? WHERE account = ? AND aweme_id = ?',
+                             [(status, account, aweme_id) for aweme_id in aweme_ids])
+
+    def invalidate(self, account):
+        """清空账号清单，下次列表请求重新完整抓取"""
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM remote_videos WHERE account = ?', (account,))
+            conn.execute('DELETE FROM remote_inventory_state WHERE account = ?', (account,))
+
+
+# 全局远程视频清单实例
+remote_inventory = RemoteInventory()
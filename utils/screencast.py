@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+浏览器画面推送模块
+通过Chrome DevTools协议的 Page.startScreencast 获取视口大小的JPEG帧，
+只有合成器产生新画面时才会推送，每帧处理完成后再确认(ack)，由浏览器端控制推送速度
+"""
+
+import asyncio
+
+from conf import BROWSER_SCREENCAST_QUALITY, BROWSER_SCREENCAST_MAX_WIDTH, BROWSER_SCREENCAST_MAX_HEIGHT
+from utils.log import douyin_logger
+
+
+class PageScreencast:
+    """单个页面的CDP画面推送"""
+
+    def __init__(self, page, on_frame, quality=BROWSER_SCREENCAST_QUALITY,
+                 max_width=BROWSER_SCREENCAST_MAX_WIDTH, max_height=BROWSER_SCREENCAST_MAX_HEIGHT,
+                 every_nth_frame=1):
+        """
+        Args:
+            page: Playwright页面（仅支持Chromium）
+            on_frame: 帧回调 on_frame(data, metadata)，data为base64编码的JPEG，
+                      metadata包含 deviceWidth/deviceHeight/timestamp 等字段
+        """
+        self.page = page
+        self.on_frame = on_frame
+        self.quality = quality
+        self.max_width = max_width
+        self.max_height = max_height
+        self.every_nth_frame = every_nth_frame
+        self.frames = 0
+        self._cdp = None
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    async def start(self):
+        """开始推送画面
+
+        Returns:
+            bool: 是否启动成功（非Chromium浏览器或CDP不可用时返回False）
+        """
+        try:
+            self._cdp = await self.page.context.new_cdp_session(self.page)
+            self._cdp.on('Page.screencastFrame', self._on_screencast_frame)
+            await self._cdp.send('Page.startScreencast', {
+                'format': 'jpeg',
+                'quality': self.quality,
+                'maxWidth': self.max_width,
+                'maxHeight': self.max_height,
+                'everyNthFrame': self.every_nth_frame,
+            })
+            self._running = True
+            return True
+        except Exception as e:
+            douyin_logger.warning(f"启动CDP画面推送失败: {str(e)}")
+            await self._detach()
+            return False
+
+    def _on_screencast_frame(self, params):
+        asyncio.create_task(self._handle_frame(params))
+
+    async def _handle_frame(self, params):
+        try:
+            if self._running:
+                self.frames += 1
+                self.on_frame(params['data'], params.get('metadata', {}))
+        except Exception as e:
+            douyin_logger.error(f"处理画面帧失败: {str(e)}")
+        finally:
+            # 帧处理完成后再确认，浏览器收到确认前不会推送下一帧
+            try:
+                if self._cdp:
+                    await self._cdp.send('Page.screencastFrameAck', {'sessionId': params['sessionId']})
+            except Exception:
+                pass  # 页面已关闭
+
+    async def stop(self):
+        """停止推送画面"""
+        if self._running:
+            self._running = False
+            try:
+                await self._cdp.send('Page.stopScreencast')
+            except Exception:
+                pass  # 页面已关闭
+        await self._detach()
+
+    async def _detach(self):
+        if self._cdp:
+            try:
+                await self._cdp.detach()
+            except Exception:
+                pass
+            self._cdp = None
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite访问层
+每个数据库文件每个线程保持一个长连接（WAL模式、busy_timeout），连接上的预编译语句缓存得以复用；
+单条语句自动提交，多条写入通过 transaction() 合并到一个事务中
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from conf import SQLITE_BUSY_TIMEOUT
+
+# 每个连接缓存的预编译语句数量
+STATEMENT_CACHE_SIZE = 256
+
+
+class SQLiteStore:
+    """单个SQLite数据库的线程本地连接池"""
+
+    def __init__(self, db_path, busy_timeout=SQLITE_BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        # 确保数据库目录存在
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+    def connection(self):
+        """获取当前线程的连接（首次使用时创建）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None：不隐式开启事务，由 transaction() 显式控制
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        """执行单条语句（不在事务中时自动提交）"""
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql, rows):
+        """在一个事务中批量执行"""
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows)
+
+    def fetchone(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchone()
+
+    def fetchall(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self, immediate=True):
+        """事务上下文，正常退出时提交，异常时回滚；嵌套使用时并入外层事务
+
+        Args:
+            immediate: 开始时即获取写锁，避免读后升级为写时因其他写入者而失败
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path):
+    """获取数据库文件对应的共享SQLiteStore，同一文件的多个管理器共用连接"""
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SQLiteStore(db_path)
+        return store
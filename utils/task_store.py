@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+多账号任务存储模块
+使用WAL模式的SQLite保存多账号上传任务，每个(账号, 视频)对应一条作业记录，
+作业通过 租用/完成/失败 的原子状态转换推进，重启后可精确地从未完成的作业继续
+"""
+
+import json
+import os
+from datetime import datetime
+
+from utils.log import douyin_logger
+from utils.sqlite_store import get_store
+
+# 作业状态
+JOB_PENDING = 'pending'  # 等待上传
+JOB_LEASED = 'leased'  # 正在上传
+JOB_DONE = 'done'  # 上传成功
+JOB_SKIPPED = 'skipped'  # 重复视频已跳过
+JOB_FAILED = 'failed'  # 上传失败
+
+# 计入"已完成"的作业状态
+FINISHED_JOB_STATUSES = (JOB_DONE, JOB_SKIPPED)
+
+
+class TaskStore:
+    """多账号任务存储"""
+
+    def __init__(self, db_path='database/multi_tasks.db', legacy_json_path='database/multi_tasks.json'):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self.db = get_store(db_path)
+        self.init_db()
+
+    def init_db(self):
+        """初始化任务数据库"""
+        c = self.db.connection()
+
+        # 账号任务表
+        c.execute('''CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cookie TEXT NOT NULL,
+            location TEXT,
+            upload_interval INTEGER DEFAULT 5,
+            risk_limit INTEGER DEFAULT 5,
+            publish_type TEXT DEFAULT 'now',
+            publish_date TEXT,
+            publish_hour TEXT,
+            publish_minute TEXT,
+            status TEXT DEFAULT 'waiting',
+            current_video TEXT,
+            created_time TEXT
+        )''')
+
+        # 上传作业表：每个视频一条
+        c.execute('''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            video_index INTEGER NOT NULL,
+            video_path TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            updated_time TEXT,
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+        )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_jobs_task_status ON jobs (task_id, status, video_index)')
+
+        self._import_legacy_json()
+
+    def _import_legacy_json(self):
+        """一次性导入旧版 multi_tasks.json 中的任务"""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy_tasks = json.load(f)
+            for task in legacy_tasks:
+                completed = task.get('completed_videos', 0)
+                self.add_task(task, completed_videos=completed, status=task.get('status', 'waiting'))
+            os.replace(self.legacy_json_path, self.legacy_json_path + '.bak')
+            douyin_logger.info(f"已从 {self.legacy_json_path} 导入 {len(legacy_tasks)} 个多账号任务")
+        except Exception as e:
+            douyin_logger.error(f"导入旧版多账号任务失败: {str(e)}")
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # ---------- 任务 ----------
+
+    def add_task(self, data, completed_videos=0, status='waiting'):
+        """添加账号任务，并为每个视频创建一条作业
+
+        Returns:
+            int: 新任务ID
+        """
+        videos = data.get('videos', [])
+        now = self._now()
+        with self.db.transaction() as conn:
+            c = conn.execute('''INSERT INTO tasks (cookie, location, upload_interval, risk_limit, publish_type,
+                                publish_date, publish_hour, publish_minute, status, current_video, created_time)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                             (data.get('cookie'), data.get('location', '杭州市'),
+                              int(data.get('upload_interval', 5)), int(data.get('risk_limit', 5)),
+                              data.get('publish_type', 'now'), data.get('publish_date'),
+                              data.get('publish_hour'), data.get('publish_minute'),
+                              status, data.get('current_video'), data.get('created_time', now)))
+            task_id = c.lastrowid
+            conn.executemany('''INSERT INTO jobs (task_id, video_index, video_path, status, updated_time)
+                                VALUES (?, ?, ?, ?, ?)''',
+                             [(task_id, i, video, JOB_DONE if i < completed_videos else JOB_PENDING, now)
+                              for i, video in enumerate(videos)])
+        return task_id
+
+    def get_tasks(self, task_id=None):
+        """获取任务列表（与原有任务字典格式一致），指定task_id时只返回该任务"""
+        conn = self.db.connection()
+        if task_id is None:
+            tasks = [dict(row) for row in conn.execute('SELECT * FROM tasks ORDER BY id')]
+            jobs = conn.execute('SELECT task_id, video_path, status FROM jobs ORDER BY task_id, video_index').fetchall()
+        else:
+            tasks = [dict(row) for row in conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))]
+            jobs = conn.execute('SELECT task_id, video_path, status FROM jobs WHERE task_id = ? ORDER BY video_index',
+                                (task_id,)).fetchall()
+
+        by_id = {}
+        for task in tasks:
+            task.update({"videos": [], "completed_videos": 0, "total_videos": 0})
+            by_id[task["id"]] = task
+        for job in jobs:
+            task = by_id.get(job["task_id"])
+            if task is None:
+                continue
+            task["videos"].append(job["video_path"])
+            task["total_videos"] += 1
+            if job["status"] in FINISHED_JOB_STATUSES:
+                task["completed_videos"] += 1
+        return tasks
+
+    def get_task(self, task_id):
+        """获取单个任务，不存在时返回None"""
+        tasks = self.get_tasks(task_id)
+        return tasks[0] if tasks else None
+
+    def delete_task(self, task_id):
+        """删除任务及其作业"""
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM jobs WHERE task_id = ?', (task_id,))
+            deleted = conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,)).rowcount
+        return deleted > 0
+
+    def clear_tasks(self):
+        """清空所有任务"""
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM jobs')
+            conn.execute('DELETE FROM tasks')
+
+    def update_task_status(self, task_id, status, current_video=None):
+        """更新单个任务的状态（单行更新）"""
+        with self.db.transaction() as conn:
+            conn.execute('UPDATE tasks SET status = ?, current_video = ? WHERE id = ?',
+                         (status, current_video, task_id))
+
+    def save_task_states(self, tasks):
+        """在一个事务中批量保存多个任务的状态"""
+        with self.db.transaction() as conn:
+            conn.executemany('UPDATE tasks SET status = ?, current_video = ? WHERE id = ?',
+                             [(t.get("status"), t.get("current_video"), t["id"]) for t in tasks])
+
+    # ---------- 作业 ----------
+
+    def lease_next_job(self, task_id):
+        """原子地租用任务中下一个待上传的作业
+
+        Returns:
+            dict: 作业信息 {id, task_id, video_index, video_path, attempts}，没有待上传作业时返回None
+        """
+        # BEGIN IMMEDIATE：查询和租用之间不会被其他写入者插入
+        with self.db.transaction() as conn:
+            row = conn.execute('''SELECT id, task_id, video_index, video_path, attempts FROM jobs
+                                  WHERE task_id = ? AND status = ? ORDER BY video_index LIMIT 1''',
+                               (task_id, JOB_PENDING)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE jobs SET status = ?, attempts = attempts + 1, updated_time = ? WHERE id = ?',
+                         (JOB_LEASED, self._now(), row["id"]))
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _finish_job(self, job_id, status, error=None):
+        with self.db.transaction() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, updated_time = ? WHERE id = ? AND status = ?',
+                         (status, error, self._now(), job_id, JOB_LEASED))
+
+    def complete_job(self, job_id):
+        """作业上传成功"""
+        self._finish_job(job_id, JOB_DONE)
+
+    def skip_job(self, job_id, reason=None):
+        """作业因视频重复被跳过"""
+        self._finish_job(job_id, JOB_SKIPPED, reason)
+
+    def fail_job(self, job_id, error=None):
+        """作业上传失败"""
+        self._finish_job(job_id, JOB_FAILED, error)
+
+    def skip_pending_jobs(self, task_id, reasons):
+        """调度前跳过任务中的重复视频
+
+        Args:
+            reasons: {video_path: 跳过原因}
+
+        Returns:
+            int: 跳过的作业数量
+        """
+        if not reasons:
+            return 0
+        now = self._now()
+        with self.db.transaction() as conn:
+            return sum(conn.execute('''UPDATE jobs SET status = ?, error = ?, updated_time = ?
+                                       WHERE task_id = ? AND video_path = ? AND status = ?''',
+                                    (JOB_SKIPPED, reason, now, task_id, video_path, JOB_PENDING)).rowcount
+                       for video_path, reason in reasons.items())
+
+    def fail_pending_jobs(self, task_id, error=None):
+        """将任务中所有待上传的作业一次性标记为失败（如账号Cookie失效），避免逐个租用再失败
+
+        Returns:
+            int: 标记的作业数量
+        """
+        with self.db.transaction() as conn:
+            return conn.execute('UPDATE jobs SET status = ?, error = ?, updated_time = ? WHERE task_id = ? AND status = ?',
+                                (JOB_FAILED, error, self._now(), task_id, JOB_PENDING)).rowcount
+
+    def get_pending_videos(self, task_id):
+        """任务中待上传的视频路径（按上传顺序）"""
+        conn = self.db.connection()
+        rows = conn.execute('SELECT video_path FROM jobs WHERE task_id = ? AND status = ? ORDER BY video_index',
+                            (task_id, JOB_PENDING)).fetchall()
+        return [row["video_path"] for row in rows]
+
+    def has_pending_jobs(self, task_id):
+        """任务是否还有待上传的作业"""
+        conn = self.db.connection()
+        row = conn.execute('SELECT 1 FROM jobs WHERE task_id = ? AND status = ? LIMIT 1',
+                           (task_id, JOB_PENDING)).fetchone()
+        return row is not None
+
+    def count_finished_jobs(self, task_id):
+        """任务中已完成（成功或跳过）的作业数量"""
+        conn = self.db.connection()
+        row = conn.execute(f'''SELECT COUNT(*) FROM jobs WHERE task_id = ?
+                               AND status IN ({','.join('?' * len(FINISHED_JOB_STATUSES))})''',
+                           (task_id, *FINISHED_JOB_STATUSES)).fetchone()
+        return row[0]
+
+    def reset_jobs(self, task_id):
+        """重置任务的所有作业为待上传（重新开始任务）"""
+        with self.db.transaction() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = NULL, updated_time = ? WHERE task_id = ?',
+                         (JOB_PENDING, self._now(), task_id))
+
+    def retry_failed_jobs(self, task_id):
+        """将任务中上传失败的作业恢复为待上传（继续任务时重试，已完成的作业保持不变）
+
+        Returns:
+            int: 恢复的作业数量
+        """
+        with self.db.transaction() as conn:
+            return conn.execute('UPDATE jobs SET status = ?, error = NULL, updated_time = ? WHERE task_id = ? AND status = ?',
+                                (JOB_PENDING, self._now(), task_id, JOB_FAILED)).rowcount
+
+    def recover_leased_jobs(self):
+        """程序重启后，将上次中断时仍处于租用状态的作业恢复为待上传
+
+        Returns:
+            int: 恢复的作业数量
+        """
+        with self.db.transaction() as conn:
+            recovered = conn.execute('UPDATE jobs SET status = ?, updated_time = ? WHERE status = ?',
+                                     (JOB_PENDING, self._now(), JOB_LEASED)).rowcount
+        if recovered:
+            douyin_logger.info(f"已恢复 {recovered} 个中断的上传作业")
+        return recovered
+
+
+# 全局任务存储实例
+task_store = TaskStore()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+上传调度器模块
+所有账号的上传任务都以协程形式运行在浏览器池的常驻事件循环中，
+等待间隔和风控窗口通过事件循环的定时器唤醒，停止请求可立即打断等待
+"""
+
+import asyncio
+import threading
+
+from conf import UPLOAD_MAX_CONCURRENCY
+from utils.browser_pool import browser_pool
+from utils.log import douyin_logger
+
+
+class UploadRun:
+    """一次上传运行（单账号批量上传或多账号上传）的状态"""
+
+    def __init__(self, name):
+        self.name = name
+        self.stop_event = asyncio.Event()
+        self.tasks = set()
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    @property
+    def running(self):
+        return bool(self.tasks)
+
+    async def sleep(self, seconds):
+        """等待指定秒数，收到停止请求时立即返回
+
+        Returns:
+            bool: True表示正常等待结束，False表示已被停止
+        """
+        if self.stopped:
+            return False
+        if seconds <= 0:
+            return True
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=seconds)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+
+class UploadScheduler:
+    """上传调度器：少量线程承载任意数量的账号上传协程，并限制全局并发上传数"""
+
+    def __init__(self, max_concurrency=UPLOAD_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._runs = {}  # name -> UploadRun
+        self._lock = threading.Lock()
+
+    def start(self, name, job_factory):
+        """启动一次上传运行（线程安全）
+
+        同名的上一次运行仍有协程未退出时（已请求停止但正在上传）拒绝启动，
+        否则旧协程无法再被停止，且会与新运行重复上传
+
+        Args:
+            name: 运行名称，如 "single"、"multi"
+            job_factory: 接收 UploadRun 并返回协程列表的函数
+
+        Raises:
+            RuntimeError: 同名运行仍在进行中
+        """
+        return browser_pool.run(self._start(name, job_factory))
+
+    async def _start(self, name, job_factory):
+        run = UploadRun(name)
+        with self._lock:
+            previous = self._runs.get(name)
+            if previous and previous.running:
+                raise RuntimeError(f"{name} 上传仍在进行中（{len(previous.tasks)} 个协程未退出）")
+            self._runs[name] = run
+        for coro in job_factory(run):
+            task = asyncio.create_task(coro)
+            run.tasks.add(task)
+            task.add_done_callback(lambda t, run=run: self._on_task_done(run, t))
+        douyin_logger.info(f"上传调度器: 启动 {name}，共 {len(run.tasks)} 个协程")
+        return run
+
+    @staticmethod
+    def _on_task_done(run, task):
+        run.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            douyin_logger.error(f"上传调度器: {run.name} 协程异常退出: {str(task.exception())}")
+
+    def stop(self, name):
+        """请求停止指定运行，正在等待间隔或风控窗口的协程会立即醒来退出"""
+        with self._lock:
+            run = self._runs.get(name)
+        if run:
+            browser_pool.loop.call_soon_threadsafe(run.stop_event.set)
+
+    def is_running(self, name):
+        with self._lock:
+            run = self._runs.get(name)
+        return bool(run and run.running)
+
+    def slot(self):
+        """全局上传并发名额，使用方式: async with upload_scheduler.slot(): ..."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+
+# 全局上传调度器实例
+upload_scheduler = UploadScheduler()
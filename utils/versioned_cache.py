@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+带版本号的进程内缓存
+每次写操作使缓存失效并递增版本号；读取未命中时从数据库加载，
+若加载期间版本号发生变化（并发写入），加载结果只返回给调用方而不写入缓存，避免缓存旧数据
+"""
+
+import threading
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """键值缓存，由写接口调用 invalidate() 失效"""
+
+    def __init__(self):
+        self._data = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self, key, loader):
+        """返回缓存值，未命中时调用 loader() 加载（None 也会被缓存）"""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            version = self._version
+        if value is not _MISSING:
+            return value
+
+        value = loader()
+        with self._lock:
+            if self._version == version:
+                self._data[key] = value
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._version += 1
+            self._data[key] = value
+
+    def invalidate(self, key=_MISSING):
+        """使指定键失效，不指定时清空全部"""
+        with self._lock:
+            self._version += 1
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
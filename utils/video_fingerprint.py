@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+视频感知指纹模块
+剪辑（翻转、调色、AB融合、缩放、重新编码）后的视频MD5与原视频不同，
+这里在视频固定的相对位置抽取若干帧，用FFmpeg缩小为32x32灰度图后计算64位pHash，
+整段视频的指纹为各帧pHash组成的向量，按汉明距离判断是否为同一素材
+
+索引使用多索引哈希：每个64位pHash切成4段16位，每段按值排序后二分查找。
+两个指纹的总汉明距离小于分段总数时至少有一段完全相同，因此只需查找分段相同的候选再精确计算距离
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from datetime import datetime
+
+from conf import VIDEO_FINGERPRINT_FRAMES, VIDEO_FINGERPRINT_MAX_DISTANCE
+from utils.log import douyin_logger
+from utils.md5_manager import file_identity
+from utils.sqlite_store import get_store
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 抽帧缩放后的边长
+FRAME_SIZE = 32
+# pHash取DCT左上角 HASH_SIZE x HASH_SIZE 的低频系数
+HASH_SIZE = 8
+# 每个pHash切分的段数（每段16位）
+CHUNKS_PER_HASH = 4
+CHUNK_BITS = 64 // CHUNKS_PER_HASH
+# 新增的指纹超过该数量后重建分段索引，之前逐个比较
+REBUILD_THRESHOLD = 1024
+
+
+def _dct_matrix(n):
+    """n点DCT-II变换矩阵"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def phash_frames(frames):
+    """计算每帧的64位pHash
+
+    Args:
+        frames: (帧数, 32, 32) 的灰度图数组
+
+    Returns:
+        np.ndarray: (帧数,) uint64
+    """
+    dct = _dct_matrix(FRAME_SIZE)
+    coefficients = dct @ frames.astype(np.float64) @ dct.T
+    low = coefficients[:, :HASH_SIZE, :HASH_SIZE].reshape(len(frames), -1)
+    # 直流分量只反映整体亮度，不参与中位数计算
+    medians = np.median(low[:, 1:], axis=1, keepdims=True)
+    bits = (low > medians).astype(np.uint64)
+    weights = np.uint64(1) << np.arange(HASH_SIZE * HASH_SIZE, dtype=np.uint64)
+    return (bits * weights).sum(axis=1, dtype=np.uint64)
+
+
+def hamming_distance(vectors, vector):
+    """指纹矩阵 (N, 帧数) 中每一行与 vector 的总汉明距离"""
+    xor = np.bitwise_xor(vectors, vector)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(xor).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(xor.view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def split_chunks(vectors):
+    """把指纹切成16位分段：(N, 帧数) -> (N, 帧数*4)"""
+    shifts = np.arange(CHUNKS_PER_HASH, dtype=np.uint64) * np.uint64(CHUNK_BITS)
+    chunks = (vectors[..., None] >> shifts) & np.uint64((1 << CHUNK_BITS) - 1)
+    return chunks.astype(np.uint16).reshape(*vectors.shape[:-1], vectors.shape[-1] * CHUNKS_PER_HASH)
+
+
+def probe_duration(file_path):
+    """获取视频时长（秒）"""
+    result = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                             '-of', 'default=noprint_wrappers=1:nokey=1', file_path],
+                            capture_output=True, text=True, timeout=30)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def extract_frames(file_path, count):
+    """在视频的 (i+0.5)/count 处各抽取一帧，缩放为32x32灰度图
+
+    Returns:
+        np.ndarray: (count, 32, 32) uint8，失败时返回None
+    """
+    duration = probe_duration(file_path)
+    if not duration:
+        return None
+    frame_bytes = FRAME_SIZE * FRAME_SIZE
+    frames = []
+    for i in range(count):
+        # -ss 放在 -i 前面，先跳到附近的关键帧，只解码少量画面
+        cmd = ['ffmpeg', '-v', 'error', '-ss', f"{duration * (i + 0.5) / count:.3f}", '-i', file_path,
+               '-frames:v', '1', '-vf', f'scale={FRAME_SIZE}:{FRAME_SIZE}:flags=area,format=gray',
+               '-f', 'rawvideo', 'pipe:1']
+        result = subprocess.run(cmd, capture_output=True, timeout=60)
+        if result.returncode != 0 or len(result.stdout) < frame_bytes:
+            return None
+        frames.append(np.frombuffer(result.stdout[:frame_bytes], dtype=np.uint8).reshape(FRAME_SIZE, FRAME_SIZE))
+    return np.stack(frames)
+
+
+class VideoFingerprintIndex:
+    """已上传视频的感知指纹索引"""
+
+    def __init__(self, db_path='database/video_fingerprint.db', frame_count=VIDEO_FINGERPRINT_FRAMES,
+                 max_distance=VIDEO_FINGERPRINT_MAX_DISTANCE):
+        self.db_path = db_path
+        self.db = get_store(db_path)
+        self.frame_count = frame_count
+        # 超过分段总数时多索引哈希不再保证召回
+        self.max_distance = min(max_distance, frame_count * CHUNKS_PER_HASH - 1)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._ids = []  # 行号 -> 数据库ID
+        self._vectors = None  # (N, 帧数) uint64
+        self._chunk_values = None  # (分段数, 已索引数) 按值排序的分段
+        self._chunk_rows = None  # (分段数, 已索引数) 对应的行号
+        self._indexed_count = 0
+        self._pending = set()  # 正在后台计算指纹的文件
+        self._pending_lock = threading.Lock()
+        self.init_db()
+
+    @property
+    def available(self):
+        return NUMPY_AVAILABLE and shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+    def init_db(self):
+        """初始化指纹数据库"""
+        c = self.db.connection()
+
+        # 已上传视频的指纹
+        c.execute('''CREATE TABLE IF NOT EXISTS video_fingerprint (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            filepath TEXT NOT NULL,
+            md5 TEXT UNIQUE,
+            frame_count INTEGER NOT NULL,
+            phash BLOB NOT NULL,
+            cookie_name TEXT,
+            title TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )''')
+
+        # 本地文件指纹缓存（含水平翻转后的指纹），文件未变化时不再抽帧
+        c.execute('''CREATE TABLE IF NOT EXISTS fingerprint_cache (
+            dev INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            frame_count INTEGER NOT NULL,
+            phash BLOB NOT NULL,
+            phash_mirror BLOB NOT NULL,
+            PRIMARY KEY (dev, inode)
+        )''')
+
+    # ---------- 指纹计算 ----------
+
+    def fingerprint(self, file_path, compute=True):
+        """计算视频指纹
+
+        Args:
+            compute: False 时只读取缓存，未缓存时不抽帧
+
+        Returns:
+            (phash, phash_mirror): 两个 (帧数,) uint64 数组，后者为水平翻转画面的指纹；失败或未缓存时返回None
+        """
+        if not self.available:
+            return None
+        try:
+            identity = file_identity(os.stat(file_path))
+            cached = self._get_cached(identity)
+            if cached or not compute:
+                return cached
+
+            frames = extract_frames(file_path, self.frame_count)
+            if frames is None:
+                douyin_logger.warning(f"视频抽帧失败，无法计算指纹: {os.path.basename(file_path)}")
+                return None
+            result = (phash_frames(frames), phash_frames(frames[:, :, ::-1]))
+
+            if file_identity(os.stat(file_path)) == identity:
+                self._store_cached(identity, result)
+            return result
+        except Exception as e:
+            douyin_logger.error(f"计算视频指纹时出错: {str(e)}")
+            return None
+
+    def fingerprint_in_background(self, file_path):
+        """在后台线程中计算并缓存视频指纹，同一文件同时只计算一次"""
+        with self._pending_lock:
+            if file_path in self._pending:
+                return
+            self._pending.add(file_path)
+
+        def run():
+            try:
+                self.fingerprint(file_path)
+            finally:
+                with self._pending_lock:
+                    self._pending.discard(file_path)
+
+        threading.Thread(target=run, name='video-fingerprint', daemon=True).start()
+
+    def _get_cached(self, identity):
+        dev, inode, size, mtime_ns = identity
+        row = self.db.fetchone('''SELECT phash, phash_mirror FROM fingerprint_cache
+                                  WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ? AND frame_count = ?''',
+                               (dev, inode, size, mtime_ns, self.frame_count))
+        if row:
+            return np.frombuffer(row[0], dtype=np.uint64), np.frombuffer(row[1], dtype=np.uint64)
+        return None
+
+    def _store_cached(self, identity, result):
+        dev, inode, size, mtime_ns = identity
+        self.db.execute('''INSERT OR REPLACE INTO fingerprint_cache
+                           (dev, inode, size, mtime_ns, frame_count, phash, phash_mirror)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                        (dev, inode, size, mtime_ns, self.frame_count, result[0].tobytes(), result[1].tobytes()))
+
+    # ---------- 索引 ----------
+
+    def _ensure_loaded(self):
+        """首次使用时从数据库加载全部指纹并建立分段索引（需持有锁）"""
+        if self._loaded:
+            return
+        rows = self.db.fetchall('SELECT id, phash FROM video_fingerprint WHERE frame_count = ? ORDER BY id',
+                                (self.frame_count,))
+        self._ids = [row[0] for row in rows]
+        self._vectors = (np.frombuffer(b''.join(row[1] for row in rows), dtype=np.uint64).reshape(-1, self.frame_count)
+                         if rows else np.zeros((0, self.frame_count), dtype=np.uint64))
+        self._rebuild()
+        self._loaded = True
+        douyin_logger.info(f"视频指纹索引已加载: {len(self._ids)} 个视频")
+
+    def _rebuild(self):
+        chunks = split_chunks(self._vectors).T  # (分段数, N)
+        order = np.argsort(chunks, axis=1, kind='stable')
+        self._chunk_values = np.take_along_axis(chunks, order, axis=1)
+        self._chunk_rows = order.astype(np.int32)
+        self._indexed_count = len(self._ids)
+
+    def _candidates(self, vector):
+        """与 vector 至少有一个分段完全相同的行号，加上尚未建立索引的新行"""
+        rows = [np.arange(self._indexed_count, len(self._ids), dtype=np.int32)]
+        for c, value in enumerate(split_chunks(vector[None, :])[0]):
+            values = self._chunk_values[c]
+            lo = np.searchsorted(values, value, side='left')
+            hi = np.searchsorted(values, value, side='right')
+            if hi > lo:
+                rows.append(self._chunk_rows[c, lo:hi])
+        return np.unique(np.concatenate(rows))
+
+    def _search(self, vector, max_distance):
+        """返回 {行号: 距离}（需持有锁）"""
+        rows = self._candidates(vector)
+        if not len(rows):
+            return {}
+        distances = hamming_distance(self._vectors[rows], vector)
+        matched = distances <= max_distance
+        return dict(zip(rows[matched].tolist(), distances[matched].tolist()))
+
+    def add_video(self, file_path, md5=None, cookie_name=None, title=None):
+        """把已上传的视频加入索引
+
+        Returns:
+            bool: 是否加入成功
+        """
+        result = self.fingerprint(file_path)
+        if result is None:
+            return False
+        phash = result[0]
+        try:
+            c = self.db.execute('''INSERT OR IGNORE INTO video_fingerprint
+                                   (filename, filepath, md5, frame_count, phash, cookie_name, title, created_at)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                                (os.path.basename(file_path), file_path, md5, self.frame_count, phash.tobytes(),
+                                 cookie_name, title, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            record_id = c.lastrowid if c.rowcount else None
+            if record_id is None:
+                return False  # 相同MD5的视频已在索引中
+
+            with self._lock:
+                if self._loaded:
+                    self._ids.append(record_id)
+                    self._vectors = np.vstack([self._vectors, phash[None, :]])
+                    if len(self._ids) - self._indexed_count >= REBUILD_THRESHOLD:
+                        self._rebuild()
+            douyin_logger.info(f"视频指纹已加入索引: {os.path.basename(file_path)}")
+            return True
+        except Exception as e:
+            douyin_logger.error(f"保存视频指纹时出错: {str(e)}")
+            return False
+
+    def find_near_duplicates(self, file_path, max_distance=None, limit=5, compute=True):
+        """查找与视频画面相近（含水平翻转）的已上传视频
+
+        Args:
+            compute: False 时只使用缓存的指纹，未缓存时返回None
+
+        Returns:
+            list: [{id, filename, filepath, cookie_name, title, created_at, distance, mirrored}]，按距离升序
+        """
+        result = self.fingerprint(file_path, compute=compute)
+        if result is None:
+            return [] if compute else None
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+
+        with self._lock:
+            self._ensure_loaded()
+            matches = {}
+            for mirrored, vector in ((False, result[0]), (True, result[1])):
+                for row, distance in self._search(vector, max_distance).items():
+                    if row not in matches or distance < matches[row][0]:
+                        matches[row] = (distance, mirrored)
+            best = sorted(matches.items(), key=lambda item: item[1][0])[:limit]
+            found = [(self._ids[row], distance, mirrored) for row, (distance, mirrored) in best]
+
+        if not found:
+            return []
+        placeholders = ','.join('?' * len(found))
+        records = {row[0]: row for row in self.db.fetchall(
+            f'''SELECT id, filename, filepath, cookie_name, title, created_at FROM video_fingerprint
+                WHERE id IN ({placeholders})''', [record_id for record_id, _, _ in found])}
+        return [{
+            'id': record_id,
+            'filename': records[record_id][1],
+            'filepath': records[record_id][2],
+            'cookie_name': records[record_id][3],
+            'title': records[record_id][4],
+            'created_at': records[record_id][5],
+            'distance': distance,
+            'mirrored': mirrored
+        } for record_id, distance, mirrored in found if record_id in records]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'available': self.available,
+                'loaded': self._loaded,
+                'videos': len(self._ids),
+                'indexed': self._indexed_count,
+                'frame_count': self.frame_count,
+                'max_distance': self.max_distance
+            }
+
+
+# 全局视频指纹索引实例
+video_fingerprint_index = VideoFingerprintIndex()
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+视频处理任务池模块
+批量视频处理提交后立即返回任务ID，由按CPU核数和内存预算确定大小的工作线程池
+并行运行FFmpeg，每个文件单独记录状态，支持取消整个任务（正在运行的FFmpeg会被终止）
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from conf import VIDEO_JOB_MAX_WORKERS, VIDEO_JOB_MEMORY_BUDGET_MB, VIDEO_JOB_MEMORY_PER_ENCODE_MB
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.log import douyin_logger
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 文件状态
+FILE_QUEUED = 'queued'
+FILE_RUNNING = 'running'
+FILE_DONE = 'done'
+FILE_FAILED = 'failed'
+FILE_CANCELLED = 'cancelled'
+
+FINISHED_FILE_STATUSES = (FILE_DONE, FILE_FAILED, FILE_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class VideoFileTask:
+    """任务中的单个视频文件"""
+
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+        self.status = FILE_QUEUED
+        self.error = None
+        self.result = None
+        self.started_at = None
+        self.finished_at = None
+        self.process = None  # 正在运行的FFmpeg进程
+        self.progress = None  # FFmpeg实时进度
+        self.job = None  # 所属任务
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'status': self.status,
+            'error': self.error,
+            'result': self.result,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': self.progress,
+            'elapsed': round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None
+        }
+
+
+class VideoJob:
+    """一次批量视频处理任务"""
+
+    def __init__(self, files):
+        self.id = uuid.uuid4().hex[:12]
+        self.files = files
+        for file_task in files:
+            file_task.job = self
+        self.created_at = time.time()
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return all(f.status in FINISHED_FILE_STATUSES for f in self.files)
+
+    @property
+    def status(self):
+        if not self.finished:
+            return 'cancelling' if self.cancelled else 'running'
+        if self.cancelled:
+            return 'cancelled'
+        if any(f.status == FILE_FAILED for f in self.files):
+            return 'completed_with_errors' if any(f.status == FILE_DONE for f in self.files) else 'failed'
+        return 'completed'
+
+    def to_dict(self):
+        with self.lock:
+            files = [f.to_dict() for f in self.files]
+        counts = {status: 0 for status in (FILE_QUEUED, FILE_RUNNING, FILE_DONE, FILE_FAILED, FILE_CANCELLED)}
+        for f in files:
+            counts[f['status']] += 1
+        finished = counts[FILE_DONE] + counts[FILE_FAILED] + counts[FILE_CANCELLED]
+        # 正在处理的文件按FFmpeg进度计入
+        finished += sum((f['progress'] or {}).get('percent') or 0 for f in files if f['status'] == FILE_RUNNING) / 100
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'total': len(files),
+            'counts': counts,
+            'progress': round(finished * 100 / len(files), 1) if files else 100,
+            'files': files
+        }
+
+
+class VideoJobPool:
+    """FFmpeg并行处理池"""
+
+    def __init__(self, max_workers=VIDEO_JOB_MAX_WORKERS, memory_budget_mb=VIDEO_JOB_MEMORY_BUDGET_MB,
+                 memory_per_encode_mb=VIDEO_JOB_MEMORY_PER_ENCODE_MB, max_finished_jobs=100):
+        self.cpu_count = os.cpu_count() or 1
+        self.max_workers = max_workers or self._auto_workers(memory_budget_mb, memory_per_encode_mb)
+        # 并行的FFmpeg进程平分CPU核数，避免每个进程都按全部核数开线程造成争抢
+        self.threads_per_encode = max(1, self.cpu_count // self.max_workers)
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = None
+        self._jobs = OrderedDict()  # job_id -> VideoJob
+        self._lock = threading.Lock()
+
+    def _auto_workers(self, memory_budget_mb, memory_per_encode_mb):
+        """根据CPU核数和内存预算计算工作线程数"""
+        budget = memory_budget_mb
+        if PSUTIL_AVAILABLE:
+            available_mb = psutil.virtual_memory().available // (1024 * 1024)
+            budget = min(budget, available_mb)
+        by_memory = max(1, int(budget // memory_per_encode_mb))
+        # libx264本身是多线程的，每个编码进程至少分配2个核
+        by_cpu = max(1, self.cpu_count // 2)
+        return min(by_cpu, by_memory)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='video-job')
+                douyin_logger.info(f"视频处理任务池已启动: {self.max_workers} 个并行FFmpeg进程，"
+                                   f"每个进程 {self.threads_per_encode} 个线程")
+            return self._executor
+
+    # ---------- 任务 ----------
+
+    def submit(self, items, handler):
+        """提交一批视频处理
+
+        Args:
+            items: [(name, params)] 列表，name用于展示，params原样传给handler
+            handler: handler(params, file_task) 在工作线程中处理单个文件，返回结果字典，失败时抛出异常
+
+        Returns:
+            VideoJob: 新任务
+        """
+        job = VideoJob([VideoFileTask(name, params) for name, params in items])
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim_finished()
+        executor = self._get_executor()
+        for file_task in job.files:
+            executor.submit(self._run_file, job, file_task, handler)
+        douyin_logger.info(f"已提交视频处理任务 {job.id}，共 {len(job.files)} 个文件")
+        return job
+
+    def _run_file(self, job, file_task, handler):
+        with job.lock:
+            if file_task.status != FILE_QUEUED:
+                return  # 排队期间任务已被取消
+            file_task.status = FILE_RUNNING
+            file_task.started_at = time.time()
+        try:
+            result = handler(file_task.params, file_task)
+            with job.lock:
+                file_task.status = FILE_DONE
+                file_task.result = result
+        except JobCancelled:
+            with job.lock:
+                file_task.status = FILE_CANCELLED
+        except Exception as e:
+            with job.lock:
+                file_task.status = FILE_CANCELLED if job.cancelled else FILE_FAILED
+                file_task.error = str(e)
+            douyin_logger.error(f"视频处理失败 {file_task.name}: {str(e)}")
+        finally:
+            file_task.finished_at = time.time()
+            file_task.process = None
+
+    def _trim_finished(self):
+        """只保留最近的若干个已结束任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """取消任务：排队中的文件不再处理，正在运行的FFmpeg进程会被终止
+
+        Returns:
+            bool: 任务是否存在
+        """
+        job = self.get_job(job_id)
+        if not job:
+            return False
+        with job.lock:
+            job.cancelled = True
+            now = time.time()
+            for f in job.files:
+                if f.status == FILE_QUEUED:
+                    f.status = FILE_CANCELLED
+                    f.finished_at = now
+            processes = [f.process for f in job.files if f.status == FILE_RUNNING and f.process]
+        for process in processes:
+            try:
+                process.terminate()
+            except Exception:
+                pass  # 进程已结束
+        douyin_logger.info(f"已取消视频处理任务 {job_id}")
+        return True
+
+    # ---------- FFmpeg ----------
+
+    def run_ffmpeg(self, cmd, file_task=None, duration=None, on_progress=None):
+        """在当前工作线程中运行FFmpeg命令，进度实时写入file_task.progress
+
+        Args:
+            duration: 输入时长（秒），用于计算进度百分比
+            on_progress: 额外的进度回调 on_progress(file_task, FFmpegProgress)
+
+        Returns:
+            (returncode, stderr_tail)
+        """
+        # 输出路径是最后一个参数，线程数作为输出选项放在它前面
+        cmd = cmd[:-1] + ['-threads', str(self.threads_per_encode)] + cmd[-1:]
+        job = file_task.job if file_task is not None else None
+
+        def register(process):
+            if job is None:
+                return
+            with job.lock:
+                file_task.process = process
+                cancelled = job.cancelled
+            if cancelled:
+                process.terminate()
+
+        def report(progress):
+            if file_task is None:
+                return
+            file_task.progress = progress.to_dict()
+            if on_progress:
+                on_progress(file_task, progress)
+
+        returncode, stderr_tail = run_ffmpeg(cmd, duration=duration, on_progress=report, on_start=register)
+        if job is not None and job.cancelled:
+            raise JobCancelled()
+        return returncode, stderr_tail
+
+
+# 全局视频处理任务池实例
+video_job_pool = VideoJobPool()